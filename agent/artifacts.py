@@ -0,0 +1,268 @@
+"""
+Artifact store for large fetched payloads.
+
+Screener markdown, raw news and page content and transcript text used to
+travel inline in AnalysisState, which LangGraph copies and merges (and the
+checkpointer serializes) at every step. Fetch nodes now externalize every
+string over settings.artifact_min_bytes into this store and keep a small
+{"$artifact": handle, "size": n} reference in the state. Synthesis resolves
+references only for the company it is working on.
+
+The store is content-addressed, so identical payloads are shared across
+requests. It holds up to settings.artifact_memory_bytes in memory, spills
+least recently used entries to disk, and expires spilled files after
+settings.artifact_ttl.
+
+Each request also gets a memory meter that tracks the payload bytes it
+holds (inline state plus resolved artifacts). Its high-water mark is
+reported through memory_stats().
+"""
+import contextvars
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from config.settings import settings
+
+ARTIFACT_KEY = "$artifact"
+
+
+class ArtifactStore:
+    """Bounded in-memory text store that spills to disk"""
+
+    def __init__(self, directory: str, memory_bytes: int, ttl: float):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.ttl = ttl
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._memory_used = 0
+        # Entries evicted from memory whose spill file is still being written
+        self._spilling: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.time()
+        self.spilled = 0
+        self.disk_reads = 0
+
+    def _path(self, handle: str) -> str:
+        return os.path.join(self.directory, handle[:2], handle)
+
+    def put(self, text: str) -> str:
+        handle = hashlib.sha1(text.encode("utf-8", "surrogatepass")).hexdigest()
+        spill = []
+        with self._lock:
+            if handle in self._memory:
+                self._memory.move_to_end(handle)
+            else:
+                self._memory[handle] = text
+                self._memory_used += len(text)
+                while self._memory_used > self.memory_bytes and len(self._memory) > 1:
+                    old_handle, old_text = self._memory.popitem(last=False)
+                    self._memory_used -= len(old_text)
+                    self._spilling[old_handle] = old_text
+                    spill.append((old_handle, old_text))
+
+        for old_handle, old_text in spill:
+            try:
+                self._write(old_handle, old_text)
+            finally:
+                with self._lock:
+                    self._spilling.pop(old_handle, None)
+        self._maybe_sweep()
+        return handle
+
+    def _write(self, handle: str, text: str) -> None:
+        path = self._path(handle)
+        if os.path.exists(path):
+            os.utime(path)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8", errors="surrogatepass") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self.spilled += 1
+
+    def get(self, handle: str) -> Optional[str]:
+        with self._lock:
+            text = self._memory.get(handle)
+            if text is not None:
+                self._memory.move_to_end(handle)
+                return text
+            text = self._spilling.get(handle)
+            if text is not None:
+                return text
+        try:
+            with open(self._path(handle), encoding="utf-8", errors="surrogatepass") as f:
+                self.disk_reads += 1
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def exists(self, handle: str) -> bool:
+        with self._lock:
+            if handle in self._memory or handle in self._spilling:
+                return True
+        return os.path.exists(self._path(handle))
+
+    def _maybe_sweep(self) -> None:
+        """Remove spilled files older than the TTL, at most once a minute"""
+        now = time.time()
+        if now - self._last_sweep < 60 or not os.path.isdir(self.directory):
+            return
+        self._last_sweep = now
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if now - os.path.getmtime(path) > self.ttl:
+                        os.remove(path)
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_used,
+                "spilled": self.spilled,
+                "disk_reads": self.disk_reads,
+            }
+
+
+_artifact_store: Optional[ArtifactStore] = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    global _artifact_store
+    if _artifact_store is None:
+        with _store_lock:
+            if _artifact_store is None:
+                _artifact_store = ArtifactStore(
+                    os.path.join(settings.data_dir, "artifacts"),
+                    settings.artifact_memory_bytes,
+                    settings.artifact_ttl
+                )
+    return _artifact_store
+
+
+def is_artifact(value: Any) -> bool:
+    return isinstance(value, dict) and ARTIFACT_KEY in value
+
+
+def externalize(value: Any) -> Any:
+    """Copy of value with large strings replaced by artifact references"""
+    if isinstance(value, str):
+        if len(value) < settings.artifact_min_bytes:
+            return value
+        return {ARTIFACT_KEY: get_artifact_store().put(value), "size": len(value)}
+    if isinstance(value, dict) and not is_artifact(value):
+        return {key: externalize(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [externalize(item) for item in value]
+    return value
+
+
+def resolve(value: Any) -> Any:
+    """Copy of value with artifact references replaced by their text"""
+    if is_artifact(value):
+        text = get_artifact_store().get(value[ARTIFACT_KEY])
+        return text if text is not None else ""
+    if isinstance(value, dict):
+        return {key: resolve(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve(item) for item in value]
+    return value
+
+
+def artifacts_available(value: Any) -> bool:
+    """Whether every artifact referenced by value can still be resolved"""
+    if is_artifact(value):
+        return get_artifact_store().exists(value[ARTIFACT_KEY])
+    if isinstance(value, dict):
+        return all(artifacts_available(item) for item in value.values())
+    if isinstance(value, list):
+        return all(artifacts_available(item) for item in value)
+    return True
+
+
+def payload_size(value: Any) -> int:
+    """Characters of text held inline by value (artifact references count as small)"""
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(payload_size(item) for item in value.values())
+    if isinstance(value, list):
+        return sum(payload_size(item) for item in value)
+    return 0
+
+
+class MemoryMeter:
+    """Payload bytes held by one request and their high-water mark"""
+
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def add(self, size: int) -> None:
+        with self._lock:
+            self.current += size
+            self.peak = max(self.peak, self.current)
+
+    def release(self, size: int) -> None:
+        with self._lock:
+            self.current -= size
+
+
+_request_meter: contextvars.ContextVar = contextvars.ContextVar("request_meter", default=None)
+_peaks: deque = deque(maxlen=500)
+_peaks_lock = threading.Lock()
+
+
+@contextmanager
+def request_memory() -> Iterator[MemoryMeter]:
+    """Meter payload memory for the request running in this context"""
+    meter = MemoryMeter()
+    token = _request_meter.set(meter)
+    try:
+        yield meter
+    finally:
+        _request_meter.reset(token)
+        with _peaks_lock:
+            _peaks.append(meter.peak)
+
+
+def meter_add(size: int) -> None:
+    meter = _request_meter.get()
+    if meter is not None:
+        meter.add(size)
+
+
+def meter_release(size: int) -> None:
+    meter = _request_meter.get()
+    if meter is not None:
+        meter.release(size)
+
+
+def memory_stats() -> Dict[str, Any]:
+    """High-water marks of recent requests plus artifact store usage"""
+    with _peaks_lock:
+        peaks = sorted(_peaks)
+    summary = {"requests": len(peaks), "store": get_artifact_store().stats()}
+    if peaks:
+        summary.update({
+            "peak_p50_bytes": peaks[len(peaks) // 2],
+            "peak_p95_bytes": peaks[min(len(peaks) - 1, int(len(peaks) * 0.95))],
+            "peak_max_bytes": peaks[-1],
+        })
+    return summary
@@ -0,0 +1,130 @@
+"""
+In-process TTL caches for tool results.
+
+Tool functions decorated with @cached keep their successful results for a
+configurable time so repeated questions about the same company reuse
+upstream data. The background prefetcher calls .refresh() on the same
+functions to keep hot entries warm before they expire.
+"""
+import functools
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from agent.ledger import ledger_cache
+from config.settings import settings
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after ttl seconds"""
+
+    def __init__(self, ttl: float, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry[0] > self.ttl:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def age(self, key: Hashable) -> Optional[float]:
+        """Seconds since the entry was stored, or None if absent"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return time.time() - entry[0] if entry else None
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "ttl": self.ttl}
+
+
+_caches: Dict[str, TTLCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(name: str) -> TTLCache:
+    """Named cache; the TTL comes from settings.cache_ttl_<name>"""
+    with _caches_lock:
+        if name not in _caches:
+            ttl = getattr(settings, f"cache_ttl_{name}", 600)
+            _caches[name] = TTLCache(ttl, settings.cache_max_entries)
+        return _caches[name]
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    with _caches_lock:
+        return {name: cache.stats() for name, cache in _caches.items()}
+
+
+def is_cacheable(result: Any) -> bool:
+    """Only successful tool results are cached"""
+    return isinstance(result, dict) and "error" not in result and result.get("success", True) is not False
+
+
+def cached(name: str, key: Callable[..., Hashable]):
+    """Cache a tool function's successful results in the named TTL cache"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            cache = get_cache(name)
+            cache_key = key(*args, **kwargs)
+            result = cache.get(cache_key)
+            ledger_cache(name, result is not None)
+            if result is not None:
+                return result
+            result = fn(*args, **kwargs)
+            if is_cacheable(result):
+                cache.set(cache_key, result)
+            return result
+
+        def refresh(*args, **kwargs):
+            """Fetch fresh data and replace the cached entry"""
+            result = fn(*args, **kwargs)
+            if is_cacheable(result):
+                get_cache(name).set(key(*args, **kwargs), result)
+            return result
+
+        def age(*args, **kwargs) -> Optional[float]:
+            return get_cache(name).age(key(*args, **kwargs))
+
+        wrapper.refresh = refresh
+        wrapper.age = age
+        wrapper.uncached = fn
+        return wrapper
+    return decorator
+
+
+_company_queries: Counter = Counter()
+_company_queries_lock = threading.Lock()
+
+
+def record_company_queries(company_names: List[str]) -> None:
+    """Count how often each company is asked about"""
+    with _company_queries_lock:
+        _company_queries.update(company_names)
+
+
+def most_queried_companies(limit: int) -> List[str]:
+    with _company_queries_lock:
+        return [name for name, _ in _company_queries.most_common(limit)]
@@ -0,0 +1,319 @@
+"""
+Record/replay of external tool traffic.
+
+In record mode every Tavily call, LLM invocation and document download made
+by agent.tools is captured together with its timing into a gzip compressed
+JSON-lines cassette. In replay mode the same requests are served back from
+the cassette, optionally with the original latency, so the pipeline can be
+profiled on production-shaped data without network access.
+"""
+import base64
+import glob
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable, Dict, List, Optional
+
+from config.settings import settings
+
+RECORD = "record"
+REPLAY = "replay"
+
+
+class CassetteMiss(Exception):
+    """Raised in replay mode when a request was never recorded"""
+
+
+class ReplayedError(Exception):
+    """Re-raised in replay mode for requests that failed while recording"""
+
+    def __init__(self, message: str, error_type: str = "Exception", status_code: Optional[int] = None):
+        super().__init__(message)
+        self.error_type = error_type
+        self.status_code = status_code
+
+
+# Arguments that vary between otherwise identical calls (timeouts are
+# derived from the time left in the request) and are left out of keys
+VOLATILE_KWARGS = frozenset({"timeout"})
+
+
+def request_key(kind: str, request: Dict[str, Any]) -> str:
+    """Stable hash identifying a request"""
+    payload = json.dumps({"kind": kind, "request": request}, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """Gzip JSON-lines store of recorded requests and responses"""
+
+    def __init__(self, path: str, mode: str, speed: float = 1.0):
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self._lock = threading.Lock()
+        self._entries: Dict[str, deque] = defaultdict(deque)
+        self._record_file = None
+
+        if mode == REPLAY:
+            self._load()
+        elif mode == RECORD:
+            self._record_file = self._record_path()
+
+    def _record_path(self) -> str:
+        if os.path.isdir(self.path) or not self.path.endswith(".gz"):
+            os.makedirs(self.path, exist_ok=True)
+            return os.path.join(self.path, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.jsonl.gz")
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return self.path
+
+    def _cassette_files(self) -> List[str]:
+        if os.path.isdir(self.path):
+            return sorted(glob.glob(os.path.join(self.path, "*.jsonl.gz")))
+        return [self.path] if os.path.exists(self.path) else []
+
+    def _load(self) -> None:
+        for path in self._cassette_files():
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["key"]].append(entry)
+
+    def _write(self, entry: Dict[str, Any]) -> None:
+        line = json.dumps(entry, default=str) + "\n"
+        with self._lock:
+            # Each append is a separate gzip member; gzip readers concatenate them
+            with gzip.open(self._record_file, "at", encoding="utf-8") as f:
+                f.write(line)
+
+    def call(self, kind: str, request: Dict[str, Any], fn: Callable[[], Any],
+             encode: Callable[[Any], Any] = lambda value: value,
+             decode: Callable[[Any], Any] = lambda value: value) -> Any:
+        """Run fn through the cassette according to the current mode"""
+        key = request_key(kind, request)
+
+        if self.mode == REPLAY:
+            return self._replay(kind, key, decode)
+
+        started = time.perf_counter()
+        try:
+            result = fn()
+        except Exception as e:
+            self._write({
+                "key": key,
+                "kind": kind,
+                "request": request,
+                "elapsed": time.perf_counter() - started,
+                "error": {
+                    "type": type(e).__name__,
+                    "message": str(e),
+                    "status_code": getattr(e, "status_code", None),
+                },
+            })
+            raise
+
+        self._write({
+            "key": key,
+            "kind": kind,
+            "request": request,
+            "elapsed": time.perf_counter() - started,
+            "response": encode(result),
+        })
+        return result
+
+    def _replay(self, kind: str, key: str, decode: Callable[[Any], Any]) -> Any:
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise CassetteMiss(f"No recorded response for {kind} request {key[:12]}")
+            entry = entries.popleft() if len(entries) > 1 else entries[0]
+
+        if self.speed > 0:
+            time.sleep(entry.get("elapsed", 0) * self.speed)
+
+        error = entry.get("error")
+        if error:
+            raise ReplayedError(error["message"], error.get("type", "Exception"), error.get("status_code"))
+        return decode(entry["response"])
+
+
+class CassetteTavilyClient:
+    """TavilyClient proxy that records or replays every API method"""
+
+    def __init__(self, cassette: Cassette, factory: Callable[[], Any]):
+        self._cassette = cassette
+        self._factory = factory
+        self._client = None
+
+    def _inner(self):
+        if self._client is None:
+            self._client = self._factory()
+        return self._client
+
+    def __getattr__(self, name: str):
+        def method(*args, **kwargs):
+            request = {
+                "args": list(args),
+                "kwargs": {key: value for key, value in kwargs.items() if key not in VOLATILE_KWARGS},
+            }
+            return self._cassette.call(
+                f"tavily.{name}",
+                request,
+                lambda: getattr(self._inner(), name)(*args, **kwargs),
+            )
+        return method
+
+
+class ReplayedAIMessage:
+    """Chat model response rebuilt from a cassette"""
+
+    def __init__(self, content: str, usage_metadata: Optional[Dict] = None, response_metadata: Optional[Dict] = None):
+        self.content = content
+        self.usage_metadata = usage_metadata or {}
+        self.response_metadata = response_metadata or {}
+
+
+def _encode_message(message: Any) -> Dict[str, Any]:
+    return {
+        "content": message.content,
+        "usage_metadata": dict(getattr(message, "usage_metadata", None) or {}),
+        "response_metadata": dict(getattr(message, "response_metadata", None) or {}),
+    }
+
+
+def _decode_message(payload: Dict[str, Any]) -> ReplayedAIMessage:
+    return ReplayedAIMessage(payload["content"], payload.get("usage_metadata"), payload.get("response_metadata"))
+
+
+class CassetteChatModel:
+    """Chat model proxy that records or replays invoke calls"""
+
+    def __init__(self, cassette: Cassette, provider: str, model: str, factory: Callable[[], Any]):
+        self._cassette = cassette
+        self._provider = provider
+        self._model = model
+        self._factory = factory
+        self._llm = None
+
+    def _inner(self):
+        if self._llm is None:
+            self._llm = self._factory()
+        return self._llm
+
+    def invoke(self, messages: List[Any], *args, **kwargs) -> Any:
+        request = {
+            "model": self._model,
+            "messages": [
+                {"type": type(message).__name__, "content": getattr(message, "content", str(message))}
+                for message in messages
+            ],
+        }
+        return self._cassette.call(
+            f"{self._provider}.invoke",
+            request,
+            lambda: self._inner().invoke(messages, *args, **kwargs),
+            encode=_encode_message,
+            decode=_decode_message,
+        )
+
+
+class ReplayedResponse:
+    """Subset of requests.Response rebuilt from a cassette"""
+
+    def __init__(self, status_code: int, headers: Dict[str, str], content: bytes, url: str):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.url = url
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            import requests
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+def _encode_response(response: Any) -> Dict[str, Any]:
+    return {
+        "status_code": response.status_code,
+        "headers": dict(response.headers),
+        "content": base64.b64encode(response.content).decode("ascii"),
+        "url": str(response.url),
+    }
+
+
+def _decode_response(payload: Dict[str, Any]) -> ReplayedResponse:
+    return ReplayedResponse(
+        payload["status_code"],
+        payload.get("headers", {}),
+        base64.b64decode(payload["content"]),
+        payload.get("url", ""),
+    )
+
+
+_cassette: Optional[Cassette] = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """Cassette configured through settings, or None when recording is off"""
+    global _cassette
+    mode = (settings.cassette_mode or "").lower()
+    if mode not in (RECORD, REPLAY):
+        return None
+
+    with _cassette_lock:
+        if _cassette is None:
+            _cassette = Cassette(settings.cassette_path, mode, settings.cassette_speed)
+    return _cassette
+
+
+def use_cassette(path: str, mode: str, speed: float = 1.0) -> Cassette:
+    """Activate a cassette programmatically, e.g. from a profiling script"""
+    global _cassette
+    with _cassette_lock:
+        settings.cassette_mode = mode
+        settings.cassette_path = path
+        settings.cassette_speed = speed
+        _cassette = Cassette(path, mode, speed)
+    return _cassette
+
+
+def tavily_client_for(factory: Callable[[], Any]) -> Any:
+    """Tavily client, wrapped in the active cassette if there is one"""
+    cassette = get_cassette()
+    if cassette is None:
+        return factory()
+    return CassetteTavilyClient(cassette, factory)
+
+
+def chat_model_for(provider: str, model: str, factory: Callable[[], Any]) -> Any:
+    """Chat model, wrapped in the active cassette if there is one"""
+    cassette = get_cassette()
+    if cassette is None:
+        return factory()
+    return CassetteChatModel(cassette, provider, model, factory)
+
+
+def http_get(url: str, **kwargs: Any) -> Any:
+    """requests.get that goes through the active cassette if there is one"""
+    import requests
+
+    cassette = get_cassette()
+    if cassette is None:
+        return requests.get(url, **kwargs)
+
+    return cassette.call(
+        "http.get",
+        {"url": url},
+        lambda: requests.get(url, **kwargs),
+        encode=_encode_response,
+        decode=_decode_response,
+    )
@@ -0,0 +1,75 @@
+"""
+Per-conversation graph state.
+
+The analysis graph is compiled with a LangGraph checkpointer and invoked
+with the conversation id as thread_id, so a follow-up in the same
+conversation starts from the previous turn's AnalysisState (companies and
+fetched data) instead of an empty one. The default backend keeps state in
+memory for the most recent settings.checkpoint_max_threads conversations;
+settings.checkpoint_backend = "sqlite" persists it under data_dir when
+langgraph-checkpoint-sqlite is installed.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+from config.settings import settings
+
+# Non-builtin types stored in AnalysisState that checkpoints may deserialize
+STATE_TYPES = [("agent.financial_agent", "AnalysisType")]
+
+_checkpointer: Optional[Any] = None
+_threads: "OrderedDict[str, None]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _create_checkpointer() -> Any:
+    from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+    serde = JsonPlusSerializer(allowed_msgpack_modules=STATE_TYPES)
+
+    if settings.checkpoint_backend == "sqlite":
+        try:
+            import sqlite3
+            from langgraph.checkpoint.sqlite import SqliteSaver
+
+            os.makedirs(settings.data_dir, exist_ok=True)
+            connection = sqlite3.connect(os.path.join(settings.data_dir, "checkpoints.sqlite"), check_same_thread=False)
+            return SqliteSaver(connection, serde=serde)
+        except ImportError:
+            print("langgraph-checkpoint-sqlite is not installed, keeping conversation state in memory")
+
+    from langgraph.checkpoint.memory import MemorySaver
+    return MemorySaver(serde=serde)
+
+
+def get_checkpointer() -> Any:
+    """Shared checkpointer, created on first use"""
+    global _checkpointer
+    if _checkpointer is None:
+        with _lock:
+            if _checkpointer is None:
+                _checkpointer = _create_checkpointer()
+    return _checkpointer
+
+
+def touch_thread(thread_id: str) -> None:
+    """Mark a conversation as recently used, dropping the oldest beyond the limit"""
+    checkpointer = get_checkpointer()
+    with _lock:
+        _threads.pop(thread_id, None)
+        _threads[thread_id] = None
+        expired = []
+        while len(_threads) > settings.checkpoint_max_threads:
+            expired.append(_threads.popitem(last=False)[0])
+
+    # Only in-memory state needs evicting; persistent backends keep history
+    from langgraph.checkpoint.memory import MemorySaver
+    if isinstance(checkpointer, MemorySaver):
+        for old_thread in expired:
+            checkpointer.delete_thread(old_thread)
+
+
+def thread_config(thread_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id}}
@@ -0,0 +1,214 @@
+"""
+Crawl and map engine for investor-relations exploration.
+
+Seed URLs go into a frontier that deduplicates them (by normalized URL and
+by a per-domain seed limit, since one Tavily crawl or map already explores
+a site), and are then fetched concurrently. At most
+settings.crawl_per_domain requests are in flight per domain so we stay
+polite to company sites. Responses are kept in a persistent page cache
+and reused while younger than settings.crawl_cache_ttl, so the same
+site is not crawled again for every question. When the active stage
+budget runs out, whatever has finished is returned.
+"""
+import contextvars
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from agent.deadlines import remaining
+from agent.ledger import ledger_cache
+from agent.news_store import normalize_url
+from agent.profiling import track_thread
+from config.settings import settings
+
+
+def domain_of(url: str) -> str:
+    netloc = urlsplit(url).netloc.lower()
+    return netloc[4:] if netloc.startswith("www.") else netloc
+
+
+class PageCache:
+    """JSON files of upstream responses keyed by kind and a key such as a normalized URL"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, kind: str, key: str) -> str:
+        digest = hashlib.sha1(f"{kind}:{key}".encode()).hexdigest()
+        return os.path.join(self.directory, kind, f"{digest}.json")
+
+    def get(self, kind: str, key: str, max_age: float) -> Optional[Dict[str, Any]]:
+        """Cached response if it is younger than max_age seconds"""
+        try:
+            with open(self._path(kind, key)) as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            entry = None
+
+        if entry is None or time.time() - entry["fetched_at"] > max_age:
+            self.misses += 1
+            ledger_cache(f"pages:{kind}", False)
+            return None
+        self.hits += 1
+        ledger_cache(f"pages:{kind}", True)
+        return entry["response"]
+
+    def put(self, kind: str, key: str, response: Dict[str, Any]) -> None:
+        path = self._path(kind, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Concurrent requests may store the same key; each writes its own temp file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"key": key, "fetched_at": time.time(), "response": response}, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class Frontier:
+    """Deduplicated URLs waiting to be fetched, grouped by domain"""
+
+    def __init__(self, per_domain_limit: int):
+        self.per_domain_limit = per_domain_limit
+        self._seen: set = set()
+        self._per_domain: Dict[str, int] = defaultdict(int)
+        self._queues: "OrderedDict[str, List[str]]" = OrderedDict()
+
+    def admit(self, url: str) -> bool:
+        """Record a URL unless it (or enough of its domain) was seen already"""
+        key = normalize_url(url)
+        domain = domain_of(url)
+        if not domain or key in self._seen or self._per_domain[domain] >= self.per_domain_limit:
+            return False
+        self._seen.add(key)
+        self._per_domain[domain] += 1
+        return True
+
+    def push(self, url: str) -> None:
+        self._queues.setdefault(domain_of(url), []).append(url)
+
+    def pop_ready(self, in_flight: Dict[str, int], max_per_domain: int) -> Optional[str]:
+        """Next URL whose domain has a free slot, rotating across domains"""
+        for domain, queue in list(self._queues.items()):
+            if queue and in_flight[domain] < max_per_domain:
+                url = queue.pop(0)
+                self._queues.move_to_end(domain)
+                if not queue:
+                    del self._queues[domain]
+                return url
+        return None
+
+    def __bool__(self) -> bool:
+        return any(self._queues.values())
+
+
+class CrawlEngine:
+    """Runs crawl or map requests for a set of seed URLs"""
+
+    def __init__(self, cache: PageCache):
+        self.cache = cache
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=settings.crawl_workers, thread_name_prefix="crawl")
+            return self._executor
+
+    def run(self, kind: str, seeds: List[str], fetch: Callable[[str], Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Responses for each deduplicated seed, keyed by URL, from the page
+        cache when fresh and from fetch(url) otherwise. Failed fetches are
+        returned as {"error": ...} and are not cached.
+        """
+        frontier = Frontier(settings.crawl_seeds_per_domain)
+        responses: Dict[str, Dict[str, Any]] = {}
+
+        for url in seeds:
+            if not frontier.admit(url):
+                continue
+            cached = self.cache.get(kind, normalize_url(url), settings.crawl_cache_ttl)
+            if cached is not None:
+                responses[url] = cached
+            else:
+                frontier.push(url)
+
+        deadline = time.time() + remaining(settings.tavily_timeout * 2)
+        in_flight: Dict[str, int] = defaultdict(int)
+        futures: Dict[Any, str] = {}
+
+        def fetch_and_store(url: str) -> Dict[str, Any]:
+            with track_thread():
+                response = fetch(url)
+            if "error" not in response:
+                try:
+                    self.cache.put(kind, normalize_url(url), response)
+                except OSError as e:
+                    # A cache write failing must not turn a good response into an error
+                    print(f"Could not cache {kind} response for {url}: {e}")
+            return response
+
+        while frontier or futures:
+            while len(futures) < settings.crawl_workers:
+                url = frontier.pop_ready(in_flight, settings.crawl_per_domain)
+                if url is None:
+                    break
+                in_flight[domain_of(url)] += 1
+                future = self._get_executor().submit(contextvars.copy_context().run, fetch_and_store, url)
+                futures[future] = url
+
+            time_left = deadline - time.time()
+            if not futures or time_left <= 0:
+                break
+
+            done, _ = wait(futures, timeout=time_left, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                url = futures.pop(future)
+                in_flight[domain_of(url)] -= 1
+                try:
+                    responses[url] = future.result()
+                except Exception as e:
+                    responses[url] = {"error": str(e)}
+
+        for future, url in futures.items():
+            future.cancel()
+            responses[url] = {"error": "Timed out"}
+
+        return responses
+
+    def search(self, query: str, fetch: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Seed search for a query, reused from the page cache while fresh"""
+        cached = self.cache.get("search", query, settings.crawl_cache_ttl)
+        if cached is not None:
+            return cached
+        response = fetch()
+        if "error" not in response:
+            self.cache.put("search", query, response)
+        return response
+
+
+_crawl_engine: Optional[CrawlEngine] = None
+
+
+def get_crawl_engine() -> CrawlEngine:
+    global _crawl_engine
+    if _crawl_engine is None:
+        _crawl_engine = CrawlEngine(PageCache(os.path.join(settings.data_dir, "pages")))
+    return _crawl_engine
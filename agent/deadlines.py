@@ -0,0 +1,100 @@
+"""
+Request deadlines and per-stage time budgets.
+
+analyze_query stores an absolute deadline in AnalysisState. Each fetch node
+gets a budget from settings.stage_budgets, capped by the time left before
+the deadline minus the reserve kept for synthesis. Work for a stage runs
+in a shared pool under that budget: whatever has not finished when the
+budget runs out is reported as missing and the graph moves on with the
+data that did arrive. Tool calls read the active budget through
+remaining() to bound their own upstream timeouts.
+"""
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from agent.profiling import track_thread
+from config.settings import settings
+
+_stage_deadline: contextvars.ContextVar = contextvars.ContextVar("stage_deadline", default=None)
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.stage_workers, thread_name_prefix="stage")
+    return _executor
+
+
+def request_deadline(timeout: Optional[float] = None) -> float:
+    """Absolute deadline for a request starting now"""
+    return time.time() + (timeout if timeout is not None else settings.request_timeout_seconds)
+
+
+def time_left(state: Dict[str, Any]) -> float:
+    deadline = state.get("deadline")
+    return deadline - time.time() if deadline else float("inf")
+
+
+def stage_budget(state: Dict[str, Any], stage: str) -> float:
+    """Seconds a stage may spend; synthesis keeps what is left of the request"""
+    budget = settings.stage_budgets.get(stage, settings.request_timeout_seconds)
+    left = time_left(state)
+    if stage != "synthesis":
+        left -= settings.stage_budgets.get("synthesis", 0)
+    return max(0.0, min(budget, left))
+
+
+def remaining(default: float) -> float:
+    """Time left in the active stage, or default outside of a stage"""
+    deadline = _stage_deadline.get()
+    if deadline is None:
+        return default
+    return max(0.1, min(default, deadline - time.time()))
+
+
+def run_with_budget(tasks: Dict[str, Callable[[], Any]], budget: float) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Run tasks concurrently for at most budget seconds.
+    Returns the results that completed and the names of tasks that did not.
+    """
+    if budget <= 0:
+        return {}, list(tasks)
+
+    deadline = time.time() + budget
+
+    def in_stage(fn: Callable[[], Any]) -> Any:
+        _stage_deadline.set(deadline)
+        with track_thread():
+            return fn()
+
+    futures = {
+        _get_executor().submit(contextvars.copy_context().run, in_stage, fn): name
+        for name, fn in tasks.items()
+    }
+    done, not_done = wait(futures, timeout=budget)
+
+    results = {}
+    for future in done:
+        name = futures[future]
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            results[name] = {"error": str(e)}
+
+    for future in not_done:
+        future.cancel()
+
+    return results, [futures[future] for future in not_done]
+
+
+def merge_missing_sections(left: Optional[List[str]], right: Optional[List[str]]) -> List[str]:
+    """State reducer for missing sections; None resets the list"""
+    if right is None:
+        return []
+    merged = list(left or [])
+    merged.extend(section for section in right if section not in merged)
+    return merged
@@ -0,0 +1,225 @@
+"""
+Pooled, concurrent downloader for transcripts and other documents.
+
+Documents linked from the screener page (earnings call transcripts,
+annual reports, presentations) are fetched through one requests session
+per host, so connections are kept alive and reused across downloads.
+Downloads run in a bounded pool with at most settings.download_per_host
+in flight per host, and every request goes through the "http.<host>"
+rate limiter. The body is streamed to a partial file under
+data_dir/downloads; when the connection drops, the next attempt resumes
+it with an HTTP Range request (guarded by If-Range, so a document that
+changed in the meantime is fetched again from the start). fetch_many()
+downloads several documents at once, so a company's documents take
+about as long as the slowest one.
+"""
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+from agent.cassette import get_cassette, http_get
+from agent.deadlines import remaining
+from agent.profiling import track_thread
+from agent.rate_limit import limited_call
+from config.settings import settings
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/114.0.0.0 Safari/537.36"
+)
+
+CHUNK_BYTES = 64 * 1024
+
+
+def host_of(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+class Downloader:
+    """Keep-alive sessions, per-host slots and resumable partial files"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._sessions: Dict[str, Any] = {}
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._url_locks: Dict[str, List[Any]] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=settings.download_workers, thread_name_prefix="download")
+            return self._executor
+
+    def _session(self, host: str) -> Any:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        with self._lock:
+            if host not in self._sessions:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.download_per_host)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers["User-Agent"] = USER_AGENT
+                self._sessions[host] = session
+                self._slots[host] = threading.BoundedSemaphore(settings.download_per_host)
+            return self._sessions[host]
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(url.encode()).hexdigest())
+
+    def fetch(self, url: str) -> bytes:
+        """Body of url, resuming a partial download left by an earlier attempt"""
+        host = host_of(url)
+        if get_cassette() is not None:
+            # Recorded sessions store whole responses; keep them replayable
+            response = limited_call(f"http.{host}", http_get, url, headers={"User-Agent": USER_AGENT},
+                                    timeout=remaining(settings.http_timeout))
+            response.raise_for_status()
+            return response.content
+
+        session = self._session(host)
+        with self._slots[host], self._url_lock(url), track_thread():
+            return self._download(session, url)
+
+    @contextmanager
+    def _url_lock(self, url: str) -> Iterator[None]:
+        """
+        Serializes downloads of the same URL, which share a partial file.
+        Entries are counted and dropped once no download of the URL is
+        running or waiting, so the map does not grow with every URL.
+        """
+        with self._lock:
+            entry = self._url_locks.setdefault(url, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._url_locks[url]
+
+    def _download(self, session: Any, url: str) -> bytes:
+        import requests
+
+        path = self._path(url)
+        os.makedirs(self.directory, exist_ok=True)
+        attempts = max(1, settings.download_retries + 1)
+
+        for attempt in range(attempts):
+            offset = os.path.getsize(f"{path}.part") if os.path.exists(f"{path}.part") else 0
+            validator = self._validator(path) if offset else None
+            headers = {}
+            if offset:
+                headers["Range"] = f"bytes={offset}-"
+                if validator:
+                    headers["If-Range"] = validator
+
+            try:
+                response = limited_call(f"http.{host_of(url)}", self._request, session, url, headers)
+                with response:
+                    if response.status_code == 416:
+                        # The partial file no longer matches the document
+                        self._discard(path)
+                        continue
+
+                    resumed = response.status_code == 206
+                    if resumed and not response.headers.get("Content-Range", "").startswith(f"bytes {offset}-"):
+                        # A range we did not ask for; start over with the whole document
+                        self._discard(path)
+                        continue
+                    if not resumed:
+                        if response.status_code != 200:
+                            # Only a complete body may replace the partial file
+                            raise IOError(f"Unexpected status {response.status_code} for {url}")
+                        self._save_validator(path, response.headers)
+                    with open(f"{path}.part", "ab" if resumed else "wb") as f:
+                        for chunk in response.iter_content(CHUNK_BYTES):
+                            f.write(chunk)
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError):
+                if attempt == attempts - 1 or remaining(settings.http_timeout) <= 1:
+                    raise
+                time.sleep(min(2 ** attempt * 0.5, remaining(settings.http_timeout) / 2))
+                continue
+
+            with open(f"{path}.part", "rb") as f:
+                content = f.read()
+            self._discard(path)
+            return content
+
+        raise IOError(f"Could not download {url}")
+
+    @staticmethod
+    def _request(session: Any, url: str, headers: Dict[str, str]) -> Any:
+        response = session.get(url, headers=headers, stream=True, timeout=remaining(settings.http_timeout))
+        if response.status_code >= 400 and response.status_code != 416:
+            # Raised inside limited_call so 429 and 5xx slow the host's limiter down
+            response.close()
+            response.raise_for_status()
+        return response
+
+    def _validator(self, path: str) -> Optional[str]:
+        try:
+            with open(f"{path}.json") as f:
+                meta = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return meta.get("etag") or meta.get("last_modified")
+
+    def _save_validator(self, path: str, headers: Any) -> None:
+        with open(f"{path}.json", "w") as f:
+            json.dump({"etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified")}, f)
+
+    def _discard(self, path: str) -> None:
+        for suffix in (".part", ".json"):
+            try:
+                os.remove(f"{path}{suffix}")
+            except FileNotFoundError:
+                pass
+
+    def fetch_many(self, urls: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        {"content": bytes} or {"error": ...} for each URL, downloaded
+        concurrently. Downloads still running when the active budget runs
+        out are reported as timed out.
+        """
+        urls = list(dict.fromkeys(url for url in urls if url))
+        futures = {
+            self._get_executor().submit(contextvars.copy_context().run, self.fetch, url): url
+            for url in urls
+        }
+        wait(futures, timeout=remaining(settings.http_timeout * 2))
+
+        results: Dict[str, Dict[str, Any]] = {}
+        for future, url in futures.items():
+            if not future.done():
+                future.cancel()
+                results[url] = {"error": "Timed out"}
+                continue
+            try:
+                results[url] = {"content": future.result()}
+            except Exception as e:
+                results[url] = {"error": str(e)}
+        return results
+
+
+_downloader: Optional[Downloader] = None
+
+
+def get_downloader() -> Downloader:
+    global _downloader
+    if _downloader is None:
+        _downloader = Downloader(os.path.join(settings.data_dir, "downloads"))
+    return _downloader
@@ -1,380 +1,623 @@
-from langgraph.graph import StateGraph, END
-from langchain_core.runnables import RunnableLambda, RunnableConfig
-from typing import Dict, TypedDict, Optional, List, Any
-from enum import Enum
-from agent.tools import (
-    COMPANIES,
-    tavily_search_financial_news,
-    tavily_extract_financial_data,
-    tavily_crawl_company_websites,
-    tavily_map_financial_resources,
-    get_transcript_data,
-    generate_comprehensive_analysis,
-    generate_comparative_analysis
-)
-
-class AnalysisType(str, Enum):
-    FINANCIAL = "financial"
-    NEWS = "news"
-    TRANSCRIPT = "transcript"
-    WEBSITE = "website"
-    RESOURCES = "resources"
-    FULL = "full"
-    COMPARATIVE = "comparative"
-
-class AnalysisState(TypedDict):
-    user_query: str
-    companies: List[str]
-    analysis_type: Optional[AnalysisType]
-    company_configs: Optional[List[Dict]]
-    financial_data: Optional[Dict]
-    news_data: Optional[Dict]
-    transcript_data: Optional[Dict]
-    website_data: Optional[Dict]
-    resources_data: Optional[Dict]
-    final_output: Optional[str]
-    error_message: Optional[str]
-
-workflow = StateGraph(AnalysisState)
-
-def extract_companies_and_analysis_type(state: AnalysisState) -> Dict[str, Any]:
-    """
-    Extract companies and analysis type from user query
-    """
-    query = state["user_query"].lower()
-    
-    detected_companies = []
-    company_configs = []
-    
-    for key, config in COMPANIES.items():
-        if (config["symbol"].lower() in query or 
-            config["name"].lower() in query or
-            any(term.lower() in query for term in config["search_terms"])):
-            detected_companies.append(config["name"])
-            company_configs.append(config)
-    
-    if not detected_companies:
-        if any(term in query for term in ["all", "compare", "comparison", "vs", "versus"]):
-            detected_companies = [config["name"] for config in COMPANIES.values()]
-            company_configs = list(COMPANIES.values())
-    
-
-    analysis_type = AnalysisType.FULL
-    
-    if "news" in query and not any(term in query for term in ["financial", "transcript", "website"]):
-        analysis_type = AnalysisType.NEWS
-    elif "transcript" in query or "earnings" in query or "concall" in query:
-        analysis_type = AnalysisType.TRANSCRIPT
-    elif "financial" in query or "ratios" in query or "balance sheet" in query:
-        analysis_type = AnalysisType.FINANCIAL
-    elif "website" in query or "crawl" in query:
-        analysis_type = AnalysisType.WEBSITE
-    elif "resources" in query or "map" in query or "documents" in query:
-        analysis_type = AnalysisType.RESOURCES
-    elif any(term in query for term in ["compare", "comparison", "vs", "versus"]) and len(company_configs) > 1:
-        analysis_type = AnalysisType.COMPARATIVE
-    elif "full" in query or "complete" in query or "comprehensive" in query:
-        analysis_type = AnalysisType.FULL
-    
-    return {
-        "companies": detected_companies,
-        "company_configs": company_configs,
-        "analysis_type": analysis_type
-    }
-
-def validate_request(state: AnalysisState) -> Dict[str, str]:
-    """
-    Validate if the request can be processed
-    """
-    if not state.get("company_configs") or len(state["company_configs"]) == 0:
-        available_companies = ", ".join([config["name"] for config in COMPANIES.values()])
-        return {
-            "error_message": f"No supported companies detected in your query. "
-                          f"Supported companies: {available_companies}. "
-                          f"Please mention one or more of these companies in your query."
-        }
-    
-    return {}
-
-def fetch_financial_data(state: AnalysisState) -> Dict[str, Any]:
-    """
-    Fetch financial data for companies using Tavily Extract
-    """
-    if state["analysis_type"] not in [AnalysisType.FINANCIAL, AnalysisType.FULL, AnalysisType.COMPARATIVE]:
-        return {}
-    
-    financial_results = {}
-    
-    for config in state["company_configs"]:
-        try:
-            result = tavily_extract_financial_data(config)
-            financial_results[config["name"]] = result
-        except Exception as e:
-            financial_results[config["name"]] = {"error": str(e), "success": False}
-    
-    return {"financial_data": financial_results}
-
-def fetch_news_data(state: AnalysisState) -> Dict[str, Any]:
-    """
-    Fetch news data for companies using Tavily Search
-    """
-    if state["analysis_type"] not in [AnalysisType.NEWS, AnalysisType.FULL, AnalysisType.COMPARATIVE]:
-        return {}
-    
-    news_results = {}
-    
-    for config in state["company_configs"]:
-        try:
-            result = tavily_search_financial_news(config, days=30, max_results=10)
-            news_results[config["name"]] = result
-        except Exception as e:
-            news_results[config["name"]] = {"error": str(e)}
-    
-    return {"news_data": news_results}
-
-def fetch_transcript_data(state: AnalysisState) -> Dict[str, Any]:
-    """
-    Fetch transcript data for companies
-    """
-    if state["analysis_type"] not in [AnalysisType.TRANSCRIPT, AnalysisType.FULL, AnalysisType.COMPARATIVE]:
-        return {}
-    
-    transcript_results = {}
-    
-    for config in state["company_configs"]:
-        try:
-            result = get_transcript_data(config)
-            transcript_results[config["name"]] = result
-        except Exception as e:
-            transcript_results[config["name"]] = {"error": str(e), "success": False}
-    
-    return {"transcript_data": transcript_results}
-
-def fetch_website_data(state: AnalysisState) -> Dict[str, Any]:
-    """
-    Crawl company websites using Tavily Crawl
-    """
-    if state["analysis_type"] != AnalysisType.WEBSITE:
-        return {}
-    
-    website_results = {}
-    
-    for config in state["company_configs"]:
-        try:
-            result = tavily_crawl_company_websites(config, max_depth=2)
-            website_results[config["name"]] = result
-        except Exception as e:
-            website_results[config["name"]] = {"error": str(e)}
-    
-    return {"website_data": website_results}
-
-def fetch_resources_data(state: AnalysisState) -> Dict[str, Any]:
-    """
-    Map financial resources using Tavily Map
-    """
-    if state["analysis_type"] != AnalysisType.RESOURCES:
-        return {}
-    
-    resources_results = {}
-    
-    for config in state["company_configs"]:
-        try:
-            result = tavily_map_financial_resources(config)
-            resources_results[config["name"]] = result
-        except Exception as e:
-            resources_results[config["name"]] = {"error": str(e)}
-    
-    return {"resources_data": resources_results}
-
-def generate_final_analysis(state: AnalysisState) -> Dict[str, str]:
-    """
-    Generate the final analysis based on collected data
-    """
-    try:
-        if state.get("error_message"):
-            return {"final_output": state["error_message"]}
-        
-        analysis_type = state["analysis_type"]
-        company_configs = state["company_configs"]
-        
-        if analysis_type == AnalysisType.COMPARATIVE and len(company_configs) > 1:
-            companies_data = []
-            
-            for config in company_configs:
-                company_name = config["name"]
-                
-                financial_data = state.get("financial_data", {}).get(company_name)
-                news_data = state.get("news_data", {}).get(company_name)
-                transcript_data = state.get("transcript_data", {}).get(company_name)
-                
-                individual_analysis = generate_comprehensive_analysis(
-                    company_config=config,
-                    financial_data=financial_data,
-                    news_data=news_data,
-                    transcript_data=transcript_data,
-                    analysis_type="full"
-                )
-                
-                companies_data.append({
-                    "company_name": company_name,
-                    "analysis": individual_analysis
-                })
-            
-            final_analysis = generate_comparative_analysis(companies_data)
-            
-        else:
-            all_results = []
-            
-            for config in company_configs:
-                company_name = config["name"]
-                
-                financial_data = state.get("financial_data", {}).get(company_name)
-                news_data = state.get("news_data", {}).get(company_name)
-                transcript_data = state.get("transcript_data", {}).get(company_name)
-                website_data = state.get("website_data", {}).get(company_name)
-                resources_data = state.get("resources_data", {}).get(company_name)
-                
-                if analysis_type == AnalysisType.WEBSITE:
-                  if website_data:
-                    result = generate_comprehensive_analysis(
-                      company_config=config,
-                      website_data=website_data,
-                      analysis_type=analysis_type
-                    )
-                  else:
-                    result = generate_comprehensive_analysis(
-                      company_config=config,
-                      analysis_type=analysis_type
-                    )
-                    
-                elif analysis_type == AnalysisType.RESOURCES:
-                  if resources_data:
-                    result = generate_comprehensive_analysis(
-                      company_config=config,
-                      resources_data=resources_data,
-                      analysis_type=analysis_type
-                    )
-                  else:
-                    result = generate_comprehensive_analysis(
-                      company_config=config,
-                      analysis_type=analysis_type
-                    )
-                        
-                else:
-                    result = generate_comprehensive_analysis(
-                        company_config=config,
-                        financial_data=financial_data,
-                        news_data=news_data,
-                        transcript_data=transcript_data,
-                        analysis_type=analysis_type
-                    )
-                
-                all_results.append(result)
-            
-            final_analysis = "\n\n".join(all_results)
-        
-        return {"final_output": final_analysis}
-        
-    except Exception as e:
-        return {"final_output": f"Error generating analysis: {str(e)}"}
-
-
-workflow.add_node("extract_intent", RunnableLambda(extract_companies_and_analysis_type))
-workflow.add_node("validate", RunnableLambda(validate_request))
-workflow.add_node("fetch_financial", RunnableLambda(fetch_financial_data))
-workflow.add_node("fetch_news", RunnableLambda(fetch_news_data))
-workflow.add_node("fetch_transcript", RunnableLambda(fetch_transcript_data))
-workflow.add_node("fetch_website", RunnableLambda(fetch_website_data))
-workflow.add_node("fetch_resources", RunnableLambda(fetch_resources_data))
-workflow.add_node("generate_analysis", RunnableLambda(generate_final_analysis))
-
-workflow.set_entry_point("extract_intent")
-
-def route_after_validation(state: AnalysisState) -> str:
-    """Route to data fetching based on analysis type"""
-    if state.get("error_message"):
-        return "generate_analysis"
-    
-    analysis_type = state.get("analysis_type")
-    
-    if analysis_type in [AnalysisType.FINANCIAL]:
-        return "fetch_financial"
-    elif analysis_type == AnalysisType.NEWS:
-        return "fetch_news"
-    elif analysis_type == AnalysisType.TRANSCRIPT:
-        return "fetch_transcript"
-    elif analysis_type == AnalysisType.WEBSITE:
-        return "fetch_website"
-    elif analysis_type == AnalysisType.RESOURCES:
-        return "fetch_resources"
-    else:
-        return "fetch_financial"
-
-
-workflow.add_edge("extract_intent", "validate")
-
-workflow.add_conditional_edges(
-    "validate",
-    route_after_validation,
-    {
-        "fetch_financial": "fetch_financial",
-        "fetch_news": "fetch_news",
-        "fetch_transcript": "fetch_transcript",
-        "fetch_website": "fetch_website",
-        "fetch_resources": "fetch_resources",
-        "generate_analysis": "generate_analysis"
-    }
-)
-
-workflow.add_edge("fetch_financial", "fetch_news")
-workflow.add_edge("fetch_news", "fetch_transcript")
-workflow.add_edge("fetch_transcript", "generate_analysis")
-
-
-workflow.add_edge("generate_analysis", END)
-
-financial_analyst = workflow.compile()
-
-def analyze_query(query: str) -> str:
-    """
-    Main function to analyze user queries
-    """
-    try:
-        result = financial_analyst.invoke(
-            {"user_query": query},
-            RunnableConfig(recursion_limit=50)
-        )
-        
-        return result.get("final_output", "No analysis results available")
-        
-    except Exception as e:
-        return f"Error processing your query: {str(e)}"
-
-
-# if __name__ == "__main__":
-#     while True:
-#         try:
-#             user_query = input("\nEnter your query (or 'quit' to exit): ").strip()
-            
-#             if user_query.lower() in ['quit', 'exit', 'q']:
-#                 print("Thank you for using the Financial Analysis Agent!")
-#                 break
-            
-#             if not user_query:
-#                 print("Please enter a valid query.")
-#                 continue
-            
-#             print(f"\nAnalyzing: {user_query}")
-#             print("Processing...")
-            
-#             result = analyze_query(user_query)
-#             print(f"\nAnalysis Result:")
-#             print("-" * 50)
-#             print(result)
-#             print("=" * 70)
-            
-#         except KeyboardInterrupt:
-#             print("\nAnalysis interrupted by user.")
-#             break
-#         except Exception as e:
-#             print(f"Error: {str(e)}")
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Annotated, Callable, Dict, TypedDict, Optional, List, Any, Tuple
+from enum import Enum
+from agent.cache import record_company_queries
+from agent.artifacts import (
+    externalize,
+    resolve,
+    artifacts_available,
+    payload_size,
+    meter_add,
+    meter_release,
+    request_memory
+)
+from agent.checkpoints import get_checkpointer, touch_thread, thread_config
+from agent.ledger import ledger_outcome, request_ledger
+from agent.lookup import answer_lookup, parse_lookup
+from agent.profiling import profile_session, profiled_node
+from config.settings import settings
+from agent.intent import classify_query
+from agent.deadlines import (
+    request_deadline,
+    stage_budget,
+    run_with_budget,
+    merge_missing_sections
+)
+from agent.tools import (
+    COMPANIES,
+    NEWS_MAX_RESULTS,
+    warmup_clients,
+    get_company_news,
+    tavily_extract_financial_data,
+    tavily_crawl_company_websites,
+    tavily_map_financial_resources,
+    get_transcript_data,
+    get_transcript_excerpts,
+    get_transcript_changes,
+    generate_comprehensive_analysis,
+    generate_comparative_analysis,
+    generate_screening_commentary
+)
+from agent.screening import screen_companies
+
+class AnalysisType(str, Enum):
+    FINANCIAL = "financial"
+    NEWS = "news"
+    TRANSCRIPT = "transcript"
+    WEBSITE = "website"
+    RESOURCES = "resources"
+    FULL = "full"
+    COMPARATIVE = "comparative"
+    SCREENING = "screening"
+
+class AnalysisState(TypedDict):
+    user_query: str
+    companies: List[str]
+    analysis_type: Optional[AnalysisType]
+    data_sources: Optional[List[str]]
+    focus: Optional[str]
+    history: Optional[int]
+    company_configs: Optional[List[Dict]]
+    financial_data: Optional[Dict]
+    news_data: Optional[Dict]
+    transcript_data: Optional[Dict]
+    website_data: Optional[Dict]
+    resources_data: Optional[Dict]
+    final_output: Optional[str]
+    error_message: Optional[str]
+    deadline: Optional[float]
+    missing_sections: Annotated[List[str], merge_missing_sections]
+
+def extract_companies_and_analysis_type(state: AnalysisState) -> Dict[str, Any]:
+    """
+    Extract companies, needed data sources and analysis type from user query
+    """
+    intent = classify_query(state["user_query"], COMPANIES, settings.transcript_history_quarters)
+    company_configs = intent["company_configs"]
+    
+    # Follow-ups such as "now just the news" keep the previous turn's companies
+    if not company_configs and state.get("company_configs"):
+        company_configs = state["company_configs"]
+    detected_companies = [config["name"] for config in company_configs]
+    
+    record_company_queries(detected_companies)
+    
+    return {
+        "companies": detected_companies,
+        "company_configs": company_configs,
+        "data_sources": intent["data_sources"],
+        "focus": intent["focus"],
+        "history": intent["history"],
+        "analysis_type": AnalysisType(intent["analysis_type"])
+    }
+
+def validate_request(state: AnalysisState) -> Dict[str, str]:
+    """
+    Validate if the request can be processed
+    """
+    if not state.get("company_configs") or len(state["company_configs"]) == 0:
+        available_companies = ", ".join([config["name"] for config in COMPANIES.values()])
+        return {
+            "error_message": f"No supported companies detected in your query. "
+                          f"Supported companies: {available_companies}. "
+                          f"Please mention one or more of these companies in your query."
+        }
+    
+    return {}
+
+def is_reusable(state: AnalysisState, stage: str, result: Any) -> bool:
+    """
+    Whether data fetched in an earlier turn of the conversation can be used
+    as is. Transcript excerpts depend on the question, so they never are;
+    call-to-call changes are reused only for questions about changes.
+    """
+    if not isinstance(result, dict) or "error" in result or not artifacts_available(result):
+        return False
+    if time.time() - result.get("fetched_at", 0) > settings.conversation_data_max_age:
+        return False
+    if stage == "transcript":
+        if state.get("history"):
+            return "changes" in result and len(result["quarters"]) >= state["history"]
+        return not state.get("focus") and "transcript_summary" in result
+    return True
+
+def companies_to_fetch(state: AnalysisState, stage: str) -> List[Dict]:
+    """Company configs whose data for a stage is missing or stale"""
+    previous = state.get(f"{stage}_data") or {}
+    return [
+        config for config in state["company_configs"]
+        if not is_reusable(state, stage, previous.get(config["name"]))
+    ]
+
+def fetch_for_companies(state: AnalysisState, stage: str, fetch: Callable[[Dict], Dict]) -> Dict[str, Any]:
+    """
+    Fetch one data source for every company within the stage budget.
+    Data still fresh from an earlier turn of the conversation is kept and
+    large payloads are stored as artifact references.
+    Companies whose fetch misses the budget are recorded in missing_sections.
+    """
+    tasks = {
+        config["name"]: (lambda config=config: fetch(config))
+        for config in companies_to_fetch(state, stage)
+    }
+    results, missed = run_with_budget(tasks, stage_budget(state, stage)) if tasks else ({}, [])
+    
+    for name, result in list(results.items()):
+        if isinstance(result, dict):
+            # Large payloads go to the artifact store; the state keeps references
+            result = externalize(result)
+            result.setdefault("fetched_at", time.time())
+            if "error" in result:
+                result.setdefault("success", False)
+            meter_add(payload_size(result))
+            results[name] = result
+    
+    update = {f"{stage}_data": {**(state.get(f"{stage}_data") or {}), **results}}
+    if missed:
+        update["missing_sections"] = [f"{stage}:{name}" for name in missed]
+    return update
+
+STAGE_FETCHERS: Dict[str, Callable[[Dict], Dict]] = {
+    "financial": tavily_extract_financial_data,
+    "news": lambda config: get_company_news(config, max_results=NEWS_MAX_RESULTS),
+    "transcript": get_transcript_data,
+    "website": lambda config: tavily_crawl_company_websites(config, max_depth=2),
+    "resources": tavily_map_financial_resources
+}
+
+def fetch_financial_data(state: AnalysisState) -> Dict[str, Any]:
+    """
+    Fetch financial data for companies using Tavily Extract
+    """
+    if "financial" not in (state.get("data_sources") or []):
+        return {}
+    
+    return fetch_for_companies(state, "financial", STAGE_FETCHERS["financial"])
+
+def fetch_news_data(state: AnalysisState) -> Dict[str, Any]:
+    """
+    Fetch news for companies from the incremental news store
+    """
+    if "news" not in (state.get("data_sources") or []):
+        return {}
+    
+    return fetch_for_companies(state, "news", STAGE_FETCHERS["news"])
+
+def fetch_transcript_data(state: AnalysisState) -> Dict[str, Any]:
+    """
+    Fetch transcript data for companies; questions about what changed get
+    diffs of stored per-quarter summaries, narrow questions get the matching
+    transcript chunks instead of a full summary
+    """
+    if "transcript" not in (state.get("data_sources") or []):
+        return {}
+    
+    if state.get("history"):
+        return fetch_for_companies(
+            state,
+            "transcript",
+            lambda config: get_transcript_changes(config, state["history"])
+        )
+    
+    if state.get("focus"):
+        return fetch_for_companies(
+            state,
+            "transcript",
+            lambda config: get_transcript_excerpts(config, state["user_query"])
+        )
+    
+    return fetch_for_companies(state, "transcript", STAGE_FETCHERS["transcript"])
+
+def fetch_website_data(state: AnalysisState) -> Dict[str, Any]:
+    """
+    Crawl company websites using Tavily Crawl
+    """
+    if "website" not in (state.get("data_sources") or []):
+        return {}
+    
+    return fetch_for_companies(state, "website", STAGE_FETCHERS["website"])
+
+def fetch_resources_data(state: AnalysisState) -> Dict[str, Any]:
+    """
+    Map financial resources using Tavily Map
+    """
+    if "resources" not in (state.get("data_sources") or []):
+        return {}
+    
+    return fetch_for_companies(state, "resources", STAGE_FETCHERS["resources"])
+
+def missing_for_company(state: AnalysisState, company_name: str) -> List[str]:
+    """Data sources that did not arrive in time for a company"""
+    return [
+        section.split(":", 1)[0]
+        for section in state.get("missing_sections") or []
+        if section.split(":", 1)[1] == company_name
+    ]
+
+def format_missing_sections(missing_sections: List[str]) -> str:
+    """Footer listing the sections left out of the analysis"""
+    if not missing_sections:
+        return ""
+    items = "\n".join(
+        f"- {section.split(':', 1)[0]} data for {section.split(':', 1)[1]}"
+        for section in missing_sections
+    )
+    return (
+        "\n\n---\n**Partial analysis:** the following data could not be retrieved "
+        f"within the time limit and was left out:\n{items}"
+    )
+
+def analysis_text(company_name: str, result: Any) -> str:
+    """Synthesis result as text, including failures raised inside the worker pool"""
+    if isinstance(result, dict) and "error" in result:
+        return f"Error generating analysis for {company_name}: {result['error']}"
+    return result
+
+def requested_stages(state: AnalysisState, stages: List[str]) -> List[str]:
+    """
+    Stages among `stages` that this query asked for. The checkpointed state
+    still holds data from earlier turns and prefetched batch data, which
+    must not leak into an unrelated prompt.
+    """
+    data_sources = state.get("data_sources") or []
+    return [stage for stage in stages if stage in data_sources]
+
+def synthesize_company(state: AnalysisState, config: Dict, analysis_type: str, stages: List[str]) -> str:
+    """
+    Analysis for one company from the requested `stages`. Its artifacts are
+    resolved only for the duration of the call and counted against the
+    request's memory meter.
+    """
+    company_name = config["name"]
+    inputs = {
+        f"{stage}_data": resolve((state.get(f"{stage}_data") or {}).get(company_name))
+        for stage in requested_stages(state, stages)
+    }
+    size = payload_size(inputs)
+    meter_add(size)
+    try:
+        return generate_comprehensive_analysis(
+            company_config=config,
+            analysis_type=analysis_type,
+            missing_sections=missing_for_company(state, company_name),
+            user_query=state["user_query"],
+            **inputs
+        )
+    finally:
+        meter_release(size)
+
+def generate_final_analysis(state: AnalysisState) -> Dict[str, str]:
+    """
+    Generate the final analysis based on collected data
+    """
+    try:
+        if state.get("error_message"):
+            return {"final_output": state["error_message"]}
+        
+        analysis_type = state["analysis_type"]
+        company_configs = state["company_configs"]
+        synthesis_budget = stage_budget(state, "synthesis")
+        
+        if analysis_type == AnalysisType.SCREENING:
+            # Ranked locally from stored fundamentals; only the top rows go to the LLM
+            screen, missed = run_with_budget(
+                {"screen": lambda: screen_companies(state["user_query"], company_configs, generate_screening_commentary)},
+                synthesis_budget
+            )
+            if missed:
+                final_analysis = screen_companies(state["user_query"], company_configs)
+                missing_sections = ["analysis:screening commentary"]
+            else:
+                final_analysis = screen["screen"]
+                missing_sections = []
+            
+        elif analysis_type == AnalysisType.COMPARATIVE and len(company_configs) > 1:
+            tasks = {}
+            
+            for config in company_configs:
+                company_name = config["name"]
+                
+                tasks[company_name] = lambda config=config: synthesize_company(
+                    state, config, "full", ["financial", "news", "transcript"]
+                )
+            
+            # Individual analyses get most of the budget, the rest is kept for the comparison
+            analyses, missed = run_with_budget(tasks, synthesis_budget * 0.6)
+            missing_sections = [f"analysis:{name}" for name in missed]
+            
+            companies_data = [
+                {"company_name": config["name"], "analysis": analysis_text(config["name"], analyses[config["name"]])}
+                for config in company_configs
+                if config["name"] in analyses
+            ]
+            
+            comparison, comparison_missed = run_with_budget(
+                {"comparison": lambda: generate_comparative_analysis(companies_data)},
+                stage_budget(state, "synthesis")
+            )
+            
+            if comparison_missed:
+                final_analysis = "\n\n".join(data["analysis"] for data in companies_data)
+                missing_sections.append("comparison:all companies")
+            else:
+                final_analysis = analysis_text("all companies", comparison["comparison"])
+            
+        else:
+            tasks = {}
+            
+            for config in company_configs:
+                company_name = config["name"]
+                
+                tasks[company_name] = lambda config=config: synthesize_company(
+                    state, config, analysis_type, list(FETCH_NODES)
+                )
+            
+            analyses, missed = run_with_budget(tasks, synthesis_budget)
+            missing_sections = [f"analysis:{name}" for name in missed]
+            
+            final_analysis = "\n\n".join(
+                analysis_text(config["name"], analyses[config["name"]])
+                for config in company_configs
+                if config["name"] in analyses
+            )
+        
+        missing_sections = list(state.get("missing_sections") or []) + missing_sections
+        return {"final_output": final_analysis + format_missing_sections(missing_sections)}
+        
+    except Exception as e:
+        return {"final_output": f"Error generating analysis: {str(e)}"}
+
+FETCH_NODES = {
+    "financial": "fetch_financial",
+    "news": "fetch_news",
+    "transcript": "fetch_transcript",
+    "website": "fetch_website",
+    "resources": "fetch_resources"
+}
+
+def route_after_validation(state: AnalysisState) -> List[str]:
+    """
+    Fan out to the fetch nodes for the data sources the query needs,
+    skipping sources already fresh from an earlier turn
+    """
+    if state.get("error_message"):
+        return ["generate_analysis"]
+    
+    nodes = [
+        FETCH_NODES[source]
+        for source in state.get("data_sources") or []
+        if source in FETCH_NODES and companies_to_fetch(state, source)
+    ]
+    return nodes or ["generate_analysis"]
+
+
+_financial_analyst = None
+_conversation_analyst = None
+_graph_lock = threading.Lock()
+
+def build_financial_analyst(checkpointer=None):
+    """Build and compile the analysis graph, optionally with a checkpointer"""
+    from langgraph.graph import StateGraph, END
+    from langchain_core.runnables import RunnableLambda
+
+    workflow = StateGraph(AnalysisState)
+
+    workflow.add_node("extract_intent", RunnableLambda(profiled_node("extract_intent", extract_companies_and_analysis_type)))
+    workflow.add_node("validate", RunnableLambda(profiled_node("validate", validate_request)))
+    workflow.add_node("fetch_financial", RunnableLambda(profiled_node("fetch_financial", fetch_financial_data)))
+    workflow.add_node("fetch_news", RunnableLambda(profiled_node("fetch_news", fetch_news_data)))
+    workflow.add_node("fetch_transcript", RunnableLambda(profiled_node("fetch_transcript", fetch_transcript_data)))
+    workflow.add_node("fetch_website", RunnableLambda(profiled_node("fetch_website", fetch_website_data)))
+    workflow.add_node("fetch_resources", RunnableLambda(profiled_node("fetch_resources", fetch_resources_data)))
+    workflow.add_node("generate_analysis", RunnableLambda(profiled_node("generate_analysis", generate_final_analysis)))
+
+    workflow.set_entry_point("extract_intent")
+
+    workflow.add_edge("extract_intent", "validate")
+
+    workflow.add_conditional_edges(
+        "validate",
+        route_after_validation,
+        [*FETCH_NODES.values(), "generate_analysis"]
+    )
+
+    # Fetches needed by a query run in parallel and join before synthesis
+    for node in FETCH_NODES.values():
+        workflow.add_edge(node, "generate_analysis")
+
+    workflow.add_edge("generate_analysis", END)
+
+    return workflow.compile(checkpointer=checkpointer)
+
+def get_financial_analyst():
+    """Compiled analysis graph, built on first use"""
+    global _financial_analyst
+    if _financial_analyst is None:
+        with _graph_lock:
+            if _financial_analyst is None:
+                _financial_analyst = build_financial_analyst()
+    return _financial_analyst
+
+def get_conversation_analyst():
+    """Compiled analysis graph that keeps state per conversation, built on first use"""
+    global _conversation_analyst
+    if _conversation_analyst is None:
+        with _graph_lock:
+            if _conversation_analyst is None:
+                _conversation_analyst = build_financial_analyst(get_checkpointer())
+    return _conversation_analyst
+
+def warmup() -> None:
+    """Compile the graph and initialize clients ahead of the first request"""
+    get_financial_analyst()
+    get_conversation_analyst()
+    warmup_clients()
+
+def analyze_query(
+    query: str,
+    timeout: Optional[float] = None,
+    conversation_id: Optional[str] = None,
+    prefetched: Optional[Dict[str, Dict]] = None
+) -> str:
+    """
+    Main function to analyze user queries.
+    With a conversation_id the graph resumes from that conversation's
+    previous state, reusing companies and data that are still fresh.
+    prefetched maps a stage to per-company data already fetched for this
+    query (see analyze_batch); fetch nodes skip whatever it covers.
+    Simple metric lookups are answered from stored fundamentals without
+    running the graph (see agent.lookup).
+    """
+    try:
+        if settings.fast_path_enabled:
+            answer = answer_lookup(query)
+            if answer is not None:
+                return answer
+        
+        turn = {
+            "user_query": query,
+            "deadline": request_deadline(timeout),
+            "missing_sections": None,
+            "error_message": None,
+            "final_output": None
+        }
+        for stage, data in (prefetched or {}).items():
+            turn[f"{stage}_data"] = data
+        
+        with request_memory():
+            if conversation_id:
+                touch_thread(conversation_id)
+                result = get_conversation_analyst().invoke(
+                    turn,
+                    {"recursion_limit": 50, **thread_config(conversation_id)}
+                )
+            else:
+                result = get_financial_analyst().invoke(turn, {"recursion_limit": 50})
+
+        analysis_type = result.get("analysis_type")
+        ledger_outcome(
+            analysis_type.value if analysis_type else None,
+            [config["name"] for config in result.get("company_configs") or []]
+        )
+        
+        return result.get("final_output", "No analysis results available")
+        
+    except Exception as e:
+        return f"Error processing your query: {str(e)}"
+
+
+def profile_query(query: str, **kwargs: Any) -> Tuple[str, Dict[str, Any]]:
+    """
+    Run analyze_query under the sampling profiler.
+    Returns the analysis and a report with the per-node wall-clock
+    breakdown, hotspots and the path of the collapsed-stack dump.
+    """
+    with profile_session(query) as session:
+        output = analyze_query(query, **kwargs)
+
+    try:
+        dump_path = session.dump()
+    except OSError as e:
+        print(f"Could not write profile {session.id}: {e}")
+        dump_path = None
+    return output, session.report(dump_path)
+
+
+def shared_fetch_plan(queries: List[str]) -> Dict[str, Dict[str, Dict]]:
+    """
+    Unique (source, company) pairs needed by a batch of queries, as
+    stage -> {company name: config}. Focused and call-to-call transcript
+    questions are left out because their data depends on the question,
+    and metric lookups because the fast path answers them from stored
+    fundamentals.
+    """
+    plan: Dict[str, Dict[str, Dict]] = {}
+    for query in queries:
+        if settings.fast_path_enabled and parse_lookup(query, COMPANIES) is not None:
+            continue
+        intent = classify_query(query, COMPANIES, settings.transcript_history_quarters)
+        for source in intent["data_sources"]:
+            if source == "transcript" and (intent["focus"] or intent["history"]):
+                continue
+            for config in intent["company_configs"]:
+                plan.setdefault(source, {})[config["name"]] = config
+    return plan
+
+def analyze_batch(
+    queries: List[str],
+    conversation_ids: Optional[List[Optional[str]]] = None,
+    timeout: Optional[float] = None,
+    concurrency: Optional[int] = None
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Analyze many queries, fetching each (company, source) pair they need
+    once up front. Each query then runs through the graph with that data
+    already in its state, so only its synthesis is per query. Queries run
+    `concurrency` (default settings.batch_concurrency) at a time; provider
+    limits still apply through the rate limiters. Queries sharing a
+    conversation run one after another, in order, so each turn resumes
+    from the previous one's checkpoint.
+    Returns each query's analysis with its execution record. Shared
+    fetches are not part of any query's record.
+    """
+    conversation_ids = conversation_ids or [None] * len(queries)
+    plan = shared_fetch_plan(queries)
+    state = {"deadline": request_deadline(timeout)}
+    
+    def fetch_stage(stage: str) -> Dict[str, Dict]:
+        stage_state = {**state, "company_configs": list(plan[stage].values())}
+        return fetch_for_companies(stage_state, stage, STAGE_FETCHERS[stage])[f"{stage}_data"]
+    
+    with ThreadPoolExecutor(max_workers=max(1, len(plan)), thread_name_prefix="batch-fetch") as pool:
+        shared = dict(zip(plan, pool.map(fetch_stage, plan)))
+    
+    def analyze_one(query: str, conversation_id: Optional[str]) -> Tuple[str, Dict[str, Any]]:
+        with request_ledger() as ledger:
+            output = analyze_query(query, timeout, conversation_id, prefetched=shared)
+        return output, ledger.record()
+    
+    # Queries without a conversation are independent; the rest are grouped per conversation
+    groups: Dict[Any, List[int]] = {}
+    for index, conversation_id in enumerate(conversation_ids):
+        groups.setdefault(conversation_id if conversation_id else ("query", index), []).append(index)
+    
+    results: List[Optional[Tuple[str, Dict[str, Any]]]] = [None] * len(queries)
+    
+    def analyze_group(indexes: List[int]) -> None:
+        for index in indexes:
+            results[index] = analyze_one(queries[index], conversation_ids[index])
+    
+    with ThreadPoolExecutor(max_workers=max(1, concurrency or settings.batch_concurrency), thread_name_prefix="batch") as pool:
+        list(pool.map(analyze_group, groups.values()))
+    return results
+
+
+# if __name__ == "__main__":
+#     while True:
+#         try:
+#             user_query = input("\nEnter your query (or 'quit' to exit): ").strip()
+            
+#             if user_query.lower() in ['quit', 'exit', 'q']:
+#                 print("Thank you for using the Financial Analysis Agent!")
+#                 break
+            
+#             if not user_query:
+#                 print("Please enter a valid query.")
+#                 continue
+            
+#             print(f"\nAnalyzing: {user_query}")
+#             print("Processing...")
+            
+#             result = analyze_query(user_query)
+#             print(f"\nAnalysis Result:")
+#             print("-" * 50)
+#             print(result)
+#             print("=" * 70)
+            
+#         except KeyboardInterrupt:
+#             print("\nAnalysis interrupted by user.")
+#             break
+#         except Exception as e:
+#             print(f"Error: {str(e)}")
@@ -0,0 +1,311 @@
+"""
+Columnar store of company fundamentals.
+
+Each screener extract is parsed into quarterly and annual tables
+(periods x metrics) plus the headline ratios. The tables are merged into
+what is already stored for the company: new periods are appended, and
+values from the newer extract replace older ones. Each table is saved
+as a float64 NumPy array under data_dir/fundamentals/<symbol>/, with an
+index.json describing its periods and metric names, and is read back
+memory-mapped. Every merge writes a new versioned array file named in
+the index, so swapping the index publishes periods, metrics and values
+together. Trends and CAGR are then computed from local arrays
+instead of being left to the LLM.
+"""
+import json
+import math
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.settings import settings
+
+QUARTERLY = "quarterly"
+ANNUAL = "annual"
+
+# Months between consecutive periods of each table
+PERIOD_MONTHS = {QUARTERLY: 3, ANNUAL: 12}
+
+# Screener sections and the table they belong to
+SECTION_FREQUENCIES = {
+    "quarterly results": QUARTERLY,
+    "profit & loss": ANNUAL,
+    "balance sheet": ANNUAL,
+    "cash flows": ANNUAL,
+    "ratios": ANNUAL,
+}
+
+MONTHS = {
+    month: index + 1
+    for index, month in enumerate(["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"])
+}
+
+SECTION_PATTERN = re.compile(r"^#+\s*(.+?)\s*$")
+PERIOD_PATTERN = re.compile(r"^([A-Za-z]{3})\w*\s+(\d{4})$")
+RATIO_PATTERN = re.compile(r"^[*-]\s*(.+?)\s+(?:₹\s*)?(-?[\d,]+(?:\.\d+)?)\s*(%|Cr\.?)?\s*$")
+
+
+def metric_key(label: str) -> str:
+    """Stable metric name for a row or ratio label, e.g. "Net Profit +" -> "net_profit", "Stock P/E" -> "stock_pe" """
+    label = label.replace("&", "and").replace("/", "").replace("%", " pct")
+    return re.sub(r"[^a-z0-9]+", "_", label.lower()).strip("_")
+
+
+def parse_number(text: str) -> float:
+    text = text.replace(",", "").replace("%", "").strip()
+    try:
+        return float(text)
+    except ValueError:
+        return math.nan
+
+
+def parse_period(label: str) -> Optional[int]:
+    """Period label such as "Mar 2024" as 202403; None for TTM and other labels"""
+    match = PERIOD_PATTERN.match(label.strip())
+    if not match or match.group(1).lower() not in MONTHS:
+        return None
+    return int(match.group(2)) * 100 + MONTHS[match.group(1).lower()]
+
+
+def period_label(period: int) -> str:
+    month = [name for name, number in MONTHS.items() if number == period % 100][0]
+    return f"{month.title()} {period // 100}"
+
+
+def shift_period(period: int, months: int) -> int:
+    """Period `months` months after (or before, if negative) a YYYYMM period"""
+    index = (period // 100) * 12 + period % 100 - 1 + months
+    return (index // 12) * 100 + index % 12 + 1
+
+
+def table_cells(line: str) -> List[str]:
+    return [cell.strip() for cell in line.strip().strip("|").split("|")]
+
+
+def parse_screener(markdown: str) -> Dict[str, Any]:
+    """
+    Headline ratios and the quarterly/annual tables of a screener page:
+    {"ratios": {metric: value}, "quarterly": {period: {metric: value}}, "annual": {...}}
+    """
+    parsed: Dict[str, Any] = {"ratios": {}, QUARTERLY: {}, ANNUAL: {}}
+    frequency = None
+    periods: List[Optional[int]] = []
+
+    for line in markdown.splitlines():
+        line = line.strip()
+        section = SECTION_PATTERN.match(line)
+        if section:
+            frequency = SECTION_FREQUENCIES.get(section.group(1).lower())
+            periods = []
+            continue
+
+        if frequency and line.startswith("|"):
+            cells = table_cells(line)
+            if set("".join(cells)) <= set("-: "):
+                continue
+            if not periods:
+                periods = [parse_period(cell) for cell in cells[1:]]
+                continue
+            metric = metric_key(cells[0])
+            if not metric:
+                continue
+            for period, cell in zip(periods, cells[1:]):
+                value = parse_number(cell)
+                if period is not None and not math.isnan(value):
+                    parsed[frequency].setdefault(period, {}).setdefault(metric, value)
+            continue
+
+        ratio = RATIO_PATTERN.match(line)
+        if ratio and not frequency:
+            value = parse_number(ratio.group(2))
+            if not math.isnan(value):
+                parsed["ratios"][metric_key(ratio.group(1))] = value
+
+    return parsed
+
+
+class FundamentalsStore:
+    """Per-company period x metric arrays on disk, merged as new extracts arrive"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._indexes: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._update_lock = threading.Lock()
+
+    def _path(self, symbol: str, name: str) -> str:
+        return os.path.join(self.directory, symbol, name)
+
+    def index(self, symbol: str) -> Dict[str, Any]:
+        """Periods, metrics and ratios stored for symbol (empty if none)"""
+        with self._lock:
+            if symbol not in self._indexes:
+                try:
+                    with open(self._path(symbol, "index.json")) as f:
+                        self._indexes[symbol] = json.load(f)
+                except (FileNotFoundError, json.JSONDecodeError):
+                    return {}
+            return self._indexes[symbol]
+
+    def table(self, symbol: str, frequency: str) -> Tuple[List[int], List[str], np.ndarray]:
+        """Periods (ascending), metric names and the memory-mapped values array"""
+        while True:
+            meta = self.index(symbol).get(frequency)
+            if not meta or not meta["periods"]:
+                return [], [], np.empty((0, 0))
+            try:
+                values = np.load(self._path(symbol, meta.get("file", f"{frequency}.npy")), mmap_mode="r")
+            except FileNotFoundError:
+                # Superseded and pruned by an update since the index was read
+                if self.index(symbol).get(frequency) is meta:
+                    raise
+                continue
+            return meta["periods"], meta["metrics"], values
+
+    def update(self, symbol: str, markdown: str) -> bool:
+        """Merge a screener extract into the stored tables; returns whether anything was parsed"""
+        parsed = parse_screener(markdown)
+        if not parsed[QUARTERLY] and not parsed[ANNUAL] and not parsed["ratios"]:
+            return False
+
+        with self._update_lock:
+            os.makedirs(os.path.join(self.directory, symbol), exist_ok=True)
+            index = dict(self.index(symbol))
+            for frequency in (QUARTERLY, ANNUAL):
+                if parsed[frequency]:
+                    index[frequency] = self._merge(symbol, frequency, parsed[frequency])
+            index["ratios"] = {**index.get("ratios", {}), **parsed["ratios"]}
+            index["updated_at"] = time.time()
+
+            path = self._path(symbol, "index.json")
+            with open(f"{path}.tmp", "w") as f:
+                json.dump(index, f)
+            os.replace(f"{path}.tmp", path)
+            with self._lock:
+                self._indexes[symbol] = index
+            self._prune(symbol, index)
+        return True
+
+    def _prune(self, symbol: str, index: Dict[str, Any]) -> None:
+        """Remove array files the index no longer refers to"""
+        current = {
+            meta.get("file", f"{frequency}.npy") for frequency, meta in index.items() if frequency in (QUARTERLY, ANNUAL)
+        }
+        for name in os.listdir(os.path.join(self.directory, symbol)):
+            if name.endswith(".npy") and name not in current:
+                try:
+                    os.remove(self._path(symbol, name))
+                except OSError:
+                    # Still mapped by a reader on platforms that forbid removing it; retried next update
+                    pass
+
+    def _merge(self, symbol: str, frequency: str, rows: Dict[int, Dict[str, float]]) -> Dict[str, Any]:
+        old_periods, old_metrics, old_values = self.table(symbol, frequency)
+        version = self.index(symbol).get(frequency, {}).get("version", 0) + 1
+
+        periods = sorted(set(old_periods) | set(rows))
+        metrics = list(old_metrics) + sorted(
+            {metric for values in rows.values() for metric in values} - set(old_metrics)
+        )
+        period_index = {period: i for i, period in enumerate(periods)}
+        metric_index = {metric: j for j, metric in enumerate(metrics)}
+
+        values = np.full((len(periods), len(metrics)), np.nan)
+        if len(old_periods):
+            values[np.ix_([period_index[p] for p in old_periods], range(len(old_metrics)))] = old_values
+        for period, row in rows.items():
+            for metric, value in row.items():
+                values[period_index[period], metric_index[metric]] = value
+
+        name = f"{frequency}-{version}.npy"
+        path = self._path(symbol, name)
+        with open(f"{path}.tmp", "wb") as f:
+            np.save(f, values)
+        os.replace(f"{path}.tmp", path)
+        return {"periods": periods, "metrics": metrics, "file": name, "version": version}
+
+    def series(self, symbol: str, metric: str, frequency: str = ANNUAL) -> Tuple[List[int], np.ndarray]:
+        """Periods and values of one metric, skipping periods without a value"""
+        periods, metrics, values = self.table(symbol, frequency)
+        if metric not in metrics:
+            return [], np.empty(0)
+        column = np.asarray(values[:, metrics.index(metric)])
+        present = ~np.isnan(column)
+        return [p for p, keep in zip(periods, present) if keep], column[present]
+
+    def latest(self, symbol: str, metric: str, frequency: str = ANNUAL) -> Optional[Tuple[int, float]]:
+        periods, column = self.series(symbol, metric, frequency)
+        if not periods:
+            return None
+        return periods[-1], float(column[-1])
+
+    def cagr(self, symbol: str, metric: str, years: int) -> Optional[float]:
+        """Compound annual growth of an annual metric over the last `years` years"""
+        periods, column = self.series(symbol, metric, ANNUAL)
+        if not periods:
+            return None
+        start = dict(zip(periods, column)).get(shift_period(periods[-1], -12 * years))
+        end = column[-1]
+        if start is None or start <= 0 or end <= 0:
+            return None
+        return float((end / start) ** (1 / years) - 1)
+
+    def growth(self, symbol: str, metric: str, frequency: str = QUARTERLY, lag: int = 1,
+               period: Optional[int] = None) -> Optional[float]:
+        """
+        Change of the value for `period` (the latest by default) against
+        `lag` periods earlier (4 quarters for YoY). The earlier period is
+        found by date, so a period missing from the history gives None
+        rather than a comparison against the wrong one.
+        """
+        periods, column = self.series(symbol, metric, frequency)
+        if not periods:
+            return None
+        values = dict(zip(periods, column))
+        period = periods[-1] if period is None else period
+        current = values.get(period)
+        earlier = values.get(shift_period(period, -lag * PERIOD_MONTHS[frequency]))
+        if current is None or earlier is None or earlier == 0:
+            return None
+        return float(current / earlier - 1)
+
+# Metrics summarized for the synthesis prompt
+TREND_METRICS = ["revenue", "sales", "operating_profit", "net_profit", "eps_in_rs", "borrowings"]
+
+
+def format_fundamentals_context(symbol: str) -> str:
+    """Growth figures computed from stored history, one line per metric"""
+    store = get_fundamentals_store()
+    lines = []
+    for metric in TREND_METRICS:
+        latest = store.latest(symbol, metric, ANNUAL)
+        if latest is None:
+            continue
+        parts = [f"latest annual {period_label(latest[0])} = {latest[1]:,.0f}"]
+        for years in (3, 5):
+            rate = store.cagr(symbol, metric, years)
+            if rate is not None:
+                parts.append(f"{years}y CAGR {rate:.1%}")
+        quarter = store.latest(symbol, metric, QUARTERLY)
+        if quarter is not None:
+            parts.append(f"latest quarter {period_label(quarter[0])} = {quarter[1]:,.0f}")
+            for label, lag in (("QoQ", 1), ("YoY", 4)):
+                rate = store.growth(symbol, metric, QUARTERLY, lag)
+                if rate is not None:
+                    parts.append(f"{label} {rate:+.1%}")
+        lines.append(f"- {metric.replace('_', ' ').title()}: " + ", ".join(parts))
+    return "\n".join(lines)
+
+
+_fundamentals_store: Optional[FundamentalsStore] = None
+
+
+def get_fundamentals_store() -> FundamentalsStore:
+    global _fundamentals_store
+    if _fundamentals_store is None:
+        _fundamentals_store = FundamentalsStore(os.path.join(settings.data_dir, "fundamentals"))
+    return _fundamentals_store
@@ -0,0 +1,191 @@
+"""
+Local query classification.
+
+classify_query() works out which companies a question is about and which
+data sources it actually needs, so the graph only runs those fetches.
+Keywords are matched on word boundaries (so "vs" no longer fires inside
+other words) and a question may need several sources at once. Questions
+that are neither broad nor comparative keep their remaining topic words as
+a focus, which lets narrow transcript questions use retrieval instead of a
+full summary.
+"""
+import re
+from typing import Dict, List, Optional
+
+from agent.retrieval import tokenize
+
+FINANCIAL = "financial"
+NEWS = "news"
+TRANSCRIPT = "transcript"
+WEBSITE = "website"
+RESOURCES = "resources"
+
+DATA_SOURCES = [FINANCIAL, NEWS, TRANSCRIPT, WEBSITE, RESOURCES]
+
+# Sources fetched for broad questions ("full analysis", "should I invest")
+BROAD_SOURCES = [FINANCIAL, NEWS, TRANSCRIPT]
+# Sources fetched when a question names a company but no specific need
+DEFAULT_SOURCES = [FINANCIAL, NEWS]
+
+SOURCE_PATTERNS: Dict[str, List[str]] = {
+    FINANCIAL: [
+        r"financials?", r"ratios?", r"balance sheet", r"p/?e", r"pe ratio", r"roe", r"roce", r"eps",
+        r"revenue", r"sales", r"profits?", r"margins?", r"debt", r"borrowings?", r"valuation",
+        r"dividends?", r"cash ?flows?", r"market cap", r"book value", r"quarterly results", r"results",
+        r"earnings per share", r"net income", r"cagr", r"growth",
+    ],
+    NEWS: [
+        r"news", r"headlines?", r"latest", r"recent developments?", r"announcements?", r"sentiment",
+        r"stock price movement", r"share price movement", r"today", r"this week", r"happening",
+    ],
+    TRANSCRIPT: [
+        r"transcripts?", r"earnings calls?", r"concalls?", r"con-calls?", r"conference calls?",
+        r"management (?:commentary|said|say|says|tone|guidance)", r"guidance", r"analyst calls?",
+        r"q&a", r"what did management",
+    ],
+    WEBSITE: [r"websites?", r"crawl", r"investor relations pages?"],
+    RESOURCES: [r"resources", r"map", r"documents", r"filings?", r"annual reports?"],
+}
+
+BROAD_PATTERNS = [
+    r"full", r"complete", r"comprehensive", r"overall", r"everything", r"deep dive",
+    r"invest(?:ment|ing)?", r"buy", r"sell", r"hold", r"recommend(?:ation)?s?", r"outlook",
+]
+
+SCREENING_PATTERNS = [
+    r"rank(?:ed|ing|s)?", r"screen(?:ing)?", r"top \d+", r"sort(?:ed)? by", r"shortlist",
+    r"which compan(?:y|ies)", r"highest", r"lowest",
+]
+
+# Questions about how earnings calls changed over time
+CHANGE_PATTERNS = [
+    r"what(?:'s| has| have)? changed", r"changes?", r"since (?:the )?(?:last|previous|prior) (?:call|concall|quarter)",
+    r"(?:compared|relative) (?:to|with) (?:the )?(?:last|previous|prior) (?:call|concall|quarter)",
+    r"quarter[- ]over[- ]quarter", r"qoq", r"shift(?:ed)? in (?:tone|guidance)", r"over the (?:last|past) \d+ (?:calls|quarters)",
+    r"across (?:calls|quarters)", r"trend in (?:guidance|tone|commentary)",
+]
+CALL_COUNT_PATTERN = re.compile(r"(?:last|past) (\d+) (?:calls|quarters|concalls)")
+
+COMPARATIVE_PATTERNS = [r"compare", r"comparison", r"comparative", r"vs\.?", r"versus", r"better than"]
+
+ALL_COMPANIES_PATTERNS = [r"all", r"every company", r"all companies"]
+
+# Words that ask for a kind of answer rather than name a topic
+GENERIC_WORDS = frozenset("""
+analysis analyse analyze summary summarise summarize overview details detail insights insight key
+highlights takeaways give show tell please say said says mention mentioned discuss discussed talk
+talked comment comments commentary company latest last recent quarter quarterly call calls q1 q2 q3 q4
+""".split())
+
+
+def _compile(patterns: List[str]) -> re.Pattern:
+    return re.compile(r"(?<![\w/])(?:" + "|".join(patterns) + r")(?![\w/])")
+
+
+_SOURCE_REGEXES = {source: _compile(patterns) for source, patterns in SOURCE_PATTERNS.items()}
+_BROAD_REGEX = _compile(BROAD_PATTERNS)
+_SCREENING_REGEX = _compile(SCREENING_PATTERNS)
+_CHANGE_REGEX = _compile(CHANGE_PATTERNS)
+_COMPARATIVE_REGEX = _compile(COMPARATIVE_PATTERNS)
+_ALL_COMPANIES_REGEX = _compile(ALL_COMPANIES_PATTERNS)
+
+
+def _company_regex(config: Dict) -> re.Pattern:
+    terms = [config["symbol"], config["name"], *config["search_terms"]]
+    return _compile([re.escape(term.lower()) for term in terms])
+
+
+def detect_companies(query: str, companies: Dict[str, Dict]) -> List[Dict]:
+    """Company configs mentioned in the query, in registry order"""
+    lowered = query.lower()
+    return [config for config in companies.values() if _company_regex(config).search(lowered)]
+
+
+def detect_sources(query: str) -> List[str]:
+    """Data sources explicitly asked for, in DATA_SOURCES order"""
+    lowered = query.lower()
+    return [source for source in DATA_SOURCES if _SOURCE_REGEXES[source].search(lowered)]
+
+
+def remove_companies(text: str, company_configs: List[Dict]) -> str:
+    """Lowercased text with mentions of the given companies blanked out"""
+    lowered = text.lower()
+    for config in company_configs:
+        lowered = _company_regex(config).sub(" ", lowered)
+    return lowered
+
+
+def detect_focus(query: str, company_configs: List[Dict]) -> Optional[str]:
+    """Topic words left after removing company names, source keywords and filler"""
+    lowered = remove_companies(query, company_configs)
+    for regex in _SOURCE_REGEXES.values():
+        lowered = regex.sub(" ", lowered)
+    terms = [term for term in tokenize(lowered) if term not in GENERIC_WORDS and not term.isdigit()]
+    return " ".join(terms) or None
+
+
+def detect_history(query: str, sources: List[str], max_quarters: int) -> int:
+    """
+    Number of earnings calls to compare for "what changed" questions, or 0.
+    Only applies when the question is about calls, or names no source at all.
+    """
+    lowered = query.lower()
+    if not _CHANGE_REGEX.search(lowered) or (sources and TRANSCRIPT not in sources):
+        return 0
+    count = CALL_COUNT_PATTERN.search(lowered)
+    return max(2, min(max_quarters, int(count.group(1)) if count else 2))
+
+
+def classify_query(query: str, companies: Dict[str, Dict], max_history: int = 4) -> Dict:
+    """
+    Companies, data sources, analysis type and focus for a query.
+    analysis_type is "screening" for ranking or filtering questions across
+    companies, a single source name when exactly one source is needed,
+    "comparative" for multi-company comparisons and "full" otherwise.
+    focus is None for broad, screening and comparative questions.
+    history is the number of earnings calls to compare for questions about
+    what changed between calls (0 otherwise).
+    """
+    lowered = query.lower()
+    company_configs = detect_companies(query, companies)
+
+    # Screens run over the named companies, or the whole universe, from stored fundamentals
+    if _SCREENING_REGEX.search(lowered) and len(company_configs) != 1:
+        return {
+            "company_configs": company_configs or list(companies.values()),
+            "data_sources": [FINANCIAL],
+            "analysis_type": "screening",
+            "focus": None,
+            "history": 0,
+        }
+
+    comparative = bool(_COMPARATIVE_REGEX.search(lowered))
+    broad = bool(_BROAD_REGEX.search(lowered))
+
+    if not company_configs and (comparative or _ALL_COMPANIES_REGEX.search(lowered)):
+        company_configs = list(companies.values())
+
+    sources = detect_sources(query)
+    history = detect_history(query, sources, max_history)
+    if history and not sources:
+        sources = [TRANSCRIPT]
+    if broad:
+        sources = sources + [source for source in BROAD_SOURCES if source not in sources]
+    if not sources:
+        sources = list(DEFAULT_SOURCES)
+
+    if comparative and len(company_configs) > 1 and not set(sources) & {WEBSITE, RESOURCES}:
+        analysis_type = "comparative"
+    elif len(sources) == 1:
+        analysis_type = sources[0]
+    else:
+        analysis_type = "full"
+
+    return {
+        "company_configs": company_configs,
+        "data_sources": sources,
+        "analysis_type": analysis_type,
+        "focus": None if broad or history or analysis_type == "comparative" else detect_focus(query, company_configs),
+        "history": history,
+    }
+
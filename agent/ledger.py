@@ -0,0 +1,113 @@
+"""
+Per-request execution ledger.
+
+The service opens a ledger around each analysis with request_ledger().
+While it is active, graph nodes report their wall-clock time, limited_call
+reports upstream calls, the model router reports tokens per model and the
+tool and page caches report hits and misses. record() returns the summary
+that is stored on the AI message (see models.conversation.ExecutionRecord).
+"""
+import contextvars
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+_ledger: contextvars.ContextVar = contextvars.ContextVar("execution_ledger", default=None)
+
+
+class ExecutionLedger:
+    """What one analysis spent: time per node, upstream calls, tokens and cache use"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total_ms = 0.0
+        self.analysis_type: Optional[str] = None
+        self.companies: List[str] = []
+        self.nodes_ms: Dict[str, float] = defaultdict(float)
+        self.upstream_calls: Counter = Counter()
+        self.tokens: Dict[str, Dict[str, int]] = defaultdict(lambda: {"input": 0, "output": 0, "calls": 0})
+        self.cache_hits: Counter = Counter()
+        self.cache_misses: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def add_node(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.nodes_ms[name] += seconds * 1000
+
+    def add_upstream(self, key: str) -> None:
+        with self._lock:
+            self.upstream_calls[key] += 1
+
+    def add_tokens(self, model: str, input_tokens: int, output_tokens: int) -> None:
+        with self._lock:
+            usage = self.tokens[model]
+            usage["input"] += input_tokens
+            usage["output"] += output_tokens
+            usage["calls"] += 1
+
+    def add_cache(self, name: str, hit: bool) -> None:
+        with self._lock:
+            (self.cache_hits if hit else self.cache_misses)[name] += 1
+
+    def record(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "total_ms": round(self.total_ms, 1),
+                "analysis_type": self.analysis_type,
+                "companies": list(self.companies),
+                "nodes_ms": {name: round(ms, 1) for name, ms in self.nodes_ms.items()},
+                "upstream_calls": dict(self.upstream_calls),
+                "tokens": {model: dict(usage) for model, usage in self.tokens.items()},
+                "cache_hits": dict(self.cache_hits),
+                "cache_misses": dict(self.cache_misses),
+            }
+
+
+@contextmanager
+def request_ledger() -> Iterator[ExecutionLedger]:
+    """Record the execution of the analysis running in this context"""
+    ledger = ExecutionLedger()
+    token = _ledger.set(ledger)
+    try:
+        yield ledger
+    finally:
+        ledger.total_ms = (time.perf_counter() - ledger.started) * 1000
+        _ledger.reset(token)
+
+
+def current_ledger() -> Optional[ExecutionLedger]:
+    return _ledger.get()
+
+
+def ledger_node(name: str, seconds: float) -> None:
+    ledger = _ledger.get()
+    if ledger is not None:
+        ledger.add_node(name, seconds)
+
+
+def ledger_upstream(key: str) -> None:
+    ledger = _ledger.get()
+    if ledger is not None:
+        ledger.add_upstream(key)
+
+
+def ledger_tokens(model: str, input_tokens: int, output_tokens: int) -> None:
+    ledger = _ledger.get()
+    if ledger is not None:
+        ledger.add_tokens(model, input_tokens, output_tokens)
+
+
+def ledger_cache(name: str, hit: bool) -> None:
+    ledger = _ledger.get()
+    if ledger is not None:
+        ledger.add_cache(name, hit)
+
+
+def ledger_outcome(analysis_type: Optional[str], companies: List[str]) -> None:
+    """What the analysis turned out to be about, once the graph has run"""
+    ledger = _ledger.get()
+    if ledger is not None:
+        ledger.analysis_type = analysis_type
+        ledger.companies = companies
@@ -0,0 +1,211 @@
+"""
+Deterministic answers to simple metric lookups.
+
+Questions such as "what is PFC's P/E" or "REC net profit last quarter"
+name one company, one or more known metrics and at most a period, and
+nothing else. answer_lookup() recognizes them and answers from the
+fundamentals store (see agent.fundamentals) with a templated response.
+The graph and the models are not involved. Anything with words left over
+after removing the company, metrics, period and filler is treated as
+open-ended and returns None, so the caller runs the full analysis.
+"""
+import re
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from agent.fundamentals import ANNUAL, QUARTERLY, get_fundamentals_store, parse_period, period_label
+from agent.intent import detect_companies, remove_companies
+from agent.ledger import ledger_outcome
+from agent.retrieval import tokenize
+from agent.tools import COMPANIES, tavily_extract_financial_data
+from config.settings import settings
+
+RATIO = "ratio"
+
+# Question pattern -> label, where to look it up (table, metric key) in order, and unit
+METRICS: List[Tuple[str, str, List[Tuple[str, str]], str]] = [
+    (r"p/?e(?: ratio)?|price to earnings", "Stock P/E", [(RATIO, "stock_pe")], ""),
+    (r"roce", "ROCE", [(RATIO, "roce")], "%"),
+    (r"roe|return on equity", "ROE", [(RATIO, "roe")], "%"),
+    (r"market cap(?:italisation|italization)?|mcap", "Market Cap", [(RATIO, "market_cap")], "cr"),
+    (r"(?:current |share |stock )price|cmp", "Current Price", [(RATIO, "current_price")], "rs"),
+    (r"book value", "Book Value", [(RATIO, "book_value")], "rs"),
+    (r"dividend yield", "Dividend Yield", [(RATIO, "dividend_yield")], "%"),
+    (r"face value", "Face Value", [(RATIO, "face_value")], "rs"),
+    (r"revenue|sales|top ?line", "Revenue", [(None, "revenue"), (None, "sales")], "cr"),
+    (r"operating profit|ebitda", "Operating Profit", [(None, "operating_profit")], "cr"),
+    (r"net profit|profit after tax|pat|bottom ?line|profits?", "Net Profit", [(None, "net_profit")], "cr"),
+    (r"expenses|costs", "Expenses", [(None, "expenses")], "cr"),
+    (r"eps|earnings per share", "EPS", [(None, "eps_in_rs")], "rs"),
+    (r"borrowings?|debt", "Borrowings", [(None, "borrowings")], "cr"),
+    (r"reserves", "Reserves", [(None, "reserves")], "cr"),
+    (r"total assets", "Total Assets", [(None, "total_assets")], "cr"),
+]
+
+QUARTER_PATTERN = r"(?:last|latest|this|previous|recent|most recent) quarter|quarterly"
+QUARTER_NUMBER_PATTERN = r"q([1-4])"
+YEAR_PATTERN = r"(?:last|latest|this|previous|recent) (?:fiscal |financial )?year|annual(?:ly)?|full year|yearly"
+FY_PATTERN = r"fy ?(\d{2}|\d{4})"
+MONTH_YEAR_PATTERN = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]* \d{4}"
+
+# Words that may surround a lookup without making it open-ended
+FILLER_WORDS = frozenset("""
+s whats current currently value number figure figures reported report latest last recent now today
+tell show give please much ratio stock share company period stand standing level
+""".split())
+
+# Words that always need analysis, even next to a known metric
+OPEN_ENDED_WORDS = frozenset("""
+why explain analysis analyse analyze compare comparison versus vs should trend trends outlook
+good bad better worse expect forecast predict impact cause reason
+""".split())
+
+
+def _compile(pattern: str) -> re.Pattern:
+    return re.compile(r"(?<![\w/])(?:" + pattern + r")(?![\w/])")
+
+
+_METRIC_REGEXES = [(_compile(pattern), label, lookups, unit) for pattern, label, lookups, unit in METRICS]
+_QUARTER_REGEX = _compile(QUARTER_PATTERN)
+_YEAR_REGEX = _compile(YEAR_PATTERN)
+_QUARTER_NUMBER_REGEX = _compile(QUARTER_NUMBER_PATTERN)
+_FY_REGEX = _compile(FY_PATTERN)
+_MONTH_YEAR_REGEX = _compile(MONTH_YEAR_PATTERN)
+
+
+def parse_lookup(query: str, companies: Dict[str, Dict]) -> Optional[Dict]:
+    """
+    Company, metrics and period of a simple lookup, or None if the query
+    is anything more than that. period is a YYYYMM int when one is named.
+    """
+    company_configs = detect_companies(query, companies)
+    if len(company_configs) != 1:
+        return None
+
+    text = remove_companies(query, company_configs)
+    metrics = []
+    for regex, label, lookups, unit in _METRIC_REGEXES:
+        if regex.search(text):
+            metrics.append((label, lookups, unit))
+            text = regex.sub(" ", text)
+    if not metrics:
+        return None
+
+    frequency, period = None, None
+    month_year = _MONTH_YEAR_REGEX.search(text)
+    fiscal_year = _FY_REGEX.search(text)
+    quarter_number = _QUARTER_NUMBER_REGEX.search(text)
+    if month_year:
+        period = parse_period(month_year.group(0))
+    elif fiscal_year:
+        # Indian fiscal years end in March: Q1 FY25 is the quarter ended Jun 2024
+        year = int(fiscal_year.group(1))
+        year = year if year > 100 else 2000 + year
+        if quarter_number:
+            quarter = int(quarter_number.group(1))
+            period = (year - 1) * 100 + 3 + 3 * quarter if quarter < 4 else year * 100 + 3
+            frequency = QUARTERLY
+        else:
+            period = year * 100 + 3
+            frequency = ANNUAL
+    elif quarter_number:
+        # A quarter number without a fiscal year is ambiguous
+        return None
+    if _QUARTER_REGEX.search(text):
+        frequency = QUARTERLY
+    elif _YEAR_REGEX.search(text):
+        frequency = ANNUAL
+    for regex in (_MONTH_YEAR_REGEX, _FY_REGEX, _QUARTER_NUMBER_REGEX, _QUARTER_REGEX, _YEAR_REGEX):
+        text = regex.sub(" ", text)
+
+    words = tokenize(text)
+    if set(re.findall(r"[a-z]+", query.lower())) & OPEN_ENDED_WORDS or any(word not in FILLER_WORDS for word in words):
+        return None
+
+    return {"company_config": company_configs[0], "metrics": metrics, "frequency": frequency, "period": period}
+
+
+def format_value(value: float, unit: str) -> str:
+    if unit == "%":
+        return f"{value:.2f}%"
+    if unit == "cr":
+        return f"₹{value:,.0f} Cr"
+    if unit == "rs":
+        return f"₹{value:,.2f}"
+    return f"{value:,.2f}"
+
+
+def describe_metric(symbol: str, label: str, lookups: List[Tuple[Optional[str], str]], unit: str,
+                    frequency: Optional[str], period: Optional[int]) -> Optional[str]:
+    """One line answering a metric, or None if the store does not have it"""
+    store = get_fundamentals_store()
+    for table, metric in lookups:
+        if table == RATIO:
+            # Headline ratios are current values only
+            if frequency or period:
+                continue
+            value = store.index(symbol).get("ratios", {}).get(metric)
+            if value is not None:
+                return f"- {label}: {format_value(value, unit)}"
+            continue
+
+        # Flow and balance-sheet figures default to the latest quarter, then the latest year
+        for candidate in ([frequency] if frequency else [QUARTERLY, ANNUAL]):
+            periods, column = store.series(symbol, metric, candidate)
+            if not periods:
+                continue
+            if period is not None:
+                if period not in periods:
+                    continue
+                index = periods.index(period)
+            else:
+                index = len(periods) - 1
+
+            span = "quarter" if candidate == QUARTERLY else "year"
+            line = f"- {label} ({span} ended {period_label(periods[index])}): {format_value(float(column[index]), unit)}"
+            changes = []
+            for change, lag in ((("QoQ", 1), ("YoY", 4)) if candidate == QUARTERLY else (("YoY", 1),)):
+                rate = store.growth(symbol, metric, candidate, lag, periods[index])
+                if rate is not None:
+                    changes.append(f"{change} {rate:+.1%}")
+            return line + (f" ({', '.join(changes)})" if changes else "")
+    return None
+
+
+def ensure_fresh(company_config: Dict) -> Optional[float]:
+    """Time the stored fundamentals were last updated, refreshing them from the screener if stale"""
+    symbol = company_config["symbol"]
+    updated_at = get_fundamentals_store().index(symbol).get("updated_at")
+    if updated_at is None or time.time() - updated_at > settings.cache_ttl_financial:
+        tavily_extract_financial_data(company_config)
+        updated_at = get_fundamentals_store().index(symbol).get("updated_at")
+    return updated_at
+
+
+def answer_lookup(query: str) -> Optional[str]:
+    """Templated answer to a simple metric lookup, or None if the query needs the analysis graph"""
+    lookup = parse_lookup(query, COMPANIES)
+    if lookup is None:
+        return None
+
+    config = lookup["company_config"]
+    updated_at = ensure_fresh(config)
+    if updated_at is None:
+        return None
+
+    lines = []
+    for label, lookups, unit in lookup["metrics"]:
+        line = describe_metric(config["symbol"], label, lookups, unit, lookup["frequency"], lookup["period"])
+        if line is None:
+            # Leave partially answerable questions to the full analysis
+            return None
+        lines.append(line)
+
+    ledger_outcome("lookup", [config["name"]])
+    as_of = datetime.fromtimestamp(updated_at).strftime("%d %b %Y %H:%M")
+    return (
+        f"**{config['name']} ({config['symbol']})**\n\n"
+        + "\n".join(lines)
+        + f"\n\n_Figures from screener.in as of {as_of}, consolidated, ₹ Cr unless noted._"
+    )
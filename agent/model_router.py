@@ -0,0 +1,149 @@
+"""
+Latency-aware model routing with automatic fallback.
+
+Each LLM task ("synthesis", "transcript", "comparative", "news_summary")
+has an ordered list of "provider:model" candidates in settings.model_routes.
+The router keeps live statistics per model (EWMA latency per task, error
+rate and consecutive failures) and ranks candidates by expected latency,
+penalised by error rate and configured order. Models whose context is too
+small for the input are skipped, models that keep failing are rested for a
+cooldown, and small inputs are offered to the "small" route first. If a
+call fails the next candidate is tried.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from agent.ledger import ledger_tokens
+from config.settings import settings
+
+# Default maximum input tokens per model; override with settings.model_limits
+MODEL_INPUT_LIMITS: Dict[str, int] = {
+    "llama-3.3-70b-versatile": 100_000,
+    "llama-3.1-8b-instant": 100_000,
+    "gemini-2.0-flash": 900_000,
+    "gemini-2.0-flash-lite": 900_000,
+}
+
+# Latency assumed for a model before it has been observed, in seconds. It is
+# the same for every model so configured order decides until there is data.
+LATENCY_PRIOR = 3.0
+
+
+def estimate_tokens(messages: List[Any]) -> int:
+    """Rough token count of a prompt (about four characters per token)"""
+    return sum(len(str(getattr(message, "content", message))) for message in messages) // 4
+
+
+class ModelStats:
+    """Rolling per-task latency and overall error statistics for one model"""
+
+    def __init__(self):
+        self.latency: Dict[str, float] = {}
+        self.error_rate = 0.0
+        self.calls = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.rested_until = 0.0
+
+    def expected_latency(self, task: str) -> float:
+        return self.latency.get(task, LATENCY_PRIOR)
+
+    def record(self, task: str, latency: Optional[float], failed: bool) -> None:
+        alpha = settings.model_stats_alpha
+        self.calls += 1
+        self.error_rate = (1 - alpha) * self.error_rate + alpha * (1.0 if failed else 0.0)
+        if failed:
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= settings.model_failure_threshold:
+                self.rested_until = time.time() + settings.model_cooldown_seconds
+        else:
+            self.consecutive_failures = 0
+            self.latency[task] = (1 - alpha) * self.expected_latency(task) + alpha * latency
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "latency": {task: round(value, 3) for task, value in self.latency.items()},
+            "error_rate": round(self.error_rate, 3),
+            "calls": self.calls,
+            "failures": self.failures,
+            "resting": self.rested_until > time.time(),
+        }
+
+
+class ModelRouter:
+    """Chooses a model per task and falls back across candidates"""
+
+    def __init__(self):
+        self._stats: Dict[str, ModelStats] = {}
+        self._lock = threading.Lock()
+
+    def _stats_for(self, candidate: str) -> ModelStats:
+        with self._lock:
+            if candidate not in self._stats:
+                self._stats[candidate] = ModelStats()
+            return self._stats[candidate]
+
+    @staticmethod
+    def _input_limit(model: str) -> int:
+        return (settings.model_limits or {}).get(model, MODEL_INPUT_LIMITS.get(model, 30_000))
+
+    def candidates(self, task: str, input_tokens: int) -> List[Tuple[str, str]]:
+        """Candidates for a task ordered by expected cost, best first"""
+        routes = settings.model_routes
+        names = list(routes.get(task) or routes["synthesis"])
+        if input_tokens <= settings.model_small_input_tokens:
+            names = [name for name in routes.get("small", []) if name not in names] + names
+
+        now = time.time()
+        scored = []
+        for index, name in enumerate(names):
+            provider, model = name.split(":", 1)
+            if input_tokens > self._input_limit(model):
+                continue
+            stats = self._stats_for(name)
+            score = stats.expected_latency(task) * (1 + 4 * stats.error_rate) * (1 + 0.25 * index)
+            if stats.rested_until > now:
+                score += 1_000
+            scored.append((score, provider, model))
+
+        return [(provider, model) for _, provider, model in sorted(scored)]
+
+    def invoke(self, task: str, messages: List[Any], build: Callable[[str, str], Any]) -> Any:
+        """Invoke the best candidate for task, falling back to the next on failure"""
+        candidates = self.candidates(task, estimate_tokens(messages))
+        if not candidates:
+            raise ValueError(f"No model configured for task '{task}' can take this input")
+
+        last_error = None
+        for provider, model in candidates:
+            stats = self._stats_for(f"{provider}:{model}")
+            started = time.perf_counter()
+            try:
+                response = build(provider, model).invoke(messages)
+            except Exception as e:
+                with self._lock:
+                    stats.record(task, None, failed=True)
+                last_error = e
+                print(f"Model {provider}:{model} failed for {task}, falling back: {e}")
+                continue
+
+            with self._lock:
+                stats.record(task, time.perf_counter() - started, failed=False)
+            usage = getattr(response, "usage_metadata", None) or {}
+            ledger_tokens(
+                f"{provider}:{model}",
+                usage.get("input_tokens", estimate_tokens(messages)),
+                usage.get("output_tokens", len(str(getattr(response, "content", ""))) // 4)
+            )
+            return response
+
+        raise last_error
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: stats.snapshot() for name, stats in self._stats.items()}
+
+
+model_router = ModelRouter()
@@ -0,0 +1,174 @@
+"""
+Per-company news corpus with incremental ingestion.
+
+The store remembers every article URL seen for a company and when news
+was last fetched. Callers ask for the delta window since that fetch, merge
+whatever is new and read back the stored corpus, so repeated news queries
+cost one small search instead of a full 30-day re-search. Articles older
+than the retention window are dropped on every merge.
+
+Each company also has a BM25 passage index over its stored articles
+(see agent.retrieval), rebuilt only when the corpus changes, so synthesis
+can pull the passages relevant to the question instead of the first few
+articles.
+"""
+import json
+import math
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+from agent.retrieval import BM25Index, select_within_budget, split_passages
+from config.settings import settings
+
+
+def normalize_url(url: str) -> str:
+    """URL without query string, fragment or trailing slash, used for deduplication"""
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), "", ""))
+
+
+def published_timestamp(article: Dict[str, Any]) -> float:
+    """Publication time of an article, falling back to when it was fetched"""
+    published = article.get("published_date")
+    if published:
+        try:
+            return parsedate_to_datetime(published).timestamp()
+        except (TypeError, ValueError):
+            pass
+    return article.get("fetched_at", time.time())
+
+
+class NewsStore:
+    """JSON-file backed article store, one file per company symbol"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        self._indexes: Dict[str, BM25Index] = {}
+
+    def lock(self, symbol: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    def _path(self, symbol: str) -> str:
+        return os.path.join(self.directory, f"{symbol}.json")
+
+    def load(self, symbol: str) -> Dict[str, Any]:
+        try:
+            with open(self._path(symbol)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"last_fetch": None, "articles": {}}
+
+    def save(self, symbol: str, record: Dict[str, Any]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(symbol)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(record, f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def delta_days(record: Dict[str, Any], window_days: int) -> int:
+        """Days to search so the window since the last fetch is covered"""
+        if not record.get("last_fetch"):
+            return window_days
+        elapsed = time.time() - record["last_fetch"]
+        return max(1, min(window_days, math.ceil(elapsed / 86400)))
+
+    @staticmethod
+    def is_fresh(record: Dict[str, Any], max_age: float) -> bool:
+        return bool(record.get("last_fetch")) and time.time() - record["last_fetch"] < max_age
+
+    @staticmethod
+    def merge(record: Dict[str, Any], articles: List[Dict[str, Any]], retention_days: int) -> int:
+        """Add unseen articles, expire old ones and return how many were new"""
+        now = time.time()
+        stored = record.setdefault("articles", {})
+        added = 0
+
+        for article in articles:
+            url = article.get("url")
+            if not url:
+                continue
+            key = normalize_url(url)
+            if key in stored:
+                continue
+            stored[key] = {
+                "title": article.get("title", ""),
+                "url": url,
+                "content": article.get("content", ""),
+                "raw_content": (article.get("raw_content") or "")[:settings.news_raw_content_chars],
+                "published_date": article.get("published_date"),
+                "score": article.get("score"),
+                "fetched_at": now,
+            }
+            added += 1
+
+        cutoff = now - retention_days * 86400
+        for key in [key for key, article in stored.items() if published_timestamp(article) < cutoff]:
+            del stored[key]
+
+        record["last_fetch"] = now
+        return added
+
+    @staticmethod
+    def articles(record: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Stored articles, newest first"""
+        return sorted(record.get("articles", {}).values(), key=published_timestamp, reverse=True)
+
+    @staticmethod
+    def passages(record: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Stored articles split into passages for indexing"""
+        passages = []
+        for article in NewsStore.articles(record):
+            body = article.get("raw_content") or article.get("content") or ""
+            for text in split_passages(body, settings.news_passage_words):
+                passages.append({
+                    "title": article.get("title", ""),
+                    "url": article.get("url", ""),
+                    "published_date": article.get("published_date"),
+                    "text": text,
+                })
+        return passages
+
+    def index(self, symbol: str, version: Optional[float] = None) -> BM25Index:
+        """
+        Passage index for a company, rebuilt when the stored corpus has changed.
+        Passing the last_fetch the caller already knows skips reading the store.
+        """
+        index = self._indexes.get(symbol)
+        if index is not None and version is not None and index.version == version:
+            return index
+
+        with self.lock(symbol):
+            record = self.load(symbol)
+            version = record.get("last_fetch")
+            index = self._indexes.get(symbol)
+            if index is None or index.version != version:
+                path = os.path.join(self.directory, "index", symbol)
+                index = BM25Index.load(path)
+                if index is None or index.version != version:
+                    index = BM25Index.build(self.passages(record), version=version)
+                    index.save(path)
+                self._indexes[symbol] = index
+            return index
+
+    def search(self, symbol: str, query: str, token_budget: int, version: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Passages most relevant to query that fit within token_budget"""
+        return select_within_budget(self.index(symbol, version).search(query, top_k=50), token_budget)
+
+
+_news_store: Optional[NewsStore] = None
+
+
+def get_news_store() -> NewsStore:
+    global _news_store
+    if _news_store is None:
+        _news_store = NewsStore(os.path.join(settings.data_dir, "news"))
+    return _news_store
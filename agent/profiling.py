@@ -0,0 +1,237 @@
+"""
+Opt-in per-request profiling.
+
+profile_session() starts a session for the request running in the current
+context. While any session is active, one sampler thread records the
+stacks of every thread working for that session (graph nodes, stage pool
+workers and crawl workers register themselves through track_thread()) at
+settings.profile_interval_ms. Graph nodes also record their wall-clock
+time through node_scope().
+
+When the request finishes, the samples are written in collapsed-stack
+format ("frame;frame;frame count", readable by flamegraph.pl and
+speedscope) under data_dir/profiles. report() returns the node
+breakdown, the hottest functions and the dump path.
+"""
+import contextvars
+import functools
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from agent.ledger import ledger_node
+from config.settings import settings
+
+_session: contextvars.ContextVar = contextvars.ContextVar("profile_session", default=None)
+
+
+class ProfileSession:
+    """Samples and node timings collected for one request"""
+
+    def __init__(self, label: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self.nodes: Dict[str, List[float]] = defaultdict(list)
+        self._threads: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def add_thread(self, ident: int) -> None:
+        with self._lock:
+            self._threads[ident] += 1
+
+    def remove_thread(self, ident: int) -> None:
+        with self._lock:
+            self._threads[ident] -= 1
+            if self._threads[ident] <= 0:
+                del self._threads[ident]
+
+    def threads(self) -> List[int]:
+        with self._lock:
+            return list(self._threads)
+
+    def record_stack(self, stack: str) -> None:
+        with self._lock:
+            self.samples[stack] += 1
+            self.sample_count += 1
+
+    def record_node(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.nodes[name].append(seconds)
+
+    def dump(self) -> str:
+        """Write collapsed stacks and return the file path"""
+        directory = os.path.join(settings.data_dir, "profiles")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{self.id}.folded")
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+    def hotspots(self, top: int = 15) -> List[Dict[str, Any]]:
+        """
+        Project functions with the most samples anywhere on the stack, as a
+        share of all samples, with the share where they were the innermost
+        project frame (time spent in them or in libraries they called)
+        """
+        inclusive: Counter = Counter()
+        own: Counter = Counter()
+        for stack, count in self.samples.items():
+            frames = [frame for frame in stack.split(";") if frame in _project_frames]
+            if not frames:
+                continue
+            for frame in set(frames):
+                inclusive[frame] += count
+            own[frames[-1]] += count
+
+        total = max(1, self.sample_count)
+        return [
+            {
+                "function": frame,
+                "total_pct": round(100 * count / total, 1),
+                "own_pct": round(100 * own[frame] / total, 1),
+            }
+            for frame, count in inclusive.most_common(top)
+        ]
+
+    def report(self, dump_path: Optional[str] = None) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "wall_ms": round(self.elapsed * 1000, 1),
+            "nodes_ms": {
+                name: round(sum(durations) * 1000, 1)
+                for name, durations in sorted(self.nodes.items(), key=lambda item: -sum(item[1]))
+            },
+            "samples": self.sample_count,
+            "interval_ms": settings.profile_interval_ms,
+            "hotspots": self.hotspots(),
+            "flamegraph": dump_path,
+        }
+
+
+class Sampler:
+    """Background thread sampling the stacks of threads in active sessions"""
+
+    def __init__(self):
+        self._sessions: List[ProfileSession] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, session: ProfileSession) -> None:
+        with self._lock:
+            self._sessions.append(session)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+
+    def remove(self, session: ProfileSession) -> None:
+        with self._lock:
+            self._sessions.remove(session)
+
+    def _run(self) -> None:
+        interval = settings.profile_interval_ms / 1000
+        while True:
+            with self._lock:
+                sessions = list(self._sessions)
+                if not sessions:
+                    self._thread = None
+                    return
+
+            frames = sys._current_frames()
+            for session in sessions:
+                for ident in session.threads():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        session.record_stack(collapse(frame))
+            time.sleep(interval)
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Frame names of functions defined in this project, for hotspots
+_project_frames: set = set()
+
+
+def frame_name(code) -> str:
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    name = f"{module}:{code.co_name}"
+    path = os.path.abspath(code.co_filename)
+    if path.startswith(PROJECT_ROOT) and "site-packages" not in path and path != os.path.abspath(__file__):
+        _project_frames.add(name)
+    return name
+
+
+def collapse(frame) -> str:
+    """Stack of a frame as "module:function;..." from the outermost call"""
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+_sampler = Sampler()
+
+
+@contextmanager
+def profile_session(label: str = "") -> Iterator[ProfileSession]:
+    """Profile the work done for the request running in this context"""
+    session = ProfileSession(label)
+    token = _session.set(session)
+    session.add_thread(threading.get_ident())
+    _sampler.add(session)
+    try:
+        yield session
+    finally:
+        session.elapsed = time.perf_counter() - session.started
+        _sampler.remove(session)
+        session.remove_thread(threading.get_ident())
+        _session.reset(token)
+
+
+@contextmanager
+def track_thread() -> Iterator[None]:
+    """Include the current thread in the active session's samples"""
+    session = _session.get()
+    if session is None:
+        yield
+        return
+    ident = threading.get_ident()
+    session.add_thread(ident)
+    try:
+        yield
+    finally:
+        session.remove_thread(ident)
+
+
+@contextmanager
+def node_scope(name: str) -> Iterator[None]:
+    """Time a graph node for the ledger and the active session, sampling its thread while it runs"""
+    session = _session.get()
+    started = time.perf_counter()
+    with track_thread():
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            ledger_node(name, elapsed)
+            if session is not None:
+                session.record_node(name, elapsed)
+
+
+def profiled_node(name: str, fn: Callable[[Dict[str, Any]], Any]) -> Callable[[Dict[str, Any]], Any]:
+    """Graph node that reports its wall-clock time to the ledger and the active session"""
+    @functools.wraps(fn)
+    def node(state: Dict[str, Any]) -> Any:
+        with node_scope(name):
+            return fn(state)
+    return node
@@ -0,0 +1,225 @@
+"""
+Shared outbound rate limiting for Tavily and LLM providers.
+
+Every upstream call made by agent.tools goes through limited_call() with a
+key such as "tavily.search" or "gemini.gemini-2.0-flash". Each key has a
+token bucket, with limits looked up by exact key first, then by provider,
+and calls also take a token from a bucket shared by every key of the
+provider, so a provider-wide limit such as {"tavily": 5} caps searches and
+extracts together. Plain HTTP hosts are independent sites, so "http.<host>"
+keys only share a bucket when "http" is configured explicitly.
+When a call fails with 429 or 5xx the bucket halves its rate and pauses
+for the Retry-After period (or an exponential backoff), then recovers
+additively on success, so bursts of throttling do not turn into retry
+storms.
+"""
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from agent.deadlines import remaining
+from agent.ledger import ledger_upstream
+from config.settings import settings
+
+# Requests per second and burst size per provider
+DEFAULT_LIMITS: Dict[str, Tuple[float, int]] = {
+    "tavily": (5.0, 10),
+    "groq": (0.5, 5),
+    "gemini": (1.0, 5),
+    "http": (2.0, 4),
+}
+
+# Providers whose keys share a bucket only when configured in settings.rate_limits
+PER_ENDPOINT_PROVIDERS = frozenset({"http"})
+
+THROTTLE_MARKERS = ("429", "rate limit", "rate_limit", "too many requests", "resource_exhausted", "quota")
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a call could not be admitted by its limiter in time"""
+
+
+class AdaptiveTokenBucket:
+    """Token bucket whose rate shrinks on throttling and recovers on success"""
+
+    def __init__(self, rate: float, burst: int):
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.waiting = 0
+        self.throttled = 0
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._consecutive_throttles = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout: Optional[float] = None) -> None:
+        """Block until a token is available or the timeout elapses"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._lock:
+            self.waiting += 1
+        try:
+            while True:
+                with self._lock:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if now >= self._blocked_until and self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = max(self._blocked_until - now, (1 - self._tokens) / self.rate)
+
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise RateLimitTimeout("Timed out waiting for upstream rate limiter")
+                    wait = min(wait, remaining)
+                time.sleep(min(wait, 1.0))
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+    def on_success(self) -> None:
+        with self._lock:
+            self._consecutive_throttles = 0
+            self.rate = min(self.base_rate, self.rate + self.base_rate * 0.05)
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> float:
+        """Halve the rate and pause the bucket; returns the pause in seconds"""
+        with self._lock:
+            self.throttled += 1
+            self._consecutive_throttles += 1
+            self.rate = max(self.base_rate * 0.05, self.rate * 0.5)
+            backoff = min(settings.rate_limit_max_backoff, 2 ** (self._consecutive_throttles - 1))
+            pause = max(retry_after or 0.0, backoff * random.uniform(0.8, 1.2))
+            self._blocked_until = max(self._blocked_until, time.monotonic() + pause)
+            self._tokens = min(self._tokens, 0.0)
+            return pause
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "rate": round(self.rate, 3),
+                "base_rate": self.base_rate,
+                "burst": self.burst,
+                "queue_depth": self.waiting,
+                "throttled": self.throttled,
+                "paused_for": round(max(0.0, self._blocked_until - time.monotonic()), 2),
+            }
+
+
+_limiters: Dict[str, AdaptiveTokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+
+def _parse_limit(value: Any) -> Tuple[float, int]:
+    if isinstance(value, (list, tuple)):
+        return float(value[0]), int(value[1])
+    return float(value), max(1, int(value * 2))
+
+
+def _limit_for(key: str) -> Tuple[float, int]:
+    overrides = settings.rate_limits or {}
+    provider = key.split(".", 1)[0]
+    for name in (key, provider):
+        if name in overrides:
+            return _parse_limit(overrides[name])
+    return DEFAULT_LIMITS.get(provider, (1.0, 2))
+
+
+def get_limiter(key: str) -> AdaptiveTokenBucket:
+    with _limiters_lock:
+        if key not in _limiters:
+            _limiters[key] = AdaptiveTokenBucket(*_limit_for(key))
+        return _limiters[key]
+
+
+def limiters_for(key: str) -> List[AdaptiveTokenBucket]:
+    """The key's own bucket followed by its provider's shared bucket, if any"""
+    provider = key.split(".", 1)[0]
+    limiters = [get_limiter(key)]
+    if provider == key:
+        return limiters
+    if provider in (settings.rate_limits or {}) or \
+            (provider in DEFAULT_LIMITS and provider not in PER_ENDPOINT_PROVIDERS):
+        limiters.append(get_limiter(provider))
+    return limiters
+
+
+def limiter_snapshot() -> Dict[str, Dict[str, Any]]:
+    """State of every limiter, including queue depth"""
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {key: limiter.snapshot() for key, limiter in limiters.items()}
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    for candidate in (error, getattr(error, "response", None)):
+        code = getattr(candidate, "status_code", None) or getattr(candidate, "code", None)
+        if isinstance(code, int):
+            return code
+    return None
+
+
+def is_throttling_error(error: Exception) -> bool:
+    """True for 429 and 5xx responses, whatever SDK raised them"""
+    code = _status_code(error)
+    if code is not None:
+        return code == 429 or 500 <= code < 600
+    message = str(error).lower()
+    return any(marker in message for marker in THROTTLE_MARKERS)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def limited_call(key: str, fn: Callable[..., Any], *args: Any, acquire_timeout: Optional[float] = None, **kwargs: Any) -> Any:
+    """Call fn under the limiters for key, backing off and retrying on throttling"""
+    limiters = limiters_for(key)
+    attempts = max(1, settings.rate_limit_max_attempts)
+
+    for attempt in range(attempts):
+        for limiter in limiters:
+            limiter.acquire(timeout=acquire_timeout)
+        ledger_upstream(key)
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            if not is_throttling_error(e):
+                raise
+            retry_after = _retry_after(e)
+            for limiter in limiters:
+                limiter.on_throttle(retry_after)
+            if attempt == attempts - 1:
+                raise
+            continue
+
+        for limiter in limiters:
+            limiter.on_success()
+        return result
+
+
+class RateLimitedChatModel:
+    """Chat model wrapper whose invoke goes through the shared limiter"""
+
+    def __init__(self, llm: Any, key: str):
+        self.llm = llm
+        self.key = key
+
+    def invoke(self, messages: Any, *args: Any, **kwargs: Any) -> Any:
+        return limited_call(self.key, self.llm.invoke, messages, *args,
+                            acquire_timeout=remaining(settings.rate_limit_max_wait), **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.llm, name)
@@ -0,0 +1,135 @@
+"""
+BM25 retrieval over local text collections.
+
+BM25Index stores precomputed BM25 term weights as a SciPy CSR matrix
+(passages x terms), so scoring a query is a column slice and a row sum
+over the query's terms. That keeps retrieval in the millisecond range
+even for tens of thousands of passages. Indexes are saved as .npz
+matrices plus a JSON sidecar with the vocabulary and passage metadata.
+"""
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from scipy import sparse
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[./][a-z0-9]+)?")
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by can did do does for from had has have how i in into is it its
+me my of on or our so than that the their them then there these they this to was we were what
+when where which who why will with would you your about also just more most some such
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def split_passages(text: str, words_per_passage: int = 120, overlap: int = 20) -> List[str]:
+    """Split text into overlapping windows of roughly words_per_passage words"""
+    words = text.split()
+    if len(words) <= words_per_passage:
+        return [" ".join(words)] if words else []
+
+    step = max(1, words_per_passage - overlap)
+    return [
+        " ".join(words[start:start + words_per_passage])
+        for start in range(0, len(words) - overlap, step)
+    ]
+
+
+class BM25Index:
+    """Sparse BM25 index over passages with arbitrary JSON metadata"""
+
+    def __init__(self, weights: sparse.csr_matrix, vocabulary: Dict[str, int],
+                 passages: List[Dict[str, Any]], version: Any = None):
+        self.weights = weights
+        self.vocabulary = vocabulary
+        self.passages = passages
+        self.version = version
+
+    @classmethod
+    def build(cls, passages: List[Dict[str, Any]], version: Any = None,
+              k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        """Build from passages; each passage needs a "text" field"""
+        vocabulary: Dict[str, int] = {}
+        rows, cols, counts = [], [], []
+        lengths = np.zeros(len(passages), dtype=np.float32)
+
+        for row, passage in enumerate(passages):
+            tokens = tokenize(passage["text"])
+            lengths[row] = len(tokens)
+            ids, frequencies = np.unique(
+                np.fromiter((vocabulary.setdefault(token, len(vocabulary)) for token in tokens), dtype=np.int64, count=len(tokens)),
+                return_counts=True,
+            )
+            rows.append(np.full(len(ids), row, dtype=np.int64))
+            cols.append(ids)
+            counts.append(frequencies.astype(np.float32))
+
+        shape = (len(passages), max(1, len(vocabulary)))
+        if not passages or not vocabulary:
+            return cls(sparse.csr_matrix(shape, dtype=np.float32), vocabulary, passages, version)
+
+        row_ids = np.concatenate(rows)
+        tf = np.concatenate(counts)
+        term_ids = np.concatenate(cols)
+
+        document_frequency = np.bincount(term_ids, minlength=shape[1]).astype(np.float32)
+        idf = np.log1p((len(passages) - document_frequency + 0.5) / (document_frequency + 0.5))
+        average_length = max(float(lengths.mean()), 1.0)
+        norm = k1 * (1 - b + b * lengths[row_ids] / average_length)
+        data = idf[term_ids] * tf * (k1 + 1) / (tf + norm)
+
+        weights = sparse.csr_matrix((data.astype(np.float32), (row_ids, term_ids)), shape=shape)
+        return cls(weights, vocabulary, passages, version)
+
+    def search(self, query: str, top_k: int = 10) -> List[Dict[str, Any]]:
+        """Best matching passages with their scores, highest first"""
+        term_ids = sorted({self.vocabulary[token] for token in tokenize(query) if token in self.vocabulary})
+        if not term_ids or not self.passages:
+            return []
+
+        scores = np.asarray(self.weights[:, term_ids].sum(axis=1)).ravel()
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k)[:top_k]]
+        ranked = candidates[np.argsort(-scores[candidates])]
+        return [{**self.passages[index], "score": float(scores[index])} for index in ranked]
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        sparse.save_npz(f"{path}.npz", self.weights)
+        with open(f"{path}.json", "w") as f:
+            json.dump({"version": self.version, "vocabulary": self.vocabulary, "passages": self.passages}, f)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["BM25Index"]:
+        try:
+            weights = sparse.load_npz(f"{path}.npz").tocsr()
+            with open(f"{path}.json") as f:
+                meta = json.load(f)
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+        return cls(weights, meta["vocabulary"], meta["passages"], meta.get("version"))
+
+
+def select_within_budget(results: List[Dict[str, Any]], token_budget: int) -> List[Dict[str, Any]]:
+    """Take ranked passages until the token budget is spent"""
+    selected, used = [], 0
+    for result in results:
+        cost = estimate_tokens(result["text"])
+        if used + cost > token_budget:
+            continue
+        selected.append(result)
+        used += cost
+    return selected
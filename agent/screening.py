@@ -0,0 +1,253 @@
+"""
+Cross-company screening and ranking.
+
+A screening question ("rank by ROE and debt/equity", "top 3 with P/E
+below 15") is answered from the fundamentals store rather than one LLM
+synthesis per company. The metrics of every company in the universe are
+gathered into NumPy columns, filters are applied as boolean masks and
+the companies are ranked by the mean percentile of the requested metrics.
+Only the top rows are sent to the LLM, for a short commentary.
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from agent.fundamentals import ANNUAL, QUARTERLY, get_fundamentals_store
+from config.settings import settings
+
+# Metric key -> label, question pattern, whether higher ranks better, unit
+SCREEN_METRICS: Dict[str, Tuple[str, str, bool, str]] = {
+    "roe": ("ROE", r"roe|return on equity", True, "%"),
+    "roce": ("ROCE", r"roce|return on capital(?: employed)?", True, "%"),
+    "stock_pe": ("P/E", r"p/?e(?: ratio)?|price to earnings|valuation", False, "x"),
+    "price_to_book": ("P/B", r"p/?b|price to book", False, "x"),
+    "debt_equity": ("Debt/Equity", r"debt ?(?:/|to) ?equity|d/?e|leverage|debt", False, "x"),
+    "dividend_yield": ("Dividend Yield", r"dividend yield|dividends?", True, "%"),
+    "net_margin": ("Net Margin", r"net margins?|margins?|profitability", True, "%"),
+    "profit_cagr_3y": ("Profit CAGR 3y", r"profit growth|earnings growth|profit cagr", True, "%"),
+    "profit_yoy": ("Profit YoY (qtr)", r"quarterly profit growth|profit yoy|yoy", True, "%"),
+    # Bare "growth" is the fallback when no more specific growth metric matches
+    "revenue_cagr_3y": ("Revenue CAGR 3y", r"revenue growth|sales growth|revenue cagr|sales cagr|growth", True, "%"),
+    "market_cap": ("Market Cap", r"market cap(?:italisation|italization)?|size|largest", True, "cr"),
+}
+
+DEFAULT_RANKING = ["roe", "profit_cagr_3y", "debt_equity"]
+
+COMPARATORS = {
+    ">": np.greater, "above": np.greater, "over": np.greater, "greater than": np.greater, "more than": np.greater,
+    ">=": np.greater_equal, "at least": np.greater_equal,
+    "<": np.less, "below": np.less, "under": np.less, "less than": np.less,
+    "<=": np.less_equal, "at most": np.less_equal,
+}
+
+_COMPARATOR_PATTERN = "|".join(re.escape(op) for op in sorted(COMPARATORS, key=len, reverse=True))
+_METRIC_REGEXES = {
+    key: re.compile(r"(?<![\w/])(?:" + pattern + r")(?![\w/])")
+    for key, (_, pattern, _, _) in SCREEN_METRICS.items()
+}
+_CONDITION_REGEXES = {
+    key: re.compile(regex.pattern + r"\s*(?:is\s+|of\s+)?(" + _COMPARATOR_PATTERN + r")\s*(-?\d+(?:\.\d+)?)\s*%?")
+    for key, regex in _METRIC_REGEXES.items()
+}
+_TOP_REGEX = re.compile(r"\b(?:top|best|first)\s+(\d+)\b")
+_LOWEST_REGEX = re.compile(r"\b(?:lowest|least|cheapest|smallest|ascending)\b")
+_HIGHEST_REGEX = re.compile(r"\b(?:highest|most|largest|biggest|descending)\b")
+
+
+def _match_metrics(text: str, regexes: Dict[str, Any]) -> List[Tuple[str, Any]]:
+    """
+    Non-overlapping metric mentions in text, in order of appearance. The
+    longest match wins an overlap, so "profit growth" is not also read as
+    the generic "growth" and "debt/equity" not as "debt".
+    """
+    candidates = [(key, match) for key, regex in regexes.items() for match in regex.finditer(text)]
+    chosen: List[Tuple[str, Any]] = []
+    for key, match in sorted(candidates, key=lambda item: (item[1].start() - item[1].end(), item[1].start())):
+        if not any(match.start() < other.end() and other.start() < match.end() for _, other in chosen):
+            chosen.append((key, match))
+    return sorted(chosen, key=lambda item: item[1].start())
+
+
+def parse_screen(query: str) -> Dict[str, Any]:
+    """Ranking metrics, filters and result count asked for by a screening question"""
+    text = query.lower()
+    filters = []
+    for key, condition in _match_metrics(text, _CONDITION_REGEXES):
+        filters.append((key, condition.group(1), float(condition.group(2))))
+        text = text.replace(condition.group(0), " " * len(condition.group(0)))
+
+    positions: Dict[str, int] = {}
+    for key, match in _match_metrics(text, _METRIC_REGEXES):
+        positions.setdefault(key, match.start())
+    rank_by = sorted(positions, key=positions.get)
+
+    direction = None
+    if _LOWEST_REGEX.search(query.lower()):
+        direction = False
+    elif _HIGHEST_REGEX.search(query.lower()):
+        direction = True
+
+    top = _TOP_REGEX.search(query.lower())
+    return {
+        "rank_by": rank_by or ([] if filters else list(DEFAULT_RANKING)),
+        "filters": filters,
+        "direction": direction,
+        "top_n": int(top.group(1)) if top else settings.screening_top_n,
+    }
+
+
+def _latest(store, symbol: str, metrics: List[str], frequency: str = ANNUAL) -> float:
+    for metric in metrics:
+        latest = store.latest(symbol, metric, frequency)
+        if latest is not None:
+            return latest[1]
+    return np.nan
+
+
+def _cagr(store, symbol: str, metrics: List[str], years: int) -> float:
+    for metric in metrics:
+        rate = store.cagr(symbol, metric, years)
+        if rate is not None:
+            return rate * 100
+    return np.nan
+
+
+_columns_cache: Dict[str, Any] = {"key": None, "columns": None}
+
+
+def metric_columns(symbols: List[str]) -> Dict[str, np.ndarray]:
+    """
+    One float column per screening metric, aligned with symbols (NaN where
+    unknown). Reused until a company's stored fundamentals change.
+    """
+    store = get_fundamentals_store()
+    key = tuple((symbol, store.index(symbol).get("updated_at")) for symbol in symbols)
+    if _columns_cache["key"] == key:
+        return _columns_cache["columns"]
+    columns = _metric_columns(store, symbols)
+    _columns_cache.update(key=key, columns=columns)
+    return columns
+
+
+def _metric_columns(store, symbols: List[str]) -> Dict[str, np.ndarray]:
+    base = {
+        name: np.empty(len(symbols))
+        for name in ("roe", "roce", "stock_pe", "current_price", "book_value", "dividend_yield", "market_cap",
+                     "borrowings", "equity_capital", "reserves", "net_profit", "revenue",
+                     "revenue_cagr_3y", "profit_cagr_3y", "profit_yoy")
+    }
+    for i, symbol in enumerate(symbols):
+        ratios = store.index(symbol).get("ratios", {})
+        for name in ("roe", "roce", "stock_pe", "current_price", "book_value", "dividend_yield", "market_cap"):
+            base[name][i] = ratios.get(name, np.nan)
+        base["borrowings"][i] = _latest(store, symbol, ["borrowings"])
+        base["equity_capital"][i] = _latest(store, symbol, ["equity_capital"])
+        base["reserves"][i] = _latest(store, symbol, ["reserves"])
+        base["net_profit"][i] = _latest(store, symbol, ["net_profit"])
+        base["revenue"][i] = _latest(store, symbol, ["revenue", "sales"])
+        base["revenue_cagr_3y"][i] = _cagr(store, symbol, ["revenue", "sales"], 3)
+        base["profit_cagr_3y"][i] = _cagr(store, symbol, ["net_profit"], 3)
+        growth = store.growth(symbol, "net_profit", QUARTERLY, 4)
+        base["profit_yoy"][i] = growth * 100 if growth is not None else np.nan
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        equity = np.nan_to_num(base["equity_capital"]) + base["reserves"]
+        return {
+            "roe": base["roe"],
+            "roce": base["roce"],
+            "stock_pe": base["stock_pe"],
+            "price_to_book": base["current_price"] / base["book_value"],
+            "debt_equity": base["borrowings"] / np.where(equity > 0, equity, np.nan),
+            "dividend_yield": base["dividend_yield"],
+            "net_margin": base["net_profit"] / np.where(base["revenue"] > 0, base["revenue"], np.nan) * 100,
+            "revenue_cagr_3y": base["revenue_cagr_3y"],
+            "profit_cagr_3y": base["profit_cagr_3y"],
+            "profit_yoy": base["profit_yoy"],
+            "market_cap": base["market_cap"],
+        }
+
+
+def percentile_scores(values: np.ndarray, higher_is_better: bool) -> np.ndarray:
+    """Rank of each value scaled to 0..1 (1 = best); unknown values score 0"""
+    known = ~np.isnan(values)
+    scores = np.zeros(len(values))
+    if known.sum() == 0:
+        return scores
+    signed = values[known] if higher_is_better else -values[known]
+    ranks = np.argsort(np.argsort(signed))
+    scores[known] = (ranks + 1) / known.sum()
+    return scores
+
+
+def rank_companies(columns: Dict[str, np.ndarray], screen: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """Indices of the companies passing the filters, best first, and their scores"""
+    count = len(next(iter(columns.values())))
+    mask = np.ones(count, dtype=bool)
+    for key, op, threshold in screen["filters"]:
+        with np.errstate(invalid="ignore"):
+            mask &= COMPARATORS[op](columns[key], threshold)
+
+    score = np.zeros(count)
+    for key in screen["rank_by"]:
+        higher_is_better = SCREEN_METRICS[key][2]
+        if screen["direction"] is not None and len(screen["rank_by"]) == 1:
+            higher_is_better = screen["direction"]
+        score += percentile_scores(columns[key], higher_is_better)
+    score /= max(1, len(screen["rank_by"]))
+
+    passing = np.flatnonzero(mask)
+    order = passing[np.argsort(-score[passing], kind="stable")]
+    return order, score
+
+
+def format_value(value: float, unit: str) -> str:
+    if np.isnan(value):
+        return "n/a"
+    if unit == "%":
+        return f"{value:.1f}%"
+    if unit == "cr":
+        return f"₹{value:,.0f} Cr"
+    return f"{value:.2f}"
+
+
+def screening_table(names: List[str], columns: Dict[str, np.ndarray], order: np.ndarray,
+                    score: np.ndarray, keys: List[str]) -> str:
+    header = "| Rank | Company | " + " | ".join(SCREEN_METRICS[key][0] for key in keys) + " | Score |"
+    lines = [header, "|---" * (len(keys) + 3) + "|"]
+    for rank, i in enumerate(order, start=1):
+        cells = [format_value(columns[key][i], SCREEN_METRICS[key][3]) for key in keys]
+        lines.append(f"| {rank} | {names[i]} | " + " | ".join(cells) + f" | {score[i]:.2f} |")
+    return "\n".join(lines)
+
+
+def screen_companies(query: str, company_configs: List[Dict], commentary: Optional[Any] = None) -> str:
+    """
+    Ranked table of the companies matching a screening question. With
+    commentary (a callable taking the question and the table), the top
+    rows also get a short LLM write-up.
+    """
+    screen = parse_screen(query)
+    columns = metric_columns([config["symbol"] for config in company_configs])
+    order, score = rank_companies(columns, screen)
+
+    keys = list(dict.fromkeys(screen["rank_by"] + [key for key, _, _ in screen["filters"]]))
+    criteria = ", ".join(SCREEN_METRICS[key][0] for key in screen["rank_by"]) or "filters only"
+    filters = "; ".join(f"{SCREEN_METRICS[key][0]} {op} {value:g}" for key, op, value in screen["filters"])
+
+    if len(order) == 0:
+        return f"No companies matched the screen ({filters or criteria})."
+
+    top = order[:screen["top_n"]]
+    table = screening_table([config["name"] for config in company_configs], columns, top, score, keys)
+    summary = (
+        f"## Screen: ranked by {criteria}" + (f" (filters: {filters})" if filters else "")
+        + f"\n\n{len(order)} of {len(company_configs)} companies passed; top {len(top)} shown.\n\n{table}"
+    )
+    if commentary is None:
+        return summary
+    try:
+        return f"{summary}\n\n{commentary(query, summary)}"
+    except Exception as e:
+        print(f"Screening commentary failed: {e}")
+        return summary
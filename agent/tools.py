@@ -1,597 +1,1083 @@
-import os
-import re
-from io import BytesIO
-from typing import Dict, List, Optional, Any
-import requests
-import fitz
-from dotenv import load_dotenv
-from tavily import TavilyClient
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_groq import ChatGroq
-
-load_dotenv()
-
-TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-os.environ["GROQ_API_KEY"] = GROQ_API_KEY
-os.environ["TAVILY_API_KEY"] = TAVILY_API_KEY
-os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
-
-tavily_client = TavilyClient(TAVILY_API_KEY)
-
-
-COMPANIES = {
-    "pfc": {
-        "name": "Power Finance Corporation",
-        "symbol": "PFC",
-        "screener_url": "https://www.screener.in/company/PFC/consolidated/",
-        "search_terms": ["Power Finance Corporation", "PFC Limited", "PFC India"]
-    },
-    "rec": {
-        "name": "Rural Electrification Corporation",
-        "symbol": "RECLTD",
-        "screener_url": "https://www.screener.in/company/RECLTD/consolidated/",
-        "search_terms": ["Rural Electrification Corporation", "REC Limited", "REC India"]
-    },
-    "reliance": {
-        "name": "Reliance Industries Limited",
-        "symbol": "RELIANCE",
-        "screener_url": "https://www.screener.in/company/RELIANCE/consolidated/",
-        "search_terms": ["Reliance Industries", "RIL", "Mukesh Ambani"]
-    },
-    "adani_green": {
-        "name": "Adani Green Energy Limited",
-        "symbol": "ADANIGREEN",
-        "screener_url": "https://www.screener.in/company/ADANIGREEN/consolidated/",
-        "search_terms": ["Adani Green Energy", "AGEL", "Adani Green"]
-    },
-    "hdfc_bank": {
-        "name": "HDFC Bank Limited",
-        "symbol": "HDFCBANK",
-        "screener_url": "https://www.screener.in/company/HDFCBANK/consolidated/",
-        "search_terms": ["HDFC Bank", "HDFCBANK", "HDFC Banking"]
-    }
-}
-
-def get_company_config(company_query: str) -> Optional[Dict]:
-    """Get company configuration based on user query"""
-    query_lower = company_query.lower()
-    
-    for key, config in COMPANIES.items():
-        if (config["symbol"].lower() in query_lower or 
-            config["name"].lower() in query_lower or
-            any(term.lower() in query_lower for term in config["search_terms"])):
-            return config
-    
-    return None
-
-
-def tavily_search_financial_news(company_config: Dict, days: int = 30, max_results: int = 10) -> Dict[str, Any]:
-    """
-    Search for financial news about a specific company using Tavily Search
-    """
-    try:
-        company_name = company_config["name"]
-        search_terms = company_config["search_terms"]
-        
-        search_queries = [
-            f"{company_name} financial results earnings",
-            f"{company_name} stock price movement",
-            f"{search_terms[0]} latest news"
-        ]
-        
-        all_results = []
-        for query in search_queries:
-            try:
-                response = tavily_client.search(
-                    query=query,
-                    topic="news",
-                    search_depth="advanced",
-                    max_results=max_results // len(search_queries),
-                    days=days,
-                    include_answer=True,
-                    include_raw_content=True,
-                    include_images=False
-                )
-                
-                if response.get("results"):
-                    all_results.extend(response["results"])
-                    
-            except Exception as e:
-                print(f"Error in search query '{query}': {e}")
-                continue
-        
-        return {
-            "company": company_name,
-            "results": all_results[:max_results],
-            "total_found": len(all_results)
-        }
-        
-    except Exception as e:
-        return {"error": f"Failed to search news: {str(e)}"}
-
-def tavily_extract_financial_data(company_config: Dict) -> Dict[str, Any]:
-    """
-    Extract financial data from screener.in using Tavily Extract
-    """
-    try:
-        url = company_config["screener_url"]
-        
-        response = tavily_client.extract(
-            urls=[url],
-            extract_depth="advanced",
-            format="markdown",
-            include_images=False
-        )
-        
-        if response.get("results") and len(response["results"]) > 0:
-            return {
-                "company": company_config["name"],
-                "url": url,
-                "content": response["results"][0].get("raw_content", ""),
-                "success": True
-            }
-        else:
-            return {
-                "company": company_config["name"],
-                "error": "No financial data extracted",
-                "success": False
-            }
-            
-    except Exception as e:
-        return {
-            "company": company_config["name"],
-            "error": f"Failed to extract financial data: {str(e)}",
-            "success": False
-        }
-
-def tavily_crawl_company_websites(company_config: Dict, max_depth: int = 2) -> Dict[str, Any]:
-    """
-    Crawl company's investor relations pages using Tavily Crawl
-    """
-    try:
-        company_name = company_config["name"]
-        
-        search_response = tavily_client.search(
-            query=f"{company_name} investor relations official website",
-            search_depth="basic",
-            max_results=5,
-            include_raw_content=False
-        )
-        
-        crawl_results = []
-        for result in search_response.get("results", [])[:2]:
-            try:
-                url = result.get("url", "")
-                if any(domain in url for domain in ["investor", "annual", "financial", "results"]):
-                    
-                    crawl_response = tavily_client.crawl(
-                        url=url,
-                        max_depth=max_depth,
-                        max_breadth=10,
-                        limit=20,
-                        instructions=f"Find financial reports, earnings, and investor information for {company_name}",
-                        extract_depth="basic",
-                        format="markdown"
-                    )
-                    
-                    if crawl_response.get("results"):
-                        crawl_results.extend(crawl_response["results"])
-                        
-            except Exception as e:
-                print(f"Error crawling {url}: {e}")
-                continue
-        
-        return {
-            "company": company_name,
-            "crawled_pages": len(crawl_results),
-            "results": crawl_results
-        }
-        
-    except Exception as e:
-        return {"error": f"Failed to crawl company websites: {str(e)}"}
-
-def tavily_map_financial_resources(company_config: Dict) -> Dict[str, Any]:
-    """
-    Map financial resources and reports using Tavily Map
-    """
-    try:
-        company_name = company_config["name"]
-        
-        search_response = tavily_client.search(
-            query=f"{company_name} annual report financial statements BSE NSE",
-            search_depth="basic",
-            max_results=3
-        )
-        
-        mapped_resources = []
-        for result in search_response.get("results", []):
-            try:
-                url = result.get("url", "")
-                
-                map_response = tavily_client.map(
-                    url=url,
-                    max_depth=2,
-                    max_breadth=15,
-                    limit=30,
-                    instructions=f"Map financial documents and reports for {company_name}"
-                )
-                
-                if map_response.get("results"):
-                    mapped_resources.append({
-                        "base_url": map_response.get("base_url", ""),
-                        "discovered_urls": map_response["results"]
-                    })
-                    
-            except Exception as e:
-                print(f"Error mapping {url}: {e}")
-                continue
-        
-        return {
-            "company": company_name,
-            "mapped_sites": len(mapped_resources),
-            "resources": mapped_resources
-        }
-        
-    except Exception as e:
-        return {"error": f"Failed to map financial resources: {str(e)}"}
-
-def get_transcript_data(company_config: Dict) -> Dict[str, Any]:
-    """
-    Extract earnings call transcript data for a company
-    """
-    try:
-        financial_data = tavily_extract_financial_data(company_config)
-        
-        if not financial_data.get("success"):
-            return {"error": "Could not extract base financial data"}
-        
-        content = financial_data["content"]
-        
-        url_pattern = r'\[Transcript\]\((.*?)\)'
-        urls = re.findall(url_pattern, content)
-        
-        if not urls:
-            return {"error": "No transcript URLs found"}
-        
-        transcript_url = urls[0].strip().split()[0] if urls[0] else ""
-        
-        if transcript_url:
-            transcript_content = extract_pdf_text(transcript_url)
-            transcript_summary = analyze_transcript_with_llm(transcript_content, company_config["name"])
-            
-            return {
-                "company": company_config["name"],
-                "transcript_url": transcript_url,
-                "transcript_content": transcript_content,
-                "transcript_summary": transcript_summary,
-                "success": True
-            }
-        else:
-            return {"error": "Invalid transcript URL"}
-            
-    except Exception as e:
-        return {"error": f"Failed to get transcript data: {str(e)}"}
-
-def extract_pdf_text(url: str) -> str:
-    """Extract text from PDF URL"""
-    try:
-        headers = {
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/114.0.0.0 Safari/537.36"
-            )
-        }
-
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-
-        pdf_stream = BytesIO(response.content)
-        doc = fitz.open(stream=pdf_stream, filetype="pdf")
-
-        text = ""
-        for page in doc:
-            text += page.get_text()
-
-        return text.strip()
-        
-    except Exception as e:
-        return f"Error extracting PDF text: {str(e)}"
-
-def analyze_transcript_with_llm(text: str, company_name: str) -> str:
-    """
-    Analyze transcript using LLM with intelligent text splitting
-    """
-    try:
-        if len(text) < 1000:
-            return "Transcript too short for meaningful analysis"
-        
-        text_length = len(text)
-        mid_point = text_length // 2
-        
-        break_point = mid_point
-        for i in range(mid_point, min(mid_point + 1000, text_length)):
-            if text[i] in '.!\n':
-                break_point = i + 1
-                break
-        
-        text_part1 = text[:break_point]
-        text_part2 = text[break_point:]
-        
-        groq_llm = ChatGroq(
-            model="llama-3.3-70b-versatile",
-            temperature=0,
-            max_retries=2,
-        )
-
-        messages_part1 = [
-            SystemMessage(content=(
-                f"You are analyzing an earnings call transcript for {company_name}. "
-                "This is PART 1 of 2. Focus on:\n"
-                "- Key financial highlights and metrics\n"
-                "- Management commentary and tone\n"
-                "- Business performance indicators\n"
-                "- Forward-looking statements\n"
-                "Provide detailed analysis but note this is partial."
-            )),
-            HumanMessage(content=f"Analyze this earnings call transcript part 1:\n\n{text_part1}")
-        ]
-
-        response_part1 = groq_llm.invoke(messages_part1)
-
-        messages_part2 = [
-            SystemMessage(content=(
-                f"You are analyzing an earnings call transcript for {company_name}. "
-                "This is PART 2 of 2. Focus on:\n"
-                "- Q&A session insights\n"
-                "- Management responses to analyst concerns\n"
-                "- Guidance and outlook\n"
-                "- Risk factors mentioned\n"
-                "Provide comprehensive analysis for this final part."
-            )),
-            HumanMessage(content=f"Analyze this earnings call transcript part 2:\n\n{text_part2}")
-        ]
-
-        response_part2 = groq_llm.invoke(messages_part2)
-
-        combine_response = groq_llm.invoke([
-            SystemMessage(content=(
-                f"Combine the insights from both parts of {company_name}'s earnings call transcript. "
-                "Provide a comprehensive summary with:\n"
-                "1. Executive Summary\n"
-                "2. Key Financial Highlights\n"
-                "3. Management Sentiment Analysis\n"
-                "4. Strategic Initiatives\n"
-                "5. Risk Assessment\n"
-                "6. Overall Investment Thesis"
-            )),
-            HumanMessage(content=f"Combine these analyses:\n\nPart 1:\n{response_part1.content}\n\nPart 2:\n{response_part2.content}")
-        ])
-        
-        return combine_response.content
-        
-    except Exception as e:
-        return f"Error analyzing transcript: {str(e)}"
-
-def generate_comprehensive_analysis(
-    company_config: Dict,
-    financial_data: Dict = None,
-    news_data: Dict = None,
-    transcript_data: Dict = None,
-    analysis_type: str = "full"
-) -> str:
-    """
-    Generate comprehensive financial analysis using all available data
-    """
-    try:
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",
-            temperature=0,
-            max_tokens=None,
-            timeout=None,
-            max_retries=2,
-        )
-
-        company_name = company_config["name"]
-        
-        content_sections = []
-        
-        if financial_data and financial_data.get("success"):
-            content_sections.append(f"FINANCIAL DATA:\n{financial_data['content']}")
-        
-        if transcript_data and transcript_data.get("success"):
-            content_sections.append(f"EARNINGS CALL ANALYSIS:\n{transcript_data['transcript_summary']}")
-        
-        if news_data and news_data.get("results"):
-            news_content = "\n".join([
-                f"- {result.get('title', '')}: {result.get('content', '')}"
-                for result in news_data["results"][:5]
-            ])
-            content_sections.append(f"RECENT NEWS:\n{news_content}")
-        
-        content = "\n\n".join(content_sections)
-        
-        if not content.strip():
-            return f"Insufficient data available for {company_name} analysis."
-
-        if analysis_type == "financial":
-            system_prompt = f"""You are an expert financial analyst specializing in Indian equity markets. 
-            Analyze the financial data for {company_name} and provide:
-            
-            1. **Financial Health Assessment**
-               - Key financial ratios and their interpretation
-               - Liquidity, profitability, and solvency analysis
-               - Risk assessment (Low/Medium/High) with reasoning
-            
-            2. **Performance Analysis**
-               - Revenue and profit trends
-               - Margin analysis
-               - Comparison with industry benchmarks
-            
-            3. **Investment Perspective**
-               - Strengths and weaknesses
-               - Key risk factors
-               - Growth prospects
-            
-            Be specific, data-driven, and provide actionable insights."""
-            
-        elif analysis_type == "news":
-            system_prompt = f"""You are a financial news analyst specializing in Indian markets.
-            Analyze the recent news about {company_name} and provide:
-            
-            1. **News Summary**
-               - Key developments and events
-               - Market impact assessment
-            
-            2. **Sentiment Analysis**
-               - Overall news sentiment (Positive/Neutral/Negative)
-               - Impact on stock performance
-            
-            3. **Strategic Implications**
-               - Business impact
-               - Competitive positioning
-               - Future outlook
-            
-            Focus on market-moving news and investor-relevant information."""
-            
-        elif analysis_type == "transcript":
-            system_prompt = f"""You are an earnings call specialist analyzing {company_name}'s management commentary.
-            Provide:
-            
-            1. **Management Insights**
-               - Key management statements
-               - Strategic direction and guidance
-            
-            2. **Financial Performance Discussion**
-               - Quarterly/annual performance highlights
-               - Management's explanation of results
-            
-            3. **Forward-Looking Analysis**
-               - Guidance and outlook
-               - Strategic initiatives
-               - Risk factors discussed
-            
-            Extract actionable insights from management commentary."""
-            
-        else:
-            system_prompt = f"""You are a senior equity research analyst covering {company_name} in the Indian stock market.
-            Provide a comprehensive investment analysis with:
-            
-            1. **Executive Summary**
-               - Overall investment thesis
-               - Key highlights and concerns
-            
-            2. **Financial Analysis**
-               - Financial health and key ratios
-               - Performance trends and benchmarking
-            
-            3. **Business Analysis**
-               - Recent developments from news and earnings calls
-               - Strategic positioning and competitive advantages
-            
-            4. **Risk Assessment**
-               - Key risk factors and their likelihood
-               - Risk mitigation strategies by management
-            
-            5. **Investment Recommendation**
-               - Clear Buy/Hold/Sell recommendation with rationale
-               - Target price reasoning (if applicable)
-               - Time horizon for investment
-            
-            Be comprehensive, balanced, and provide actionable investment insights."""
-
-        messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=f"Analyze the following data for {company_name}:\n\n{content}")
-        ]
-
-        response = llm.invoke(messages)
-        return response.content
-        
-    except Exception as e:
-        return f"Error generating analysis for {company_config['name']}: {str(e)}"
-
-def generate_comparative_analysis(companies_data: List[Dict]) -> str:
-    """
-    Generate comparative analysis across multiple companies
-    """
-    try:
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",
-            temperature=0,
-            max_tokens=None,
-            timeout=None,
-            max_retries=2,
-        )
-
-        company_names = [data["company_name"] for data in companies_data]
-        
-        system_prompt = f"""You are a senior equity research analyst comparing {', '.join(company_names)} 
-        in the Indian stock market. Provide a comprehensive comparative analysis with:
-        
-        1. **Comparative Financial Health**
-           - Key ratios comparison
-           - Financial strength ranking
-        
-        2. **Business Performance Comparison**
-           - Revenue and profit growth comparison
-           - Market positioning analysis
-        
-        3. **Recent Developments**
-           - News and events comparison
-           - Management commentary insights
-        
-        4. **Risk-Return Analysis**
-           - Risk assessment for each company
-           - Expected return potential
-        
-        5. **Investment Recommendation**
-           - Ranking from most to least attractive
-           - Portfolio allocation suggestions
-           - Sector-specific insights
-        
-        Provide actionable insights for portfolio construction."""
-
-        content = ""
-        for data in companies_data:
-            content += f"\n\n{'='*50}\n"
-            content += f"COMPANY: {data['company_name']}\n"
-            content += f"{'='*50}\n"
-            content += data.get('analysis', 'No analysis available')
-
-        messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=f"Compare these companies based on the following data:\n{content}")
-        ]
-
-        response = llm.invoke(messages)
-        return response.content
-        
-    except Exception as e:
-        return f"Error generating comparative analysis: {str(e)}"
-
-
-def get_llm_response(raw_content: str, transcript_summary: str, news_data: str) -> str:
-    """
-    responsible for generating a comprehensive analysis using the provided data.
-    """
-    try:
-        company_config = COMPANIES["pfc"]
-        
-        financial_data = {"success": True, "content": raw_content}
-        transcript_data = {"success": True, "transcript_summary": transcript_summary}
-        news_data_dict = {"results": [{"title": "News", "content": news_data}]}
-        
-        return generate_comprehensive_analysis(
-            company_config=company_config,
-            financial_data=financial_data,
-            news_data=news_data_dict,
-            transcript_data=transcript_data,
-            analysis_type="full"
-        )
-        
-    except Exception as e:
+import importlib
+import os
+import re
+import threading
+from io import BytesIO
+from typing import Dict, List, Optional, Any
+from agent.cassette import tavily_client_for, chat_model_for
+from agent.cache import cached
+from agent.rate_limit import limited_call, RateLimitedChatModel
+from agent.deadlines import remaining
+from agent.model_router import model_router
+from agent.news_store import get_news_store, normalize_url
+from agent.crawler import get_crawl_engine
+from agent.downloader import get_downloader
+from agent.fundamentals import format_fundamentals_context, get_fundamentals_store
+from agent.intent import detect_companies
+from agent.transcript_store import diff_summaries, format_changes, get_transcript_store, transcript_links
+from config.settings import settings
+
+# Clients and heavy SDKs (PyMuPDF, Tavily, LangChain providers) are loaded on
+# first use so importing this module stays cheap; see warmup_clients().
+_tavily_client = None
+_client_lock = threading.Lock()
+
+
+def _api_key(name: str) -> Optional[str]:
+    return getattr(settings, name.lower(), None) or os.getenv(name)
+
+def _create_tavily_client():
+    from tavily import TavilyClient
+    return TavilyClient(_api_key("TAVILY_API_KEY"))
+
+def get_tavily_client():
+    """Shared Tavily client, created on first use"""
+    global _tavily_client
+    if _tavily_client is None:
+        with _client_lock:
+            if _tavily_client is None:
+                _tavily_client = tavily_client_for(_create_tavily_client)
+    return _tavily_client
+
+def set_tavily_client(client) -> Any:
+    """Replace the shared Tavily client (e.g. with a fake) and return the previous one"""
+    global _tavily_client
+    with _client_lock:
+        previous, _tavily_client = _tavily_client, client
+    return previous
+
+def _tavily(endpoint: str, **kwargs) -> Dict[str, Any]:
+    """Call a Tavily endpoint through the shared rate limiter, bounded by the active stage budget"""
+    kwargs.setdefault("timeout", remaining(settings.tavily_timeout))
+    return limited_call(
+        f"tavily.{endpoint}",
+        getattr(get_tavily_client(), endpoint),
+        acquire_timeout=remaining(settings.rate_limit_max_wait),
+        **kwargs
+    )
+
+def _create_groq_llm(model: str, **kwargs):
+    from langchain_groq import ChatGroq
+    return ChatGroq(model=model, api_key=_api_key("GROQ_API_KEY"), **kwargs)
+
+def _create_gemini_llm(model: str, **kwargs):
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(model=model, google_api_key=_api_key("GOOGLE_API_KEY"), **kwargs)
+
+# Chat model factories by provider; each is called as factory(model, **kwargs)
+LLM_PROVIDERS = {
+    "groq": _create_groq_llm,
+    "gemini": _create_gemini_llm,
+}
+
+# SDK module behind each chat model factory
+LLM_PROVIDER_MODULES = {
+    "groq": "langchain_groq",
+    "gemini": "langchain_google_genai",
+}
+
+def warmup_clients() -> None:
+    """
+    Import heavy dependencies and create the shared Tavily client ahead of
+    the first request. Chat models are not created here: each one is built
+    per call with the timeout left in that call's deadline (see
+    _chat_model), so warming up only imports the SDKs of routed providers.
+    """
+    import fitz  # noqa: F401
+    from langchain_core.messages import SystemMessage, HumanMessage  # noqa: F401
+
+    get_tavily_client()
+    providers = {candidate.split(":", 1)[0] for route in settings.model_routes.values() for candidate in route}
+    for provider in providers:
+        if provider in LLM_PROVIDER_MODULES:
+            importlib.import_module(LLM_PROVIDER_MODULES[provider])
+
+COMPANIES = {
+    "pfc": {
+        "name": "Power Finance Corporation",
+        "symbol": "PFC",
+        "screener_url": "https://www.screener.in/company/PFC/consolidated/",
+        "search_terms": ["Power Finance Corporation", "PFC Limited", "PFC India"]
+    },
+    "rec": {
+        "name": "Rural Electrification Corporation",
+        "symbol": "RECLTD",
+        "screener_url": "https://www.screener.in/company/RECLTD/consolidated/",
+        "search_terms": ["Rural Electrification Corporation", "REC Limited", "REC India", "REC"]
+    },
+    "reliance": {
+        "name": "Reliance Industries Limited",
+        "symbol": "RELIANCE",
+        "screener_url": "https://www.screener.in/company/RELIANCE/consolidated/",
+        "search_terms": ["Reliance Industries", "RIL", "Mukesh Ambani"]
+    },
+    "adani_green": {
+        "name": "Adani Green Energy Limited",
+        "symbol": "ADANIGREEN",
+        "screener_url": "https://www.screener.in/company/ADANIGREEN/consolidated/",
+        "search_terms": ["Adani Green Energy", "AGEL", "Adani Green"]
+    },
+    "hdfc_bank": {
+        "name": "HDFC Bank Limited",
+        "symbol": "HDFCBANK",
+        "screener_url": "https://www.screener.in/company/HDFCBANK/consolidated/",
+        "search_terms": ["HDFC Bank", "HDFCBANK", "HDFC Banking"]
+    }
+}
+
+def _chat_model(provider: str, model: str):
+    """Chat model for a provider, behind the cassette and the shared rate limiter"""
+    options = {"temperature": 0, "timeout": remaining(settings.llm_timeout), "max_retries": 0}
+    if provider == "gemini":
+        options["max_tokens"] = None
+    
+    # Retries are left to agent.rate_limit and fallback to model_router
+    return RateLimitedChatModel(
+        chat_model_for(provider, model, lambda: LLM_PROVIDERS[provider](model, **options)),
+        f"{provider}.{model}"
+    )
+
+def _invoke_llm(task: str, messages: List[Any]) -> Any:
+    """Invoke the model the router picks for task"""
+    return model_router.invoke(task, messages, _chat_model)
+
+def get_company_config(company_query: str) -> Optional[Dict]:
+    """Get company configuration based on user query"""
+    # Whole-word matching, so short aliases such as "REC" do not match "recent" or "direct"
+    matches = detect_companies(company_query, COMPANIES)
+    return matches[0] if matches else None
+
+
+NEWS_WINDOW_DAYS = 30
+NEWS_MAX_RESULTS = 10
+
+def tavily_search_financial_news(company_config: Dict, days: int = NEWS_WINDOW_DAYS, max_results: int = NEWS_MAX_RESULTS) -> Dict[str, Any]:
+    """
+    Search for financial news about a specific company using Tavily Search
+    """
+    try:
+        company_name = company_config["name"]
+        search_terms = company_config["search_terms"]
+        
+        search_queries = [
+            f"{company_name} financial results earnings",
+            f"{company_name} stock price movement",
+            f"{search_terms[0]} latest news"
+        ]
+        
+        all_results = []
+        for query in search_queries:
+            try:
+                response = _tavily(
+                    "search",
+                    query=query,
+                    topic="news",
+                    search_depth="advanced",
+                    max_results=max_results // len(search_queries),
+                    days=days,
+                    include_answer=True,
+                    include_raw_content=True,
+                    include_images=False
+                )
+                
+                if response.get("results"):
+                    all_results.extend(response["results"])
+                    
+            except Exception as e:
+                print(f"Error in search query '{query}': {e}")
+                continue
+        
+        return {
+            "company": company_name,
+            "results": all_results[:max_results],
+            "total_found": len(all_results)
+        }
+        
+    except Exception as e:
+        return {"error": f"Failed to search news: {str(e)}"}
+
+def tavily_search_news_delta(company_config: Dict, days: int, max_results: int = 5) -> Dict[str, Any]:
+    """
+    Single Tavily news search covering only the last few days
+    """
+    response = _tavily(
+        "search",
+        query=f"{company_config['name']} latest news",
+        topic="news",
+        search_depth="advanced",
+        max_results=max_results,
+        days=days,
+        include_raw_content=True,
+        include_images=False
+    )
+    
+    return {
+        "company": company_config["name"],
+        "results": response.get("results", [])
+    }
+
+@cached("news", key=lambda company_config, max_results=NEWS_MAX_RESULTS: (company_config["symbol"], max_results))
+def get_company_news(company_config: Dict, max_results: int = NEWS_MAX_RESULTS) -> Dict[str, Any]:
+    """
+    Company news from the local news store, topped up with a delta search
+    covering only the time since the last fetch
+    """
+    try:
+        store = get_news_store()
+        symbol = company_config["symbol"]
+        new_articles = 0
+        
+        with store.lock(symbol):
+            record = store.load(symbol)
+            
+            if not store.is_fresh(record, settings.news_min_refresh_seconds):
+                if record.get("last_fetch"):
+                    response = tavily_search_news_delta(
+                        company_config,
+                        days=store.delta_days(record, NEWS_WINDOW_DAYS),
+                        max_results=settings.news_delta_max_results
+                    )
+                else:
+                    response = tavily_search_financial_news(company_config, days=NEWS_WINDOW_DAYS, max_results=max_results)
+                
+                if "error" in response:
+                    if not record["articles"]:
+                        return response
+                elif response.get("results") or record["articles"]:
+                    new_articles = store.merge(record, response.get("results", []), NEWS_WINDOW_DAYS)
+                    store.save(symbol, record)
+            
+            articles = store.articles(record)
+        
+        return {
+            "company": company_config["name"],
+            "results": articles[:max_results],
+            "total_found": len(articles),
+            "new_articles": new_articles,
+            "last_fetch": record.get("last_fetch")
+        }
+        
+    except Exception as e:
+        return {"error": f"Failed to get news: {str(e)}"}
+
+@cached("financial", key=lambda company_config: company_config["symbol"])
+def tavily_extract_financial_data(company_config: Dict) -> Dict[str, Any]:
+    """
+    Extract financial data from screener.in using Tavily Extract
+    """
+    try:
+        url = company_config["screener_url"]
+        
+        response = _tavily(
+            "extract",
+            urls=[url],
+            extract_depth="advanced",
+            format="markdown",
+            include_images=False
+        )
+        
+        if response.get("results") and len(response["results"]) > 0:
+            content = response["results"][0].get("raw_content", "")
+            try:
+                get_fundamentals_store().update(company_config["symbol"], content)
+            except (OSError, ValueError) as e:
+                print(f"Could not store fundamentals for {company_config['symbol']}: {e}")
+            return {
+                "company": company_config["name"],
+                "url": url,
+                "content": content,
+                "success": True
+            }
+        else:
+            return {
+                "company": company_config["name"],
+                "error": "No financial data extracted",
+                "success": False
+            }
+            
+    except Exception as e:
+        return {
+            "company": company_config["name"],
+            "error": f"Failed to extract financial data: {str(e)}",
+            "success": False
+        }
+
+def tavily_crawl_company_websites(company_config: Dict, max_depth: int = 2) -> Dict[str, Any]:
+    """
+    Crawl company's investor relations pages using Tavily Crawl
+    """
+    try:
+        company_name = company_config["name"]
+        engine = get_crawl_engine()
+        
+        query = f"{company_name} investor relations official website"
+        search_response = engine.search(query, lambda: _tavily(
+            "search",
+            query=query,
+            search_depth="basic",
+            max_results=5,
+            include_raw_content=False
+        ))
+        
+        seeds = [
+            result.get("url", "")
+            for result in search_response.get("results", [])
+            if any(domain in result.get("url", "") for domain in ["investor", "annual", "financial", "results"])
+        ][:settings.crawl_max_seeds]
+        
+        crawl_responses = engine.run("crawl", seeds, lambda url: _tavily(
+            "crawl",
+            url=url,
+            max_depth=max_depth,
+            max_breadth=10,
+            limit=20,
+            instructions=f"Find financial reports, earnings, and investor information for {company_name}",
+            extract_depth="basic",
+            format="markdown"
+        ))
+        
+        crawl_results = []
+        seen_pages = set()
+        for url, crawl_response in crawl_responses.items():
+            if "error" in crawl_response:
+                print(f"Error crawling {url}: {crawl_response['error']}")
+                continue
+            for page in crawl_response.get("results", []):
+                page_key = normalize_url(page.get("url", ""))
+                if page_key not in seen_pages:
+                    seen_pages.add(page_key)
+                    crawl_results.append(page)
+        
+        return {
+            "company": company_name,
+            "crawled_pages": len(crawl_results),
+            "results": crawl_results
+        }
+        
+    except Exception as e:
+        return {"error": f"Failed to crawl company websites: {str(e)}"}
+
+def tavily_map_financial_resources(company_config: Dict) -> Dict[str, Any]:
+    """
+    Map financial resources and reports using Tavily Map
+    """
+    try:
+        company_name = company_config["name"]
+        engine = get_crawl_engine()
+        
+        query = f"{company_name} annual report financial statements BSE NSE"
+        search_response = engine.search(query, lambda: _tavily(
+            "search",
+            query=query,
+            search_depth="basic",
+            max_results=3
+        ))
+        
+        seeds = [result.get("url", "") for result in search_response.get("results", [])][:settings.crawl_max_seeds]
+        
+        map_responses = engine.run("map", seeds, lambda url: _tavily(
+            "map",
+            url=url,
+            max_depth=2,
+            max_breadth=15,
+            limit=30,
+            instructions=f"Map financial documents and reports for {company_name}"
+        ))
+        
+        mapped_resources = []
+        seen_urls = set()
+        for url, map_response in map_responses.items():
+            if "error" in map_response:
+                print(f"Error mapping {url}: {map_response['error']}")
+                continue
+            discovered_urls = []
+            for discovered in map_response.get("results", []):
+                if normalize_url(discovered) not in seen_urls:
+                    seen_urls.add(normalize_url(discovered))
+                    discovered_urls.append(discovered)
+            if discovered_urls:
+                mapped_resources.append({
+                    "base_url": map_response.get("base_url", ""),
+                    "discovered_urls": discovered_urls
+                })
+        
+        return {
+            "company": company_name,
+            "mapped_sites": len(mapped_resources),
+            "resources": mapped_resources
+        }
+        
+    except Exception as e:
+        return {"error": f"Failed to map financial resources: {str(e)}"}
+
+def stored_transcript(symbol: str, quarter: str, transcript_url: str, document: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Transcript record for one quarter, extracting and chunking the PDF only when it is new"""
+    store = get_transcript_store()
+    
+    with store.lock(symbol):
+        record = store.load(symbol, quarter)
+        if record is None or record["url"] != transcript_url:
+            transcript_content = extract_pdf_text(transcript_url, document)
+            if transcript_content.startswith("Error extracting PDF text"):
+                return {"error": transcript_content}
+            record = store.add(symbol, quarter, transcript_url, transcript_content)
+    
+    return record
+
+def transcript_listing(company_config: Dict) -> Dict[str, Any]:
+    """(quarter, url) pairs of the transcripts listed on the company's screener page, newest first"""
+    financial_data = tavily_extract_financial_data(company_config)
+    
+    if not financial_data.get("success"):
+        return {"error": "Could not extract base financial data"}
+    
+    links = transcript_links(financial_data["content"])
+    
+    if not links:
+        return {"error": "No transcript URLs found"}
+    
+    return {"links": links}
+
+def load_transcript(company_config: Dict) -> Dict[str, Any]:
+    """
+    Latest transcript record for a company from the transcript store,
+    extracting and chunking the PDF only when the quarter is new
+    """
+    listing = transcript_listing(company_config)
+    
+    if "error" in listing:
+        return listing
+    
+    quarter, transcript_url = listing["links"][0]
+    return stored_transcript(company_config["symbol"], quarter, transcript_url)
+
+def summarized_transcript(company_config: Dict, record: Dict[str, Any]) -> str:
+    """Stored summary of a transcript record, summarizing the transcript once if needed"""
+    transcript_summary = record.get("summary")
+    if not transcript_summary:
+        transcript_summary = analyze_transcript_with_llm(record["text"], company_config["name"])
+        if not transcript_summary.startswith("Error analyzing transcript"):
+            get_transcript_store().save_summary(company_config["symbol"], record, transcript_summary)
+    return transcript_summary
+
+def structure_transcript_summary(summary: str, company_name: str) -> Optional[Dict[str, Any]]:
+    """
+    Structured form of a transcript summary (tone, guidance, themes, risks
+    and metrics) used to compare calls across quarters
+    """
+    import json
+    from langchain_core.messages import SystemMessage, HumanMessage
+    
+    system_prompt = f"""Convert this summary of {company_name}'s earnings call into JSON with exactly these keys:
+    "tone": one of "positive", "neutral", "negative"
+    "guidance": list of short forward-looking statements (max 8, under 12 words each)
+    "themes": list of short topic tags (1-3 lowercase words each, max 10), e.g. "loan growth", "renewable financing"
+    "risks": list of short risk tags (1-3 lowercase words each, max 8)
+    "metrics": object mapping a short lowercase metric name to its value as stated, e.g. {{"gross npa": "3.1%"}}
+    Use only what the summary says. Reply with the JSON object only."""
+    
+    try:
+        response = _invoke_llm("transcript_qa", [
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=summary)
+        ])
+    except Exception as e:
+        print(f"Could not structure transcript summary for {company_name}: {e}")
+        return None
+    text = response.content.strip()
+    start, end = text.find("{"), text.rfind("}")
+    try:
+        structured = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+    if not isinstance(structured, dict):
+        return None
+    return {
+        "tone": str(structured.get("tone", "")).lower() or None,
+        "guidance": [str(item) for item in structured.get("guidance") or []],
+        "themes": [str(item).lower() for item in structured.get("themes") or []],
+        "risks": [str(item).lower() for item in structured.get("risks") or []],
+        "metrics": {str(key).lower(): str(value) for key, value in (structured.get("metrics") or {}).items()},
+    }
+
+def sync_transcript_history(company_config: Dict, quarters: int) -> Dict[str, Any]:
+    """
+    Make sure the latest `quarters` listed transcripts are stored, summarized
+    and structured. Quarters processed before are only read from the store.
+    """
+    listing = transcript_listing(company_config)
+    
+    if "error" in listing:
+        return listing
+    
+    store = get_transcript_store()
+    symbol = company_config["symbol"]
+    links = listing["links"][:quarters]
+    
+    # Download every quarter not stored yet at once rather than one after another
+    new_urls = [
+        transcript_url for quarter, transcript_url in links
+        if (store.load(symbol, quarter) or {}).get("url") != transcript_url
+    ]
+    documents = get_downloader().fetch_many(new_urls) if len(new_urls) > 1 else {}
+    
+    records = []
+    for quarter, transcript_url in links:
+        record = stored_transcript(symbol, quarter, transcript_url, documents.get(transcript_url))
+        if "error" in record:
+            continue
+        if not record.get("structured"):
+            summary = summarized_transcript(company_config, record)
+            if summary.startswith("Error analyzing transcript"):
+                continue
+            structured = structure_transcript_summary(summary, company_config["name"])
+            if not structured:
+                continue
+            store.save_structured(symbol, record, structured)
+        records.append(record)
+    
+    return {"records": records}
+
+@cached("transcript", key=lambda company_config: company_config["symbol"])
+def get_transcript_data(company_config: Dict) -> Dict[str, Any]:
+    """
+    Extract earnings call transcript data for a company
+    """
+    try:
+        record = load_transcript(company_config)
+        
+        if "error" in record:
+            return record
+        
+        transcript_summary = summarized_transcript(company_config, record)
+        
+        return {
+            "company": company_config["name"],
+            "quarter": record["quarter"],
+            "transcript_url": record["url"],
+            "transcript_content": record["text"],
+            "transcript_summary": transcript_summary,
+            "success": True
+        }
+            
+    except Exception as e:
+        return {"error": f"Failed to get transcript data: {str(e)}"}
+
+def get_transcript_excerpts(company_config: Dict, query: str) -> Dict[str, Any]:
+    """
+    Transcript chunks relevant to a narrow question, without summarizing the
+    whole call. Falls back to the full summary when nothing matches.
+    """
+    try:
+        record = load_transcript(company_config)
+        
+        if "error" in record:
+            return record
+        
+        excerpts = get_transcript_store().search(
+            company_config["symbol"],
+            record["quarter"],
+            query,
+            settings.transcript_context_tokens
+        )
+        
+        if not excerpts:
+            return get_transcript_data(company_config)
+        
+        return {
+            "company": company_config["name"],
+            "quarter": record["quarter"],
+            "transcript_url": record["url"],
+            "excerpts": excerpts,
+            "success": True
+        }
+        
+    except Exception as e:
+        return {"error": f"Failed to get transcript excerpts: {str(e)}"}
+
+def get_transcript_changes(company_config: Dict, quarters: int = 2) -> Dict[str, Any]:
+    """
+    What changed across the last `quarters` earnings calls, from diffs of the
+    stored structured summaries. Only quarters not seen before are summarized.
+    """
+    try:
+        history = sync_transcript_history(company_config, max(2, quarters))
+        
+        if "error" in history:
+            return history
+        
+        records = history["records"]
+        if len(records) < 2:
+            return get_transcript_data(company_config)
+        
+        changes = [
+            format_changes(current["quarter"], previous["quarter"], diff_summaries(previous["structured"], current["structured"]))
+            for current, previous in zip(records, records[1:])
+        ]
+        
+        return {
+            "company": company_config["name"],
+            "quarter": records[0]["quarter"],
+            "quarters": [record["quarter"] for record in records],
+            "changes": changes,
+            "structured": records[0]["structured"],
+            "success": True
+        }
+        
+    except Exception as e:
+        return {"error": f"Failed to compare transcripts: {str(e)}"}
+
+def extract_pdf_text(url: str, document: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Extract text from PDF URL. document is the url's entry from
+    Downloader.fetch_many() when it was downloaded together with others.
+    """
+    try:
+        if document is None:
+            content = get_downloader().fetch(url)
+        elif "error" in document:
+            raise IOError(document["error"])
+        else:
+            content = document["content"]
+
+        import fitz
+
+        pdf_stream = BytesIO(content)
+        doc = fitz.open(stream=pdf_stream, filetype="pdf")
+
+        text = ""
+        for page in doc:
+            text += page.get_text()
+
+        return text.strip()
+        
+    except Exception as e:
+        return f"Error extracting PDF text: {str(e)}"
+
+def analyze_transcript_with_llm(text: str, company_name: str) -> str:
+    """
+    Analyze transcript using LLM with intelligent text splitting
+    """
+    try:
+        from langchain_core.messages import SystemMessage, HumanMessage
+
+        if len(text) < 1000:
+            return "Transcript too short for meaningful analysis"
+        
+        text_length = len(text)
+        mid_point = text_length // 2
+        
+        break_point = mid_point
+        for i in range(mid_point, min(mid_point + 1000, text_length)):
+            if text[i] in '.!\n':
+                break_point = i + 1
+                break
+        
+        text_part1 = text[:break_point]
+        text_part2 = text[break_point:]
+        
+        messages_part1 = [
+            SystemMessage(content=(
+                f"You are analyzing an earnings call transcript for {company_name}. "
+                "This is PART 1 of 2. Focus on:\n"
+                "- Key financial highlights and metrics\n"
+                "- Management commentary and tone\n"
+                "- Business performance indicators\n"
+                "- Forward-looking statements\n"
+                "Provide detailed analysis but note this is partial."
+            )),
+            HumanMessage(content=f"Analyze this earnings call transcript part 1:\n\n{text_part1}")
+        ]
+
+        response_part1 = _invoke_llm("transcript", messages_part1)
+
+        messages_part2 = [
+            SystemMessage(content=(
+                f"You are analyzing an earnings call transcript for {company_name}. "
+                "This is PART 2 of 2. Focus on:\n"
+                "- Q&A session insights\n"
+                "- Management responses to analyst concerns\n"
+                "- Guidance and outlook\n"
+                "- Risk factors mentioned\n"
+                "Provide comprehensive analysis for this final part."
+            )),
+            HumanMessage(content=f"Analyze this earnings call transcript part 2:\n\n{text_part2}")
+        ]
+
+        response_part2 = _invoke_llm("transcript", messages_part2)
+
+        combine_response = _invoke_llm("transcript", [
+            SystemMessage(content=(
+                f"Combine the insights from both parts of {company_name}'s earnings call transcript. "
+                "Provide a comprehensive summary with:\n"
+                "1. Executive Summary\n"
+                "2. Key Financial Highlights\n"
+                "3. Management Sentiment Analysis\n"
+                "4. Strategic Initiatives\n"
+                "5. Risk Assessment\n"
+                "6. Overall Investment Thesis"
+            )),
+            HumanMessage(content=f"Combine these analyses:\n\nPart 1:\n{response_part1.content}\n\nPart 2:\n{response_part2.content}")
+        ])
+        
+        return combine_response.content
+        
+    except Exception as e:
+        return f"Error analyzing transcript: {str(e)}"
+
+def format_news_context(company_config: Dict, news_data: Dict, user_query: str = None) -> str:
+    """
+    News for the prompt: the stored passages most relevant to the question
+    within settings.news_context_tokens, or the five latest headlines when
+    there is no question or nothing in the index matches it
+    """
+    passages = []
+    if user_query and news_data.get("last_fetch") is not None:
+        try:
+            passages = get_news_store().search(
+                company_config["symbol"],
+                user_query,
+                settings.news_context_tokens,
+                version=news_data["last_fetch"]
+            )
+        except Exception as e:
+            print(f"News retrieval failed for {company_config['name']}: {e}")
+
+    if passages:
+        return "\n".join(
+            f"- {passage['title']} ({passage.get('published_date') or 'undated'}): {passage['text']}"
+            for passage in passages
+        )
+
+    return "\n".join([
+        f"- {result.get('title', '')}: {result.get('content', '')}"
+        for result in news_data["results"][:5]
+    ])
+
+def generate_comprehensive_analysis(
+    company_config: Dict,
+    financial_data: Dict = None,
+    news_data: Dict = None,
+    transcript_data: Dict = None,
+    analysis_type: str = "full",
+    missing_sections: List[str] = None,
+    website_data: Dict = None,
+    resources_data: Dict = None,
+    user_query: str = None
+) -> str:
+    """
+    Generate comprehensive financial analysis using all available data
+    """
+    try:
+        from langchain_core.messages import SystemMessage, HumanMessage
+
+        company_name = company_config["name"]
+        
+        content_sections = []
+        
+        if financial_data and financial_data.get("success"):
+            content_sections.append(f"FINANCIAL DATA:\n{financial_data['content']}")
+            trends = format_fundamentals_context(company_config["symbol"])
+            if trends:
+                content_sections.append(f"COMPUTED TRENDS (from stored history, use these figures for growth rates):\n{trends}")
+        
+        focused = bool(user_query and transcript_data and transcript_data.get("excerpts"))
+        quarter_changes = bool(transcript_data and transcript_data.get("changes"))
+        
+        if transcript_data and transcript_data.get("success"):
+            if quarter_changes:
+                latest = transcript_data["structured"]
+                content_sections.append(
+                    f"EARNINGS CALL CHANGES ({', '.join(reversed(transcript_data['quarters']))}):\n"
+                    + "\n\n".join(reversed(transcript_data["changes"]))
+                    + f"\n\nLATEST CALL ({transcript_data['quarter']}): tone {latest.get('tone')}; "
+                    + f"guidance: {'; '.join(latest.get('guidance') or []) or 'none stated'}"
+                )
+            elif transcript_data.get("excerpts"):
+                excerpts = "\n\n".join(
+                    f"[{excerpt['section']}] {excerpt['speaker'] or 'Unattributed'}: {excerpt['text']}"
+                    for excerpt in transcript_data["excerpts"]
+                )
+                content_sections.append(f"EARNINGS CALL EXCERPTS ({transcript_data['quarter']}):\n{excerpts}")
+            else:
+                content_sections.append(f"EARNINGS CALL ANALYSIS:\n{transcript_data['transcript_summary']}")
+        
+        if news_data and news_data.get("results"):
+            content_sections.append(f"RECENT NEWS:\n{format_news_context(company_config, news_data, user_query)}")
+        
+        if website_data and website_data.get("results"):
+            website_content = "\n\n".join([
+                f"PAGE: {page.get('url', '')}\n{(page.get('raw_content') or '')[:1500]}"
+                for page in website_data["results"][:8]
+            ])
+            content_sections.append(f"INVESTOR RELATIONS PAGES:\n{website_content}")
+        
+        if resources_data and resources_data.get("resources"):
+            resources_content = "\n".join([
+                f"- {url}"
+                for resource in resources_data["resources"]
+                for url in resource.get("discovered_urls", [])[:20]
+            ])
+            content_sections.append(f"FINANCIAL DOCUMENTS AND RESOURCES:\n{resources_content}")
+        
+        content = "\n\n".join(content_sections)
+        
+        if not content.strip():
+            return f"Insufficient data available for {company_name} analysis."
+        
+        if missing_sections:
+            content += (
+                f"\n\nUNAVAILABLE DATA: {', '.join(missing_sections)} data could not be retrieved in time. "
+                "Do not speculate about these areas; state that they were not covered."
+            )
+
+        if analysis_type == "financial":
+            system_prompt = f"""You are an expert financial analyst specializing in Indian equity markets. 
+            Analyze the financial data for {company_name} and provide:
+            
+            1. **Financial Health Assessment**
+               - Key financial ratios and their interpretation
+               - Liquidity, profitability, and solvency analysis
+               - Risk assessment (Low/Medium/High) with reasoning
+            
+            2. **Performance Analysis**
+               - Revenue and profit trends
+               - Margin analysis
+               - Comparison with industry benchmarks
+            
+            3. **Investment Perspective**
+               - Strengths and weaknesses
+               - Key risk factors
+               - Growth prospects
+            
+            Be specific, data-driven, and provide actionable insights."""
+            
+        elif analysis_type == "news":
+            system_prompt = f"""You are a financial news analyst specializing in Indian markets.
+            Analyze the recent news about {company_name} and provide:
+            
+            1. **News Summary**
+               - Key developments and events
+               - Market impact assessment
+            
+            2. **Sentiment Analysis**
+               - Overall news sentiment (Positive/Neutral/Negative)
+               - Impact on stock performance
+            
+            3. **Strategic Implications**
+               - Business impact
+               - Competitive positioning
+               - Future outlook
+            
+            Focus on market-moving news and investor-relevant information."""
+            
+        elif analysis_type == "transcript" and quarter_changes:
+            system_prompt = f"""You are an earnings call specialist tracking {company_name}'s calls over time.
+            The changes between calls were computed from structured summaries of each call. Explain:
+            
+            1. **What Changed** - the most important shifts in tone, guidance, themes and metrics
+            2. **Where Things Stand** - the latest call's tone and guidance
+            3. **Why It Matters** - what the changes imply for investors
+            
+            Only use the changes provided and be concise."""
+            
+        elif analysis_type == "transcript" and focused:
+            system_prompt = f"""You are an earnings call specialist answering a question about {company_name}'s latest call.
+            Answer using only the excerpts provided:
+            
+            - Quote or closely paraphrase what was said, naming the speaker
+            - Say whether it came from opening remarks or the Q&A
+            - If the excerpts do not answer the question, say so
+            
+            Be concise and specific."""
+            
+        elif analysis_type == "transcript":
+            system_prompt = f"""You are an earnings call specialist analyzing {company_name}'s management commentary.
+            Provide:
+            
+            1. **Management Insights**
+               - Key management statements
+               - Strategic direction and guidance
+            
+            2. **Financial Performance Discussion**
+               - Quarterly/annual performance highlights
+               - Management's explanation of results
+            
+            3. **Forward-Looking Analysis**
+               - Guidance and outlook
+               - Strategic initiatives
+               - Risk factors discussed
+            
+            Extract actionable insights from management commentary."""
+            
+        elif analysis_type == "website":
+            system_prompt = f"""You are an investor relations analyst reviewing {company_name}'s official website content.
+            Provide:
+            
+            1. **Key Disclosures**
+               - Financial reports, results and presentations available
+               - Notable announcements and corporate actions
+            
+            2. **Business Highlights**
+               - Strategy and business segments as presented by the company
+            
+            3. **Investor Takeaways**
+               - Information investors should follow up on
+            
+            Only use what the pages actually contain."""
+            
+        elif analysis_type == "resources":
+            system_prompt = f"""You are a research librarian for {company_name}'s financial documents.
+            Provide:
+            
+            1. **Document Map**
+               - Annual reports, financial statements and exchange filings found, grouped by type
+            
+            2. **Coverage Assessment**
+               - Which periods and document types are available or missing
+            
+            3. **Where to Start**
+               - The most useful documents for an investor and why
+            
+            Refer to the discovered URLs."""
+            
+        else:
+            system_prompt = f"""You are a senior equity research analyst covering {company_name} in the Indian stock market.
+            Provide a comprehensive investment analysis with:
+            
+            1. **Executive Summary**
+               - Overall investment thesis
+               - Key highlights and concerns
+            
+            2. **Financial Analysis**
+               - Financial health and key ratios
+               - Performance trends and benchmarking
+            
+            3. **Business Analysis**
+               - Recent developments from news and earnings calls
+               - Strategic positioning and competitive advantages
+            
+            4. **Risk Assessment**
+               - Key risk factors and their likelihood
+               - Risk mitigation strategies by management
+            
+            5. **Investment Recommendation**
+               - Clear Buy/Hold/Sell recommendation with rationale
+               - Target price reasoning (if applicable)
+               - Time horizon for investment
+            
+            Be comprehensive, balanced, and provide actionable investment insights."""
+
+        if analysis_type == "transcript" and (focused or quarter_changes):
+            messages = [
+                SystemMessage(content=system_prompt),
+                HumanMessage(content=f"Question: {user_query}\n\n{content}")
+            ]
+            task = "transcript_qa"
+        else:
+            messages = [
+                SystemMessage(content=system_prompt),
+                HumanMessage(content=f"Analyze the following data for {company_name}:\n\n{content}")
+            ]
+            task = "news_summary" if analysis_type == "news" else "synthesis"
+        response = _invoke_llm(task, messages)
+        return response.content
+        
+    except Exception as e:
+        return f"Error generating analysis for {company_config['name']}: {str(e)}"
+
+def generate_comparative_analysis(companies_data: List[Dict]) -> str:
+    """
+    Generate comparative analysis across multiple companies
+    """
+    try:
+        from langchain_core.messages import SystemMessage, HumanMessage
+
+        company_names = [data["company_name"] for data in companies_data]
+        
+        system_prompt = f"""You are a senior equity research analyst comparing {', '.join(company_names)} 
+        in the Indian stock market. Provide a comprehensive comparative analysis with:
+        
+        1. **Comparative Financial Health**
+           - Key ratios comparison
+           - Financial strength ranking
+        
+        2. **Business Performance Comparison**
+           - Revenue and profit growth comparison
+           - Market positioning analysis
+        
+        3. **Recent Developments**
+           - News and events comparison
+           - Management commentary insights
+        
+        4. **Risk-Return Analysis**
+           - Risk assessment for each company
+           - Expected return potential
+        
+        5. **Investment Recommendation**
+           - Ranking from most to least attractive
+           - Portfolio allocation suggestions
+           - Sector-specific insights
+        
+        Provide actionable insights for portfolio construction."""
+
+        content = ""
+        for data in companies_data:
+            content += f"\n\n{'='*50}\n"
+            content += f"COMPANY: {data['company_name']}\n"
+            content += f"{'='*50}\n"
+            content += data.get('analysis', 'No analysis available')
+
+        messages = [
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=f"Compare these companies based on the following data:\n{content}")
+        ]
+
+        response = _invoke_llm("comparative", messages)
+        return response.content
+        
+    except Exception as e:
+        return f"Error generating comparative analysis: {str(e)}"
+
+
+def generate_screening_commentary(user_query: str, screen_table: str) -> str:
+    """
+    Short commentary on the top rows of a screen; the ranking itself is computed locally
+    """
+    from langchain_core.messages import SystemMessage, HumanMessage
+
+    system_prompt = """You are an equity research analyst covering Indian markets.
+    You are given the result of a quantitative screen that has already been computed.
+    Do not re-rank the companies or invent figures. In a few short paragraphs:
+    - explain what drives the ranking of the top companies
+    - point out trade-offs between the criteria (for example high ROE with high leverage)
+    - note data gaps (n/a values) that could change the picture"""
+
+    messages = [
+        SystemMessage(content=system_prompt),
+        HumanMessage(content=f"Question: {user_query}\n\n{screen_table}")
+    ]
+    return _invoke_llm("screening", messages).content
+
+
+def get_llm_response(raw_content: str, transcript_summary: str, news_data: str) -> str:
+    """
+    responsible for generating a comprehensive analysis using the provided data.
+    """
+    try:
+        company_config = COMPANIES["pfc"]
+        
+        financial_data = {"success": True, "content": raw_content}
+        transcript_data = {"success": True, "transcript_summary": transcript_summary}
+        news_data_dict = {"results": [{"title": "News", "content": news_data}]}
+        
+        return generate_comprehensive_analysis(
+            company_config=company_config,
+            financial_data=financial_data,
+            news_data=news_data_dict,
+            transcript_data=transcript_data,
+            analysis_type="full"
+        )
+        
+    except Exception as e:
         return f"Error in legacy analysis: {str(e)}"
\ No newline at end of file
@@ -0,0 +1,234 @@
+"""
+Chunked earnings call transcripts, keyed by company and quarter.
+
+A transcript is extracted once, split into speaker- and section-aware
+chunks and stored with a BM25 index over those chunks (see
+agent.retrieval). Broad questions reuse the stored summary instead of
+summarizing the PDF again; narrow follow-ups ("what did management say
+about NPAs?") retrieve the matching chunks and need a single small LLM
+call.
+
+Each quarter's summary is also stored in a structured form (tone,
+guidance, themes, risks and metrics). Questions about what changed
+between calls are answered by diffing those structured summaries with
+diff_summaries(), so older transcripts are never read again.
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from agent.retrieval import BM25Index, select_within_budget, split_passages
+from config.settings import settings
+
+# Concalls entries on screener.in read "* Jun 2025 [Transcript](https://...) [PPT](...)"
+QUARTER_LABEL_PATTERN = re.compile(r"\b((?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.? \d{4})\b")
+TRANSCRIPT_URL_PATTERN = re.compile(r"\[Transcript\]\((.*?)\)")
+SPEAKER_PATTERN = re.compile(r"^\s*([A-Z][A-Za-z.'\- ]{1,40}?)\s*:\s*(.*)$")
+QA_PATTERN = re.compile(r"question[- ]and[- ]answer|q\s*&\s*a session|first question", re.IGNORECASE)
+
+REMARKS = "Opening remarks"
+QA = "Q&A"
+
+
+def transcript_links(content: str) -> List[Tuple[str, str]]:
+    """
+    (quarter, url) pairs for transcripts listed in screener content, newest
+    first. Each link takes the closest quarter label since the previous
+    link; a link with no label of its own is stored as "latest".
+    """
+    labels = [(match.end(), match.group(1)) for match in QUARTER_LABEL_PATTERN.finditer(content)]
+    links = []
+    previous_end = 0
+    for match in TRANSCRIPT_URL_PATTERN.finditer(content):
+        preceding = [label for end, label in labels if previous_end <= end <= match.start() <= end + 200]
+        previous_end = match.end()
+        url = match.group(1).strip().split()[0] if match.group(1).strip() else ""
+        if url:
+            links.append((preceding[-1] if preceding else "latest", url))
+    return links
+
+
+def quarter_key(quarter: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", quarter.lower()).strip("-") or "latest"
+
+
+def chunk_transcript(text: str, quarter: str, words_per_chunk: int) -> List[Dict[str, Any]]:
+    """
+    Split a transcript into chunks that never cross a speaker change or the
+    start of the Q&A section. Long turns are split into overlapping windows.
+    """
+    turns: List[Dict[str, Any]] = []
+    section = REMARKS
+
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if section == REMARKS and QA_PATTERN.search(line):
+            section = QA
+        match = SPEAKER_PATTERN.match(line)
+        if match and len(match.group(1).split()) <= 5:
+            turns.append({"speaker": match.group(1).strip(), "section": section, "lines": [match.group(2)]})
+        elif turns and turns[-1]["section"] == section:
+            turns[-1]["lines"].append(line)
+        else:
+            turns.append({"speaker": "", "section": section, "lines": [line]})
+
+    chunks = []
+    for turn in turns:
+        for passage in split_passages(" ".join(turn["lines"]), words_per_chunk):
+            chunks.append({
+                "quarter": quarter,
+                "speaker": turn["speaker"],
+                "section": turn["section"],
+                "text": passage,
+            })
+    return chunks
+
+
+class TranscriptStore:
+    """Transcript text, summary and chunk index per company and quarter"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._indexes: Dict[Tuple[str, str], BM25Index] = {}
+        self._lock = threading.Lock()
+        self._symbol_locks: Dict[str, threading.Lock] = {}
+
+    def lock(self, symbol: str) -> threading.Lock:
+        with self._lock:
+            return self._symbol_locks.setdefault(symbol, threading.Lock())
+
+    def _path(self, symbol: str, quarter: str) -> str:
+        return os.path.join(self.directory, symbol, quarter_key(quarter))
+
+    def load(self, symbol: str, quarter: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(f"{self._path(symbol, quarter)}.transcript.json") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def save(self, symbol: str, record: Dict[str, Any]) -> None:
+        path = f"{self._path(symbol, record['quarter'])}.transcript.json"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(record, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def add(self, symbol: str, quarter: str, url: str, text: str) -> Dict[str, Any]:
+        """Store a transcript and build its chunk index"""
+        record = {"quarter": quarter, "url": url, "text": text, "summary": None}
+        index = BM25Index.build(chunk_transcript(text, quarter, settings.transcript_chunk_words), version=url)
+        index.save(self._path(symbol, quarter))
+        self.save(symbol, record)
+        with self._lock:
+            self._indexes[(symbol, quarter)] = index
+        return record
+
+    def _update(self, symbol: str, record: Dict[str, Any], field: str, value: Any) -> None:
+        """
+        Set one field of a stored record under the company lock, keeping
+        fields another request saved meanwhile. Nothing is written if the
+        quarter now holds a different transcript.
+        """
+        record[field] = value
+        with self.lock(symbol):
+            stored = self.load(symbol, record["quarter"])
+            if stored is not None and stored["url"] != record["url"]:
+                return
+            stored = stored or record
+            stored[field] = value
+            self.save(symbol, stored)
+
+    def save_summary(self, symbol: str, record: Dict[str, Any], summary: str) -> None:
+        self._update(symbol, record, "summary", summary)
+
+    def save_structured(self, symbol: str, record: Dict[str, Any], structured: Dict[str, Any]) -> None:
+        self._update(symbol, record, "structured", structured)
+
+    def index(self, symbol: str, quarter: str) -> Optional[BM25Index]:
+        with self._lock:
+            index = self._indexes.get((symbol, quarter))
+        if index is None:
+            index = BM25Index.load(self._path(symbol, quarter))
+            if index is not None:
+                with self._lock:
+                    self._indexes[(symbol, quarter)] = index
+        return index
+
+    def search(self, symbol: str, quarter: str, query: str, token_budget: int) -> List[Dict[str, Any]]:
+        """Chunks of one quarter's transcript most relevant to query within token_budget"""
+        index = self.index(symbol, quarter)
+        if index is None:
+            return []
+        return select_within_budget(index.search(query, top_k=30), token_budget)
+
+
+# Fields of a structured summary: lists are compared as sets of short phrases
+STRUCTURED_LISTS = ["guidance", "themes", "risks"]
+
+
+def _normalized(items: List[str]) -> Dict[str, str]:
+    return {re.sub(r"\s+", " ", str(item).strip().lower()): str(item).strip() for item in items if str(item).strip()}
+
+
+def diff_summaries(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """What changed between two structured summaries"""
+    changes: Dict[str, Any] = {}
+    if previous.get("tone") != current.get("tone"):
+        changes["tone"] = {"from": previous.get("tone"), "to": current.get("tone")}
+
+    for field in STRUCTURED_LISTS:
+        before, after = _normalized(previous.get(field) or []), _normalized(current.get(field) or [])
+        added = [after[key] for key in after if key not in before]
+        dropped = [before[key] for key in before if key not in after]
+        if added or dropped:
+            changes[field] = {"added": added, "dropped": dropped}
+
+    before = {key.lower(): value for key, value in (previous.get("metrics") or {}).items()}
+    after = {key.lower(): value for key, value in (current.get("metrics") or {}).items()}
+    metrics = {
+        key: {"from": before.get(key), "to": after.get(key)}
+        for key in sorted(set(before) | set(after))
+        if str(before.get(key)).strip().lower() != str(after.get(key)).strip().lower()
+    }
+    if metrics:
+        changes["metrics"] = metrics
+    return changes
+
+
+def format_changes(quarter: str, previous_quarter: str, changes: Dict[str, Any]) -> str:
+    """Readable list of the changes between two calls"""
+    lines = [f"{previous_quarter} -> {quarter}:"]
+    if "tone" in changes:
+        lines.append(f"- Tone: {changes['tone']['from']} -> {changes['tone']['to']}")
+    for field in STRUCTURED_LISTS:
+        if field in changes:
+            for item in changes[field]["added"]:
+                lines.append(f"- New {field}: {item}")
+            for item in changes[field]["dropped"]:
+                lines.append(f"- No longer mentioned ({field}): {item}")
+    for name, values in (changes.get("metrics") or {}).items():
+        lines.append(f"- {name}: {values['from'] or 'not given'} -> {values['to'] or 'not given'}")
+    if len(lines) == 1:
+        lines.append("- No material change in the structured summaries")
+    return "\n".join(lines)
+
+
+_transcript_store: Optional[TranscriptStore] = None
+
+
+def get_transcript_store() -> TranscriptStore:
+    global _transcript_store
+    if _transcript_store is None:
+        _transcript_store = TranscriptStore(os.path.join(settings.data_dir, "transcripts"))
+    return _transcript_store
@@ -0,0 +1,360 @@
+"""
+Local stand-ins for every external dependency used by agent.tools.
+
+The fakes mimic the response shapes of TavilyClient, ChatGroq,
+ChatGoogleGenerativeAI and the transcript PDF host closely enough for the
+whole analysis graph to run without network access. Latency, payload size
+and failure rate are configurable per upstream through FakeProfile.
+"""
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+OFFLINE_ENV = {
+    "TAVILY_API_KEY": "offline-tavily-key",
+    "GOOGLE_API_KEY": "offline-google-key",
+    "GROQ_API_KEY": "offline-groq-key",
+    "NO_PROXY": "127.0.0.1,localhost",
+}
+
+FILLER_WORDS = [
+    "revenue", "margin", "guidance", "disbursement", "asset", "quality", "capex",
+    "borrowing", "spread", "yield", "provision", "growth", "segment", "demand",
+    "outlook", "regulatory", "liquidity", "portfolio", "renewable", "capacity",
+]
+
+
+class FakeUpstreamError(Exception):
+    """Raised by the fakes to simulate an upstream failure"""
+
+    def __init__(self, message: str, status_code: int = 503):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class FakeProfile:
+    """Latency, payload size and failure behaviour of one fake upstream"""
+
+    def __init__(
+        self,
+        latency_ms: float = 50.0,
+        jitter_ms: float = 10.0,
+        per_kb_ms: float = 0.0,
+        failure_rate: float = 0.0,
+        payload_kb: float = 4.0,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.per_kb_ms = per_kb_ms
+        self.failure_rate = failure_rate
+        self.payload_kb = payload_kb
+        self.calls = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def simulate(self, operation: str, request_kb: float = 0.0) -> None:
+        """Sleep for the configured latency and fail at the configured rate"""
+        with self._lock:
+            self.calls += 1
+
+        delay_ms = random.gauss(self.latency_ms, self.jitter_ms) + self.per_kb_ms * request_kb
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000)
+
+        if self.failure_rate and random.random() < self.failure_rate:
+            with self._lock:
+                self.failures += 1
+            raise FakeUpstreamError(f"Simulated failure in {operation}")
+
+
+class FakeEnvironment:
+    """Profiles for all fake upstreams used during a benchmark run"""
+
+    def __init__(
+        self,
+        tavily: Optional[FakeProfile] = None,
+        groq: Optional[FakeProfile] = None,
+        gemini: Optional[FakeProfile] = None,
+        pdf: Optional[FakeProfile] = None,
+    ):
+        self.tavily = tavily or FakeProfile(latency_ms=400, jitter_ms=80, payload_kb=200)
+        self.groq = groq or FakeProfile(latency_ms=1200, jitter_ms=250, per_kb_ms=2, payload_kb=3)
+        self.gemini = gemini or FakeProfile(latency_ms=2500, jitter_ms=500, per_kb_ms=3, payload_kb=6)
+        self.pdf = pdf or FakeProfile(latency_ms=300, jitter_ms=50, payload_kb=120)
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        return {
+            name: {"calls": profile.calls, "failures": profile.failures}
+            for name, profile in (
+                ("tavily", self.tavily),
+                ("groq", self.groq),
+                ("gemini", self.gemini),
+                ("pdf", self.pdf),
+            )
+        }
+
+
+def filler_text(size_kb: float, seed: str = "") -> str:
+    """Deterministic prose-like filler of roughly size_kb kilobytes"""
+    rng = random.Random(seed)
+    target = int(size_kb * 1024)
+    words = []
+    length = 0
+    while length < target:
+        word = rng.choice(FILLER_WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:target]
+
+
+def fake_screener_markdown(symbol: str, pdf_base_url: str, size_kb: float) -> str:
+    """Screener-like markdown page with ratios, result tables and concall links"""
+    rng = random.Random(symbol)
+    quarters = ["Sep 2023", "Dec 2023", "Mar 2024", "Jun 2024", "Sep 2024", "Dec 2024", "Mar 2025", "Jun 2025"]
+    years = ["Mar 2019", "Mar 2020", "Mar 2021", "Mar 2022", "Mar 2023", "Mar 2024", "Mar 2025", "TTM"]
+
+    def row(label: str, base: float, columns: List[str]) -> str:
+        values = []
+        value = base
+        for _ in columns:
+            value *= 1 + rng.uniform(-0.05, 0.12)
+            values.append(f"{value:,.0f}")
+        return f"| {label} | " + " | ".join(values) + " |"
+
+    def table(title: str, columns: List[str], rows: List[tuple]) -> str:
+        lines = [f"## {title}", "", "| | " + " | ".join(columns) + " |", "|---" * (len(columns) + 1) + "|"]
+        lines.extend(row(label, base, columns) for label, base in rows)
+        return "\n".join(lines)
+
+    sections = [
+        f"# {symbol} Ltd",
+        "",
+        f"* Market Cap ₹ {rng.randint(50_000, 2_000_000):,} Cr.",
+        f"* Current Price ₹ {rng.uniform(100, 3000):.0f}",
+        f"* Stock P/E {rng.uniform(4, 60):.1f}",
+        f"* Book Value ₹ {rng.uniform(50, 1500):.0f}",
+        f"* Dividend Yield {rng.uniform(0.1, 5):.2f} %",
+        f"* ROCE {rng.uniform(5, 25):.1f} %",
+        f"* ROE {rng.uniform(5, 25):.1f} %",
+        f"* Face Value ₹ {rng.choice([1, 2, 10]):.1f}",
+        "",
+        table("Quarterly Results", quarters, [
+            ("Revenue +", rng.uniform(5_000, 50_000)),
+            ("Expenses +", rng.uniform(3_000, 30_000)),
+            ("Operating Profit", rng.uniform(1_000, 20_000)),
+            ("Net Profit +", rng.uniform(500, 10_000)),
+        ]),
+        "",
+        table("Profit & Loss", years, [
+            ("Revenue +", rng.uniform(20_000, 200_000)),
+            ("Net Profit +", rng.uniform(2_000, 40_000)),
+        ]),
+        "",
+        table("Balance Sheet", years[:-1], [
+            ("Borrowings +", rng.uniform(10_000, 500_000)),
+            ("Reserves", rng.uniform(10_000, 300_000)),
+            ("Total Assets", rng.uniform(50_000, 900_000)),
+        ]),
+        "",
+        "## Concalls",
+        "",
+    ]
+    for index, quarter in enumerate(reversed(quarters[-4:])):
+        sections.append(f"* {quarter} [Transcript]({pdf_base_url}/{symbol}/transcript-{index}.pdf) [PPT]({pdf_base_url}/{symbol}/ppt-{index}.pdf)")
+
+    markdown = "\n".join(sections)
+    padding_kb = size_kb - len(markdown) / 1024
+    if padding_kb > 0:
+        markdown += "\n\n## About\n\n" + filler_text(padding_kb, seed=symbol)
+    return markdown
+
+
+def fake_transcript_text(size_kb: float, seed: str = "") -> str:
+    """Earnings call style text alternating between speakers"""
+    speakers = ["Moderator", "Management", "Analyst"]
+    paragraphs = []
+    chunk_kb = 1.5
+    count = max(1, int(size_kb / chunk_kb))
+    for index in range(count):
+        speaker = speakers[index % len(speakers)]
+        paragraphs.append(f"{speaker}: {filler_text(chunk_kb, seed=f'{seed}-{index}')}.")
+    return "\n".join(paragraphs)
+
+
+class FakeAIMessage:
+    """Minimal stand-in for a LangChain AIMessage"""
+
+    def __init__(self, content: str, usage_metadata: Dict[str, int]):
+        self.content = content
+        self.usage_metadata = usage_metadata
+
+
+class FakeChatModel:
+    """Chat model fake accepting the constructor arguments of ChatGroq/ChatGoogleGenerativeAI"""
+
+    def __init__(self, profile: FakeProfile, provider: str, model: str = "fake", **kwargs: Any):
+        self.profile = profile
+        self.provider = provider
+        self.model = model
+        self.kwargs = kwargs
+
+    def invoke(self, messages: List[Any], *args: Any, **kwargs: Any) -> FakeAIMessage:
+        prompt = "\n".join(str(getattr(message, "content", message)) for message in messages)
+        self.profile.simulate(f"{self.provider}.invoke", request_kb=len(prompt) / 1024)
+
+        content = f"## Analysis by {self.model}\n\n" + filler_text(self.profile.payload_kb, seed=prompt[:64])
+        return FakeAIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": len(prompt) // 4,
+                "output_tokens": len(content) // 4,
+                "total_tokens": (len(prompt) + len(content)) // 4,
+            },
+        )
+
+
+class FakeTavilyClient:
+    """TavilyClient fake covering search, extract, crawl and map"""
+
+    def __init__(self, profile: FakeProfile, pdf_base_url: str, news_kb: float = 8.0):
+        self.profile = profile
+        self.pdf_base_url = pdf_base_url
+        self.news_kb = news_kb
+
+    def search(self, query: str, max_results: int = 5, include_raw_content: bool = False, **kwargs: Any) -> Dict[str, Any]:
+        self.profile.simulate("tavily.search")
+        slug = "-".join(query.lower().split()[:4])
+        results = []
+        for index in range(max_results):
+            results.append({
+                "title": f"{query} #{index}",
+                "url": f"https://investor.example.com/{slug}/{index}",
+                "content": filler_text(0.5, seed=f"{slug}-{index}"),
+                "raw_content": filler_text(self.news_kb, seed=f"{slug}-{index}-raw") if include_raw_content else None,
+                "score": round(1 - index / max(max_results, 1), 3),
+                "published_date": time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime()),
+            })
+        return {"query": query, "answer": filler_text(0.3, seed=slug), "results": results}
+
+    def extract(self, urls: List[str], **kwargs: Any) -> Dict[str, Any]:
+        self.profile.simulate("tavily.extract")
+        results = []
+        for url in urls:
+            symbol = url.rstrip("/").split("/")[-2] if "/company/" in url else "COMPANY"
+            results.append({
+                "url": url,
+                "raw_content": fake_screener_markdown(symbol, self.pdf_base_url, self.profile.payload_kb),
+            })
+        return {"results": results, "failed_results": []}
+
+    def crawl(self, url: str, limit: int = 20, **kwargs: Any) -> Dict[str, Any]:
+        self.profile.simulate("tavily.crawl")
+        pages = min(limit, 10)
+        return {
+            "base_url": url,
+            "results": [
+                {"url": f"{url}/page-{index}", "raw_content": filler_text(4, seed=f"{url}-{index}")}
+                for index in range(pages)
+            ],
+        }
+
+    def map(self, url: str, limit: int = 30, **kwargs: Any) -> Dict[str, Any]:
+        self.profile.simulate("tavily.map")
+        return {
+            "base_url": url,
+            "results": [f"{url}/reports/document-{index}.pdf" for index in range(min(limit, 15))],
+        }
+
+
+class FakePDFServer:
+    """Local HTTP server that serves generated transcript PDFs"""
+
+    def __init__(self, profile: FakeProfile):
+        self.profile = profile
+        self._pdf_bytes: Optional[bytes] = None
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def pdf_bytes(self) -> bytes:
+        if self._pdf_bytes is None:
+            import fitz
+
+            text = fake_transcript_text(self.profile.payload_kb, seed="transcript")
+            doc = fitz.open()
+            page_chars = 3000
+            for start in range(0, len(text), page_chars):
+                page = doc.new_page()
+                page.insert_textbox(page.rect + (36, 36, -36, -36), text[start:start + page_chars], fontsize=8)
+            self._pdf_bytes = doc.tobytes()
+            doc.close()
+        return self._pdf_bytes
+
+    def start(self) -> "FakePDFServer":
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                try:
+                    server.profile.simulate("pdf.get")
+                except FakeUpstreamError:
+                    self.send_error(503, "Simulated failure")
+                    return
+
+                body = server.pdf_bytes()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/pdf")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.pdf_bytes()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+
+def prepare_offline_environment() -> None:
+    """Set placeholder credentials and bypass proxies for the local PDF host"""
+    for key, value in OFFLINE_ENV.items():
+        os.environ.setdefault(key, value)
+
+
+@contextmanager
+def install_fakes(env: FakeEnvironment):
+    """Swap the clients used by agent.tools for local fakes"""
+    prepare_offline_environment()
+    from agent import tools
+
+    server = FakePDFServer(env.pdf).start()
+    saved_providers = dict(tools.LLM_PROVIDERS)
+
+    saved_client = tools.set_tavily_client(FakeTavilyClient(env.tavily, pdf_base_url=server.base_url))
+    tools.LLM_PROVIDERS["groq"] = partial(FakeChatModel, env.groq, "groq")
+    tools.LLM_PROVIDERS["gemini"] = partial(FakeChatModel, env.gemini, "gemini")
+
+    try:
+        yield env
+    finally:
+        tools.set_tavily_client(saved_client)
+        tools.LLM_PROVIDERS.update(saved_providers)
+        server.stop()
@@ -0,0 +1,82 @@
+"""
+Profile analyze_query offline against a recorded cassette.
+
+Record real traffic first by running the API or the agent with
+CASSETTE_MODE=record (cassettes are written under CASSETTE_PATH), then:
+
+    python -m benchmarks.profile_replay --cassette cassettes --query "full analysis of PFC"
+    python -m benchmarks.profile_replay --cassette cassettes --queries-file queries.txt --speed 1.0
+
+Queries run under agent.profiling's sampling profiler, which follows the
+graph nodes into the stage, crawl and download pools, so parsing and
+prompt building done in worker threads show up in the report.
+"""
+import argparse
+import shutil
+import time
+import tracemalloc
+
+from benchmarks.fakes import prepare_offline_environment
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Replay recorded tool traffic under a profiler")
+    parser.add_argument("--cassette", required=True, help="Cassette file or directory of cassettes")
+    parser.add_argument("--query", action="append", default=[], help="Query to replay (repeatable)")
+    parser.add_argument("--queries-file", help="File with one query per line")
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="Multiplier for recorded latencies; 1.0 replays original timings, 0 disables sleeping")
+    parser.add_argument("--top", type=int, default=30, help="Number of functions to print")
+    parser.add_argument("--interval-ms", type=float, help="Sampling interval (default settings.profile_interval_ms)")
+    parser.add_argument("--output", help="Write collapsed stacks (flamegraph.pl / speedscope) to this path")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    prepare_offline_environment()
+
+    from agent.cassette import REPLAY, use_cassette
+    use_cassette(args.cassette, REPLAY, args.speed)
+
+    from agent.financial_agent import analyze_query
+    from agent.profiling import profile_session
+    from config.settings import settings
+
+    queries = list(args.query)
+    if args.queries_file:
+        with open(args.queries_file) as f:
+            queries.extend(line.strip() for line in f if line.strip())
+    if not queries:
+        raise SystemExit("No queries given")
+
+    if args.interval_ms:
+        settings.profile_interval_ms = args.interval_ms
+
+    tracemalloc.start()
+    with profile_session("replay") as session:
+        for query in queries:
+            started = time.perf_counter()
+            output = analyze_query(query)
+            elapsed = (time.perf_counter() - started) * 1000
+            current, peak = tracemalloc.get_traced_memory()
+            print(f"{elapsed:>9.1f} ms  peak {peak / 1024 / 1024:>7.1f} MiB  output {len(output):>7} chars  {query}")
+            tracemalloc.reset_peak()
+    tracemalloc.stop()
+
+    dump_path = session.dump()
+    if args.output:
+        shutil.move(dump_path, args.output)
+        dump_path = args.output
+
+    report = session.report(dump_path)
+    print(f"\n{report['samples']} samples every {report['interval_ms']} ms, stacks in {dump_path}")
+    print("\nNode wall-clock (ms):")
+    for name, ms in report["nodes_ms"].items():
+        print(f"{ms:>10.1f}  {name}")
+    print("\nHotspots (% of samples, inclusive / own):")
+    for spot in session.hotspots(args.top):
+        print(f"{spot['total_pct']:>6.1f} {spot['own_pct']:>6.1f}  {spot['function']}")
+
+if __name__ == "__main__":
+    main()
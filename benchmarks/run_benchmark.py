@@ -0,0 +1,167 @@
+"""
+Offline benchmark for analyze_query across analysis types and company counts.
+
+Usage:
+    python -m benchmarks.run_benchmark --iterations 20 --concurrency 4
+    python -m benchmarks.run_benchmark --types news,financial --failure-rate 0.05 --json bench.json
+"""
+import argparse
+import json
+import math
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from benchmarks.fakes import FakeEnvironment, FakeProfile, install_fakes, prepare_offline_environment
+
+QUERY_TEMPLATES = {
+    "financial": "financial ratios and balance sheet for {companies}",
+    "news": "latest news about {companies}",
+    "transcript": "earnings call transcript of {companies}",
+    "website": "crawl the investor website of {companies}",
+    "resources": "map documents and resources for {companies}",
+    "full": "complete analysis of {companies}",
+    "comparative": "compare {companies}",
+}
+
+FAILURE_MARKERS = ("Error processing", "Error generating", "Insufficient data")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def build_query(analysis_type: str, company_count: int) -> str:
+    from agent.tools import COMPANIES
+
+    names = [config["name"] for config in COMPANIES.values()][:company_count]
+    return QUERY_TEMPLATES[analysis_type].format(companies=" vs ".join(names) if analysis_type == "comparative" else " and ".join(names))
+
+
+def query_matches(query: str, analysis_type: str, company_count: int) -> bool:
+    """Check the graph would route the query to the intended type and companies"""
+    from agent.financial_agent import extract_companies_and_analysis_type
+
+    intent = extract_companies_and_analysis_type({"user_query": query})
+    return intent["analysis_type"].value == analysis_type and len(intent["companies"]) == company_count
+
+
+def run_case(query: str, iterations: int, concurrency: int, warmup: int) -> Dict[str, float]:
+    from agent.financial_agent import analyze_query
+
+    for _ in range(warmup):
+        analyze_query(query)
+
+    def timed_call(_: int):
+        started = time.perf_counter()
+        output = analyze_query(query)
+        elapsed = time.perf_counter() - started
+        failed = not output or any(marker in output for marker in FAILURE_MARKERS)
+        return elapsed, failed, len(output or "")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = list(executor.map(timed_call, range(iterations)))
+    wall = time.perf_counter() - started
+
+    latencies = [sample[0] * 1000 for sample in samples]
+    failures = sum(1 for sample in samples if sample[1])
+    return {
+        "requests": iterations,
+        "failures": failures,
+        "failure_rate": failures / iterations if iterations else 0.0,
+        "throughput_rps": iterations / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "avg_output_chars": sum(sample[2] for sample in samples) / iterations if iterations else 0.0,
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline benchmark for the financial analysis graph")
+    parser.add_argument("--types", default=",".join(QUERY_TEMPLATES), help="Comma separated analysis types")
+    parser.add_argument("--company-counts", default="1,2,5", help="Comma separated company counts")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplier applied to every fake latency")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Failure rate applied to every fake upstream")
+    parser.add_argument("--tavily-ms", type=float, default=400)
+    parser.add_argument("--groq-ms", type=float, default=1200)
+    parser.add_argument("--gemini-ms", type=float, default=2500)
+    parser.add_argument("--pdf-ms", type=float, default=300)
+    parser.add_argument("--screener-kb", type=float, default=200, help="Size of the extracted screener page")
+    parser.add_argument("--transcript-kb", type=float, default=120, help="Size of the transcript PDF text")
+    parser.add_argument("--rate-limits", default='{"tavily": 1000, "groq": 1000, "gemini": 1000, "http": 1000}',
+                        help="JSON rate limit overrides; the defaults effectively disable outbound limiting")
+    parser.add_argument("--cache", action="store_true", help="Keep tool result caches enabled (measures the warm path)")
+    parser.add_argument("--json", dest="json_path", help="Write results as JSON to this path")
+    return parser.parse_args()
+
+
+def build_environment(args: argparse.Namespace) -> FakeEnvironment:
+    scale = args.latency_scale
+    return FakeEnvironment(
+        tavily=FakeProfile(latency_ms=args.tavily_ms * scale, jitter_ms=args.tavily_ms * scale * 0.2,
+                           failure_rate=args.failure_rate, payload_kb=args.screener_kb),
+        groq=FakeProfile(latency_ms=args.groq_ms * scale, jitter_ms=args.groq_ms * scale * 0.2,
+                         per_kb_ms=2 * scale, failure_rate=args.failure_rate, payload_kb=3),
+        gemini=FakeProfile(latency_ms=args.gemini_ms * scale, jitter_ms=args.gemini_ms * scale * 0.2,
+                           per_kb_ms=3 * scale, failure_rate=args.failure_rate, payload_kb=6),
+        pdf=FakeProfile(latency_ms=args.pdf_ms * scale, jitter_ms=args.pdf_ms * scale * 0.2,
+                        failure_rate=args.failure_rate, payload_kb=args.transcript_kb),
+    )
+
+
+def main() -> None:
+    args = parse_args()
+    prepare_offline_environment()
+
+    from config.settings import settings
+    settings.rate_limits = json.loads(args.rate_limits)
+    settings.data_dir = tempfile.mkdtemp(prefix="finvest-bench-")
+    if not args.cache:
+        for name in ("financial", "news", "transcript"):
+            setattr(settings, f"cache_ttl_{name}", 0)
+        settings.news_min_refresh_seconds = 0
+
+    types = [item.strip() for item in args.types.split(",") if item.strip()]
+    counts = [int(item) for item in args.company_counts.split(",") if item.strip()]
+    env = build_environment(args)
+    results = []
+
+    with install_fakes(env):
+        header = f"{'type':<12} {'companies':>9} {'reqs':>5} {'fail%':>6} {'rps':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+        print(header)
+        print("-" * len(header))
+
+        for analysis_type in types:
+            for count in counts:
+                query = build_query(analysis_type, count)
+                if not query_matches(query, analysis_type, count):
+                    print(f"{analysis_type:<12} {count:>9}  skipped (query does not route to this type)")
+                    continue
+
+                stats = run_case(query, args.iterations, args.concurrency, args.warmup)
+                results.append({"analysis_type": analysis_type, "companies": count, "query": query, **stats})
+                print(
+                    f"{analysis_type:<12} {count:>9} {stats['requests']:>5} {stats['failure_rate'] * 100:>5.1f}% "
+                    f"{stats['throughput_rps']:>7.2f} {stats['p50_ms']:>9.0f} {stats['p95_ms']:>9.0f} {stats['p99_ms']:>9.0f}"
+                )
+
+    print("\nUpstream calls:", json.dumps(env.summary()))
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"results": results, "upstreams": env.summary()}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
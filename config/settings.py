@@ -1,78 +1,287 @@
-from typing import List
-import os
-
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-except ImportError:
-    pass
-
-try:
-    from pydantic_settings import BaseSettings
-    from typing import Optional
-    
-    class Settings(BaseSettings):
-        app_name: str = "Financial Analysis Agent API"
-        app_version: str = "1.0.0"
-        app_description: str = "API for financial analysis using AI agent"
-        
-        host: str = "0.0.0.0"
-        port: int = 8000
-        debug: bool = True
-        reload: bool = True
-        log_level: str = "info"
-        
-        cors_origins: List[str] = [
-            "http://localhost:3000",
-            "https://finvest-rosy.vercel.app",
-            "https://finvest.dishant.site"
-        ]
-        cors_credentials: bool = True
-        cors_methods: List[str] = ["GET", "POST", "PUT", "DELETE"]
-        cors_headers: List[str] = ["*"]
-        
-        database_name: str = "finvest_analysis"
-        
-        tavily_api_key: Optional[str] = None
-        google_api_key: Optional[str] = None
-        groq_api_key: Optional[str] = None
-        
-        model_config = {
-            "env_file": ".env", 
-            "case_sensitive": False,
-            "extra": "allow"
-        }
-
-except ImportError:
-    class Settings:
-        """Application settings with environment variable support"""
-        
-        def __init__(self):
-            self.app_name: str = os.getenv("APP_NAME", "Financial Analysis Agent API")
-            self.app_version: str = os.getenv("APP_VERSION", "1.0.0")
-            self.app_description: str = os.getenv("APP_DESCRIPTION", "API for financial analysis using AI agent")
-            
-            self.host: str = os.getenv("HOST", "0.0.0.0")
-            self.port: int = int(os.getenv("PORT", "8000"))
-            self.debug: bool = os.getenv("DEBUG", "True").lower() == "true"
-            self.reload: bool = os.getenv("RELOAD", "True").lower() == "true"
-            self.log_level: str = os.getenv("LOG_LEVEL", "info")
-            
-            cors_origins_str = os.getenv("CORS_ORIGINS", "http://localhost:3000,*")
-            self.cors_origins: List[str] = [origin.strip() for origin in cors_origins_str.split(",")]
-            self.cors_credentials: bool = os.getenv("CORS_CREDENTIALS", "True").lower() == "true"
-            
-            cors_methods_str = os.getenv("CORS_METHODS", "GET,POST,PUT,DELETE")
-            self.cors_methods: List[str] = [method.strip() for method in cors_methods_str.split(",")]
-            
-            cors_headers_str = os.getenv("CORS_HEADERS", "*")
-            self.cors_headers: List[str] = [header.strip() for header in cors_headers_str.split(",")]
-            
-            self.mongodb_url: str = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
-            self.database_name: str = os.getenv("DATABASE_NAME", "finvest_analysis")
-            
-            self.tavily_api_key: str = os.getenv("TAVILY_API_KEY", "")
-            self.google_api_key: str = os.getenv("GOOGLE_API_KEY", "")
-            self.groq_api_key: str = os.getenv("GROQ_API_KEY", "")
-
-settings = Settings()
+from typing import List, Dict, Any
+import os
+import json
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+try:
+    from pydantic_settings import BaseSettings
+    from typing import Optional
+    
+    class Settings(BaseSettings):
+        app_name: str = "Financial Analysis Agent API"
+        app_version: str = "1.0.0"
+        app_description: str = "API for financial analysis using AI agent"
+        
+        host: str = "0.0.0.0"
+        port: int = 8000
+        debug: bool = True
+        reload: bool = True
+        log_level: str = "info"
+        warmup_on_startup: bool = True
+        
+        cors_origins: List[str] = [
+            "http://localhost:3000",
+            "https://finvest-rosy.vercel.app",
+            "https://finvest.dishant.site"
+        ]
+        cors_credentials: bool = True
+        cors_methods: List[str] = ["GET", "POST", "PUT", "DELETE"]
+        cors_headers: List[str] = ["*"]
+        gzip_minimum_size: int = 1000
+        
+        database_name: str = "finvest_analysis"
+        
+        tavily_api_key: Optional[str] = None
+        google_api_key: Optional[str] = None
+        groq_api_key: Optional[str] = None
+        
+        cassette_mode: Optional[str] = None
+        cassette_path: str = "cassettes"
+        cassette_speed: float = 1.0
+        
+        data_dir: str = ".finvest_data"
+        
+        cache_max_entries: int = 256
+        cache_ttl_financial: int = 6 * 3600
+        cache_ttl_news: int = 30 * 60
+        cache_ttl_transcript: int = 24 * 3600
+        
+        news_min_refresh_seconds: int = 300
+        news_delta_max_results: int = 5
+        news_raw_content_chars: int = 20000
+        news_context_tokens: int = 1500
+        news_passage_words: int = 120
+        
+        transcript_chunk_words: int = 200
+        transcript_context_tokens: int = 2500
+        transcript_history_quarters: int = 4
+        
+        artifact_min_bytes: int = 4096
+        artifact_memory_bytes: int = 64 * 1024 * 1024
+        artifact_ttl: int = 24 * 3600
+        
+        crawl_workers: int = 8
+        crawl_per_domain: int = 1
+        crawl_seeds_per_domain: int = 1
+        crawl_max_seeds: int = 3
+        crawl_cache_ttl: int = 24 * 3600
+        
+        download_workers: int = 8
+        download_per_host: int = 4
+        download_retries: int = 3
+        
+        prefetch_enabled: bool = False
+        prefetch_top_n: int = 0
+        prefetch_interval_financial: int = 5 * 3600
+        prefetch_interval_news: int = 20 * 60
+        prefetch_interval_transcript: int = 12 * 3600
+        prefetch_check_seconds: int = 60
+        prefetch_spacing_seconds: float = 2.0
+        
+        rate_limits: Dict[str, Any] = {}
+        rate_limit_max_attempts: int = 3
+        rate_limit_max_backoff: float = 30.0
+        rate_limit_max_wait: float = 60.0
+        
+        checkpoint_backend: str = "memory"
+        checkpoint_max_threads: int = 500
+        conversation_data_max_age: int = 15 * 60
+        
+        # Persist messages after responding, through a journaled queue
+        write_behind_enabled: bool = False
+        write_behind_batch_size: int = 50
+        write_behind_max_backoff: float = 30.0
+        write_behind_drain_seconds: float = 10.0
+        
+        admission_max_concurrent: int = 8
+        admission_max_queue: int = 32
+        admission_max_wait: float = 30.0
+        admission_per_user: int = 4
+        
+        fast_path_enabled: bool = True
+        screening_top_n: int = 5
+        
+        batch_max_queries: int = 50
+        batch_concurrency: int = 4
+        
+        # Per-request profiling is off unless a token is configured
+        profile_token: Optional[str] = None
+        profile_interval_ms: float = 5.0
+        
+        request_timeout_seconds: float = 120.0
+        stage_budgets: Dict[str, float] = {
+            "financial": 20.0,
+            "news": 15.0,
+            "transcript": 60.0,
+            "website": 45.0,
+            "resources": 45.0,
+            "synthesis": 45.0
+        }
+        stage_workers: int = 16
+        tavily_timeout: float = 30.0
+        llm_timeout: float = 60.0
+        http_timeout: float = 20.0
+        
+        model_routes: Dict[str, List[str]] = {
+            "synthesis": ["gemini:gemini-2.0-flash", "groq:llama-3.3-70b-versatile"],
+            "comparative": ["gemini:gemini-2.0-flash", "groq:llama-3.3-70b-versatile"],
+            "screening": ["groq:llama-3.3-70b-versatile", "gemini:gemini-2.0-flash"],
+            "transcript": ["groq:llama-3.3-70b-versatile", "gemini:gemini-2.0-flash"],
+            "news_summary": ["groq:llama-3.1-8b-instant", "gemini:gemini-2.0-flash-lite", "gemini:gemini-2.0-flash"],
+            "transcript_qa": ["groq:llama-3.1-8b-instant", "gemini:gemini-2.0-flash-lite", "gemini:gemini-2.0-flash"],
+            "small": ["groq:llama-3.1-8b-instant", "gemini:gemini-2.0-flash-lite"]
+        }
+        model_limits: Dict[str, int] = {}
+        model_small_input_tokens: int = 3000
+        model_stats_alpha: float = 0.2
+        model_failure_threshold: int = 3
+        model_cooldown_seconds: float = 60.0
+        
+        model_config = {
+            "env_file": ".env", 
+            "case_sensitive": False,
+            "extra": "allow"
+        }
+
+except ImportError:
+    class Settings:
+        """Application settings with environment variable support"""
+        
+        def __init__(self):
+            self.app_name: str = os.getenv("APP_NAME", "Financial Analysis Agent API")
+            self.app_version: str = os.getenv("APP_VERSION", "1.0.0")
+            self.app_description: str = os.getenv("APP_DESCRIPTION", "API for financial analysis using AI agent")
+            
+            self.host: str = os.getenv("HOST", "0.0.0.0")
+            self.port: int = int(os.getenv("PORT", "8000"))
+            self.debug: bool = os.getenv("DEBUG", "True").lower() == "true"
+            self.reload: bool = os.getenv("RELOAD", "True").lower() == "true"
+            self.log_level: str = os.getenv("LOG_LEVEL", "info")
+            self.warmup_on_startup: bool = os.getenv("WARMUP_ON_STARTUP", "True").lower() == "true"
+            
+            cors_origins_str = os.getenv("CORS_ORIGINS", "http://localhost:3000,*")
+            self.cors_origins: List[str] = [origin.strip() for origin in cors_origins_str.split(",")]
+            self.cors_credentials: bool = os.getenv("CORS_CREDENTIALS", "True").lower() == "true"
+            
+            cors_methods_str = os.getenv("CORS_METHODS", "GET,POST,PUT,DELETE")
+            self.cors_methods: List[str] = [method.strip() for method in cors_methods_str.split(",")]
+            
+            cors_headers_str = os.getenv("CORS_HEADERS", "*")
+            self.cors_headers: List[str] = [header.strip() for header in cors_headers_str.split(",")]
+            self.gzip_minimum_size: int = int(os.getenv("GZIP_MINIMUM_SIZE", "1000"))
+            
+            self.mongodb_url: str = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+            self.database_name: str = os.getenv("DATABASE_NAME", "finvest_analysis")
+            
+            self.tavily_api_key: str = os.getenv("TAVILY_API_KEY", "")
+            self.google_api_key: str = os.getenv("GOOGLE_API_KEY", "")
+            self.groq_api_key: str = os.getenv("GROQ_API_KEY", "")
+            
+            self.cassette_mode: str = os.getenv("CASSETTE_MODE", "")
+            self.cassette_path: str = os.getenv("CASSETTE_PATH", "cassettes")
+            self.cassette_speed: float = float(os.getenv("CASSETTE_SPEED", "1.0"))
+            
+            self.data_dir: str = os.getenv("DATA_DIR", ".finvest_data")
+            
+            self.cache_max_entries: int = int(os.getenv("CACHE_MAX_ENTRIES", "256"))
+            self.cache_ttl_financial: int = int(os.getenv("CACHE_TTL_FINANCIAL", str(6 * 3600)))
+            self.cache_ttl_news: int = int(os.getenv("CACHE_TTL_NEWS", str(30 * 60)))
+            self.cache_ttl_transcript: int = int(os.getenv("CACHE_TTL_TRANSCRIPT", str(24 * 3600)))
+            
+            self.news_min_refresh_seconds: int = int(os.getenv("NEWS_MIN_REFRESH_SECONDS", "300"))
+            self.news_delta_max_results: int = int(os.getenv("NEWS_DELTA_MAX_RESULTS", "5"))
+            self.news_raw_content_chars: int = int(os.getenv("NEWS_RAW_CONTENT_CHARS", "20000"))
+            self.news_context_tokens: int = int(os.getenv("NEWS_CONTEXT_TOKENS", "1500"))
+            self.news_passage_words: int = int(os.getenv("NEWS_PASSAGE_WORDS", "120"))
+            
+            self.transcript_chunk_words: int = int(os.getenv("TRANSCRIPT_CHUNK_WORDS", "200"))
+            self.transcript_context_tokens: int = int(os.getenv("TRANSCRIPT_CONTEXT_TOKENS", "2500"))
+            self.transcript_history_quarters: int = int(os.getenv("TRANSCRIPT_HISTORY_QUARTERS", "4"))
+            
+            self.artifact_min_bytes: int = int(os.getenv("ARTIFACT_MIN_BYTES", "4096"))
+            self.artifact_memory_bytes: int = int(os.getenv("ARTIFACT_MEMORY_BYTES", str(64 * 1024 * 1024)))
+            self.artifact_ttl: int = int(os.getenv("ARTIFACT_TTL", str(24 * 3600)))
+            
+            self.crawl_workers: int = int(os.getenv("CRAWL_WORKERS", "8"))
+            self.crawl_per_domain: int = int(os.getenv("CRAWL_PER_DOMAIN", "1"))
+            self.crawl_seeds_per_domain: int = int(os.getenv("CRAWL_SEEDS_PER_DOMAIN", "1"))
+            self.crawl_max_seeds: int = int(os.getenv("CRAWL_MAX_SEEDS", "3"))
+            self.crawl_cache_ttl: int = int(os.getenv("CRAWL_CACHE_TTL", str(24 * 3600)))
+            
+            self.download_workers: int = int(os.getenv("DOWNLOAD_WORKERS", "8"))
+            self.download_per_host: int = int(os.getenv("DOWNLOAD_PER_HOST", "4"))
+            self.download_retries: int = int(os.getenv("DOWNLOAD_RETRIES", "3"))
+            
+            self.prefetch_enabled: bool = os.getenv("PREFETCH_ENABLED", "False").lower() == "true"
+            self.prefetch_top_n: int = int(os.getenv("PREFETCH_TOP_N", "0"))
+            self.prefetch_interval_financial: int = int(os.getenv("PREFETCH_INTERVAL_FINANCIAL", str(5 * 3600)))
+            self.prefetch_interval_news: int = int(os.getenv("PREFETCH_INTERVAL_NEWS", str(20 * 60)))
+            self.prefetch_interval_transcript: int = int(os.getenv("PREFETCH_INTERVAL_TRANSCRIPT", str(12 * 3600)))
+            self.prefetch_check_seconds: int = int(os.getenv("PREFETCH_CHECK_SECONDS", "60"))
+            self.prefetch_spacing_seconds: float = float(os.getenv("PREFETCH_SPACING_SECONDS", "2.0"))
+            
+            self.rate_limits: Dict[str, Any] = json.loads(os.getenv("RATE_LIMITS", "{}"))
+            self.rate_limit_max_attempts: int = int(os.getenv("RATE_LIMIT_MAX_ATTEMPTS", "3"))
+            self.rate_limit_max_backoff: float = float(os.getenv("RATE_LIMIT_MAX_BACKOFF", "30.0"))
+            self.rate_limit_max_wait: float = float(os.getenv("RATE_LIMIT_MAX_WAIT", "60.0"))
+            
+            self.checkpoint_backend: str = os.getenv("CHECKPOINT_BACKEND", "memory")
+            self.checkpoint_max_threads: int = int(os.getenv("CHECKPOINT_MAX_THREADS", "500"))
+            self.conversation_data_max_age: int = int(os.getenv("CONVERSATION_DATA_MAX_AGE", str(15 * 60)))
+            
+            self.write_behind_enabled: bool = os.getenv("WRITE_BEHIND_ENABLED", "False").lower() == "true"
+            self.write_behind_batch_size: int = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "50"))
+            self.write_behind_max_backoff: float = float(os.getenv("WRITE_BEHIND_MAX_BACKOFF", "30.0"))
+            self.write_behind_drain_seconds: float = float(os.getenv("WRITE_BEHIND_DRAIN_SECONDS", "10.0"))
+            
+            self.admission_max_concurrent: int = int(os.getenv("ADMISSION_MAX_CONCURRENT", "8"))
+            self.admission_max_queue: int = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+            self.admission_max_wait: float = float(os.getenv("ADMISSION_MAX_WAIT", "30.0"))
+            self.admission_per_user: int = int(os.getenv("ADMISSION_PER_USER", "4"))
+            
+            self.fast_path_enabled: bool = os.getenv("FAST_PATH_ENABLED", "True").lower() == "true"
+            self.screening_top_n: int = int(os.getenv("SCREENING_TOP_N", "5"))
+            
+            self.batch_max_queries: int = int(os.getenv("BATCH_MAX_QUERIES", "50"))
+            self.batch_concurrency: int = int(os.getenv("BATCH_CONCURRENCY", "4"))
+            
+            self.profile_token: Optional[str] = os.getenv("PROFILE_TOKEN") or None
+            self.profile_interval_ms: float = float(os.getenv("PROFILE_INTERVAL_MS", "5.0"))
+            
+            self.request_timeout_seconds: float = float(os.getenv("REQUEST_TIMEOUT_SECONDS", "120.0"))
+            self.stage_budgets: Dict[str, float] = {
+                "financial": 20.0,
+                "news": 15.0,
+                "transcript": 60.0,
+                "website": 45.0,
+                "resources": 45.0,
+                "synthesis": 45.0,
+                **json.loads(os.getenv("STAGE_BUDGETS", "{}"))
+            }
+            self.stage_workers: int = int(os.getenv("STAGE_WORKERS", "16"))
+            self.tavily_timeout: float = float(os.getenv("TAVILY_TIMEOUT", "30.0"))
+            self.llm_timeout: float = float(os.getenv("LLM_TIMEOUT", "60.0"))
+            self.http_timeout: float = float(os.getenv("HTTP_TIMEOUT", "20.0"))
+            
+            self.model_routes: Dict[str, List[str]] = {
+                "synthesis": ["gemini:gemini-2.0-flash", "groq:llama-3.3-70b-versatile"],
+                "comparative": ["gemini:gemini-2.0-flash", "groq:llama-3.3-70b-versatile"],
+                "screening": ["groq:llama-3.3-70b-versatile", "gemini:gemini-2.0-flash"],
+                "transcript": ["groq:llama-3.3-70b-versatile", "gemini:gemini-2.0-flash"],
+                "news_summary": ["groq:llama-3.1-8b-instant", "gemini:gemini-2.0-flash-lite", "gemini:gemini-2.0-flash"],
+                "transcript_qa": ["groq:llama-3.1-8b-instant", "gemini:gemini-2.0-flash-lite", "gemini:gemini-2.0-flash"],
+                "small": ["groq:llama-3.1-8b-instant", "gemini:gemini-2.0-flash-lite"],
+                **json.loads(os.getenv("MODEL_ROUTES", "{}"))
+            }
+            self.model_limits: Dict[str, int] = json.loads(os.getenv("MODEL_LIMITS", "{}"))
+            self.model_small_input_tokens: int = int(os.getenv("MODEL_SMALL_INPUT_TOKENS", "3000"))
+            self.model_stats_alpha: float = float(os.getenv("MODEL_STATS_ALPHA", "0.2"))
+            self.model_failure_threshold: int = int(os.getenv("MODEL_FAILURE_THRESHOLD", "3"))
+            self.model_cooldown_seconds: float = float(os.getenv("MODEL_COOLDOWN_SECONDS", "60.0"))
+
+settings = Settings()
@@ -1,74 +1,105 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-import logging
-from database import connect_to_mongo, close_mongo_connection
-from routes import users, conversations, analysis
-from config.settings import settings
-
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-def create_app() -> FastAPI:
-    """Application factory pattern"""
-    app = FastAPI(
-        title=settings.app_name,
-        description=settings.app_description,
-        version=settings.app_version
-    )
-    
-    app.add_middleware(
-        CORSMiddleware,
-        allow_origins=settings.cors_origins,
-        allow_credentials=settings.cors_credentials,
-        allow_methods=settings.cors_methods,
-        allow_headers=settings.cors_headers,
-    )
-    
-    app.add_event_handler("startup", startup_event)
-    app.add_event_handler("shutdown", shutdown_event)
-    
-    app.include_router(users.router)
-    app.include_router(conversations.router)
-    app.include_router(analysis.router)
-    
-    return app
-
-async def startup_event():
-    """Database connection startup"""
-    await connect_to_mongo()
-    logger.info("Connected to MongoDB")
-
-async def shutdown_event():
-    """Database connection shutdown"""
-    await close_mongo_connection()
-    logger.info("Disconnected from MongoDB")
-
-app = create_app()
-
-@app.get("/")
-async def root():
-    """Root endpoint"""
-    return {
-        "message": settings.app_name, 
-        "version": settings.app_version,
-        "status": "running"
-    }
-
-@app.get("/health")
-async def health_check():
-    """Health check endpoint"""
-    return {
-        "status": "healthy", 
-        "app": settings.app_name,
-        "version": settings.app_version
-    }
-
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(
-        "main:app", 
-        host=settings.host, 
-        port=settings.port, 
-        reload=settings.reload, 
-        log_level=settings.log_level
-    )
+import asyncio
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+import logging
+from database import connect_to_mongo, close_mongo_connection
+from routes import users, conversations, analysis, metrics
+from config.settings import settings
+from services.prefetch_service import prefetch_service
+from services.persistence_service import persistence_service
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def create_app() -> FastAPI:
+    """Application factory pattern"""
+    app = FastAPI(
+        title=settings.app_name,
+        description=settings.app_description,
+        version=settings.app_version,
+        default_response_class=ORJSONResponse
+    )
+    
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.cors_origins,
+        allow_credentials=settings.cors_credentials,
+        allow_methods=settings.cors_methods,
+        allow_headers=settings.cors_headers,
+        expose_headers=["ETag", "Last-Modified"],
+    )
+    
+    # Analyses are large markdown documents; compress anything over the threshold
+    app.add_middleware(GZipMiddleware, minimum_size=settings.gzip_minimum_size)
+    
+    app.add_event_handler("startup", startup_event)
+    app.add_event_handler("shutdown", shutdown_event)
+    
+    app.include_router(users.router)
+    app.include_router(conversations.router)
+    app.include_router(analysis.router)
+    app.include_router(metrics.router)
+    
+    return app
+
+def warmup_agent():
+    """Compile the analysis graph and create model clients in the background"""
+    from agent.financial_agent import warmup
+    try:
+        warmup()
+        logger.info("Analysis agent warmed up")
+    except Exception as e:
+        logger.error(f"Agent warmup failed: {str(e)}")
+
+async def startup_event():
+    """Database connection startup"""
+    await connect_to_mongo()
+    logger.info("Connected to MongoDB")
+    
+    if settings.warmup_on_startup:
+        asyncio.get_running_loop().run_in_executor(None, warmup_agent)
+    
+    if settings.prefetch_enabled:
+        await prefetch_service.start()
+    
+    # Started even when write-behind is off, to replay journals left by a crash
+    await persistence_service.start()
+
+async def shutdown_event():
+    """Database connection shutdown"""
+    await prefetch_service.stop()
+    await persistence_service.stop()
+    await close_mongo_connection()
+    logger.info("Disconnected from MongoDB")
+
+app = create_app()
+
+@app.get("/")
+async def root():
+    """Root endpoint"""
+    return {
+        "message": settings.app_name, 
+        "version": settings.app_version,
+        "status": "running"
+    }
+
+@app.get("/health")
+async def health_check():
+    """Health check endpoint"""
+    return {
+        "status": "healthy", 
+        "app": settings.app_name,
+        "version": settings.app_version
+    }
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(
+        "main:app", 
+        host=settings.host, 
+        port=settings.port, 
+        reload=settings.reload, 
+        log_level=settings.log_level
+    )
@@ -1,4 +1,4 @@
-from .user import User
-from .conversation import Conversation, Message
-
-__all__ = ["User", "Conversation", "Message"]
+from .user import User
+from .conversation import Conversation, ConversationVersion, ExecutionRecord, Message
+
+__all__ = ["User", "Conversation", "ConversationVersion", "ExecutionRecord", "Message"]
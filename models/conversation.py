@@ -1,20 +1,37 @@
-from beanie import Document, Link
-from pydantic import BaseModel, Field
-from typing import List, Optional
-from datetime import datetime, timezone
-from models.user import User
-
-class Message(BaseModel):
-    role: str = Field(..., description="Either user or ai")
-    content: str = Field(..., description="Message content")
-    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-
-class Conversation(Document):
-    user: Link[User]
-    title: Optional[str] = Field(None, description="Conversation title")
-    messages: List[Message] = Field(default_factory=list)
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    
-    class Settings:
-        collection = "conversations"
+from beanie import Document, Link, PydanticObjectId
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+from datetime import datetime, timezone
+from models.user import User
+
+class ExecutionRecord(BaseModel):
+    """How an AI message was produced (see agent.ledger)"""
+    total_ms: float
+    analysis_type: Optional[str] = None
+    companies: List[str] = Field(default_factory=list)
+    nodes_ms: Dict[str, float] = Field(default_factory=dict)
+    upstream_calls: Dict[str, int] = Field(default_factory=dict)
+    tokens: Dict[str, Dict[str, int]] = Field(default_factory=dict, description="input, output and calls per model")
+    cache_hits: Dict[str, int] = Field(default_factory=dict)
+    cache_misses: Dict[str, int] = Field(default_factory=dict)
+
+class Message(BaseModel):
+    role: str = Field(..., description="Either user or ai")
+    content: str = Field(..., description="Message content")
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    execution: Optional[ExecutionRecord] = Field(None, description="Execution ledger of an AI message")
+
+class Conversation(Document):
+    user: Link[User]
+    title: Optional[str] = Field(None, description="Conversation title")
+    messages: List[Message] = Field(default_factory=list)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    
+    class Settings:
+        collection = "conversations"
+
+class ConversationVersion(BaseModel):
+    """Projection used to answer conditional GETs without loading messages"""
+    id: PydanticObjectId = Field(alias="_id")
+    updated_at: datetime
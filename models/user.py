@@ -1,25 +1,25 @@
-from beanie import Document
-from pydantic import EmailStr, Field
-from datetime import datetime, timezone
-import bcrypt
-
-class User(Document):
-    username: str = Field(..., min_length=3, max_length=50)
-    email: EmailStr
-    password_hash: str
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    
-    class Settings:
-        collection = "users"
-        
-    @staticmethod
-    def hash_password(password: str) -> str:
-        """Hash password using bcrypt"""
-        salt = bcrypt.gensalt()
-        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
-    
-    @staticmethod
-    def verify_password(password: str, password_hash: str) -> bool:
-        """Verify password against hash"""
+from beanie import Document
+from pydantic import EmailStr, Field
+from datetime import datetime, timezone
+import bcrypt
+
+class User(Document):
+    username: str = Field(..., min_length=3, max_length=50)
+    email: EmailStr
+    password_hash: str
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    
+    class Settings:
+        collection = "users"
+        
+    @staticmethod
+    def hash_password(password: str) -> str:
+        """Hash password using bcrypt"""
+        salt = bcrypt.gensalt()
+        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+    
+    @staticmethod
+    def verify_password(password: str, password_hash: str) -> bool:
+        """Verify password against hash"""
         return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
\ No newline at end of file
@@ -1 +1 @@
-# Routes package
+# Routes package
@@ -1,16 +1,40 @@
-from fastapi import APIRouter
-import logging
-from schemas.analysis import AnalysisRequest
-from services.analysis_service import AnalysisService
-
-logger = logging.getLogger(__name__)
-router = APIRouter(tags=["analysis"])
-
-@router.post("/analyze")
-async def analyze_financial_query(request: AnalysisRequest):
-    """Analyze financial query and store conversation"""
-    logger.info(f"Received analysis request from user {request.user_id}: {request.query[:100]}...")
-    
-    analysis_service = AnalysisService()
-    result = await analysis_service.analyze(request.query, request.user_id, request.conversation_id)
-    return result
+from fastapi import APIRouter, HTTPException, Request
+import hmac
+import logging
+from config.settings import settings
+from schemas.analysis import AnalysisRequest, BatchAnalysisRequest
+from services.analysis_service import AnalysisService
+
+logger = logging.getLogger(__name__)
+router = APIRouter(tags=["analysis"])
+
+def profiling_requested(http_request: Request) -> bool:
+    """
+    Whether the caller asked for a profile with the X-Debug-Profile header
+    or the profile query parameter. Either must carry settings.profile_token.
+    """
+    token = http_request.headers.get("X-Debug-Profile") or http_request.query_params.get("profile")
+    if not token:
+        return False
+    if not settings.profile_token or not hmac.compare_digest(token, settings.profile_token):
+        raise HTTPException(status_code=403, detail="Profiling is not allowed for this caller")
+    return True
+
+@router.post("/analyze")
+async def analyze_financial_query(request: AnalysisRequest, http_request: Request):
+    """Analyze financial query and store conversation"""
+    logger.info(f"Received analysis request from user {request.user_id}: {request.query[:100]}...")
+    profile = profiling_requested(http_request)
+    
+    analysis_service = AnalysisService()
+    result = await analysis_service.analyze(request.query, request.user_id, request.conversation_id, profile=profile)
+    return result
+
+@router.post("/analyze/batch")
+async def analyze_financial_queries(request: BatchAnalysisRequest):
+    """Analyze many queries, fetching each company's data once for the whole batch"""
+    logger.info(f"Received batch of {len(request.queries)} queries from user {request.user_id}")
+    
+    analysis_service = AnalysisService()
+    result = await analysis_service.analyze_batch(request.queries, request.user_id)
+    return result
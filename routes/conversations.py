@@ -1,70 +1,83 @@
-from fastapi import APIRouter, HTTPException
-from datetime import datetime
-from models.user import User
-from models.conversation import Conversation
-from schemas.conversation import ConversationCreate, ConversationResponse
-
-router = APIRouter(prefix="/conversations", tags=["conversations"])
-
-@router.post("", response_model=ConversationResponse)
-async def create_conversation(conversation_data: ConversationCreate, user_id: str):
-    """Create a new conversation for a user"""
-    user = await User.get(user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    conversation = Conversation(
-        user=user,
-        title=conversation_data.title
-    )
-    await conversation.insert()
-    
-    return ConversationResponse(
-        id=str(conversation.id),
-        title=conversation.title,
-        messages=[],
-        created_at=conversation.created_at,
-        updated_at=conversation.updated_at
-    )
-
-@router.get("/{conversation_id}", response_model=ConversationResponse)
-async def get_conversation(conversation_id: str):
-    """Get a specific conversation"""
-    conversation = await Conversation.get(conversation_id)
-    if not conversation:
-        raise HTTPException(status_code=404, detail="Conversation not found")
-    
-    return ConversationResponse(
-        id=str(conversation.id),
-        title=conversation.title,
-        messages=[
-            {"role": msg.role, "content": msg.content, "timestamp": msg.timestamp}
-            for msg in conversation.messages
-        ],
-        created_at=conversation.created_at,
-        updated_at=conversation.updated_at
-    )
-
-@router.put("/{conversation_id}")
-async def update_conversation(conversation_id: str, update_data: ConversationCreate):
-    """Update conversation title"""
-    conversation = await Conversation.get(conversation_id)
-    if not conversation:
-        raise HTTPException(status_code=404, detail="Conversation not found")
-    
-    if update_data.title:
-        conversation.title = update_data.title
-    conversation.updated_at = datetime.utcnow()
-    await conversation.save()
-    
-    return {"message": "Conversation updated successfully"}
-
-@router.delete("/{conversation_id}")
-async def delete_conversation(conversation_id: str):
-    """Delete a conversation"""
-    conversation = await Conversation.get(conversation_id)
-    if not conversation:
-        raise HTTPException(status_code=404, detail="Conversation not found")
-    
-    await conversation.delete()
-    return {"message": "Conversation deleted successfully"}
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse
+from datetime import datetime
+from beanie import PydanticObjectId
+from models.user import User
+from models.conversation import Conversation, ConversationVersion
+from schemas.conversation import ConversationCreate, ConversationResponse
+from utils.helpers import validate_object_id, conversation_to_dict, validators_for, validator_headers, is_not_modified
+
+router = APIRouter(prefix="/conversations", tags=["conversations"])
+
+@router.post("", response_model=ConversationResponse)
+async def create_conversation(conversation_data: ConversationCreate, user_id: str):
+    """Create a new conversation for a user"""
+    user = await User.get(user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    conversation = Conversation(
+        user=user,
+        title=conversation_data.title
+    )
+    await conversation.insert()
+    
+    return ConversationResponse(
+        id=str(conversation.id),
+        title=conversation.title,
+        messages=[],
+        created_at=conversation.created_at,
+        updated_at=conversation.updated_at
+    )
+
+@router.get("/{conversation_id}", response_model=ConversationResponse)
+async def get_conversation(conversation_id: str, request: Request):
+    """Get a specific conversation; supports If-None-Match and If-Modified-Since"""
+    if not validate_object_id(conversation_id):
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    
+    if "if-none-match" in request.headers or "if-modified-since" in request.headers:
+        version = await Conversation.find_one(
+            Conversation.id == PydanticObjectId(conversation_id)
+        ).project(ConversationVersion)
+        if not version:
+            raise HTTPException(status_code=404, detail="Conversation not found")
+        
+        etag, last_modified = validators_for([(version.id, version.updated_at)])
+        if is_not_modified(request.headers, etag, last_modified):
+            return Response(status_code=304, headers=validator_headers(etag, last_modified))
+    
+    conversation = await Conversation.get(conversation_id)
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    
+    etag, last_modified = validators_for([(conversation.id, conversation.updated_at)])
+    return ORJSONResponse(
+        conversation_to_dict(conversation),
+        headers=validator_headers(etag, last_modified)
+    )
+
+@router.put("/{conversation_id}")
+async def update_conversation(conversation_id: str, update_data: ConversationCreate):
+    """Update conversation title"""
+    conversation = await Conversation.get(conversation_id)
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    
+    # Only the changed fields are written, so messages pushed meanwhile are kept
+    changes = {Conversation.updated_at: datetime.utcnow()}
+    if update_data.title:
+        changes[Conversation.title] = update_data.title
+    await conversation.set(changes)
+    
+    return {"message": "Conversation updated successfully"}
+
+@router.delete("/{conversation_id}")
+async def delete_conversation(conversation_id: str):
+    """Delete a conversation"""
+    conversation = await Conversation.get(conversation_id)
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    
+    await conversation.delete()
+    return {"message": "Conversation deleted successfully"}
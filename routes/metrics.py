@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Query
+from agent.cache import cache_stats
+from agent.rate_limit import limiter_snapshot
+from agent.model_router import model_router
+from agent.crawler import get_crawl_engine
+from agent.artifacts import memory_stats
+from services.admission_service import admission_service
+from services.execution_service import execution_service
+from services.persistence_service import persistence_service
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+@router.get("/upstreams")
+async def get_upstream_metrics():
+    """Rate limiter state (including queue depth), model statistics, cache statistics, request memory, admission and write-behind queue"""
+    return {
+        "rate_limits": limiter_snapshot(),
+        "models": model_router.snapshot(),
+        "caches": cache_stats(),
+        "pages": get_crawl_engine().cache.stats(),
+        "memory": memory_stats(),
+        "admission": admission_service.snapshot(),
+        "persistence": persistence_service.snapshot()
+    }
+
+@router.get("/analyses")
+async def get_analysis_metrics(
+    hours: float = Query(24, gt=0, description="Look-back window"),
+    limit: int = Query(5000, ge=1, le=50000, description="Most recent analyses to include")
+):
+    """p50/p95 latency and token use of recent analyses by analysis type and company"""
+    return await execution_service.summary(hours, limit)
@@ -1,7 +1,16 @@
-from pydantic import BaseModel, Field
-from typing import Optional
-
-class AnalysisRequest(BaseModel):
-    query: str = Field(..., min_length=1, max_length=1000, description="Financial analysis query")
-    user_id: str = Field(..., description="User ID")
-    conversation_id: Optional[str] = Field(None, description="Conversation ID")
\ No newline at end of file
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from config.settings import settings
+
+class AnalysisRequest(BaseModel):
+    query: str = Field(..., min_length=1, max_length=1000, description="Financial analysis query")
+    user_id: str = Field(..., description="User ID")
+    conversation_id: Optional[str] = Field(None, description="Conversation ID")
+
+class BatchQuery(BaseModel):
+    query: str = Field(..., min_length=1, max_length=1000, description="Financial analysis query")
+    conversation_id: Optional[str] = Field(None, description="Conversation ID")
+
+class BatchAnalysisRequest(BaseModel):
+    user_id: str = Field(..., description="User ID")
+    queries: List[BatchQuery] = Field(..., min_length=1, max_length=settings.batch_max_queries, description="Queries to analyze")
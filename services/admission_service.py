@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import math
+import time
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Tuple
+from fastapi import HTTPException
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class AdmissionService:
+    """
+    Concurrency limit with a bounded wait queue in front of analyses.
+    Waiting requests are admitted round-robin across users, and each user
+    may hold at most admission_per_user running or queued analyses.
+    Requests that cannot be admitted fail fast with 503 and Retry-After.
+    A request running several analyses at once (a batch) holds one slot
+    per concurrent analysis.
+    """
+
+    def __init__(self):
+        self._running = 0
+        self._queued = 0
+        self._per_user: Counter = Counter()
+        self._waiting: "OrderedDict[str, Deque[Tuple[asyncio.Future, int]]]" = OrderedDict()
+        self._avg_duration = 30.0
+        self.admitted = 0
+        self.rejected = 0
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely to free up, from the average analysis duration"""
+        waves = (self._queued + 1) / max(1, settings.admission_max_concurrent)
+        return max(1, min(120, math.ceil(self._avg_duration * waves)))
+
+    def _reject(self, reason: str) -> HTTPException:
+        self.rejected += 1
+        logger.warning(f"Rejecting analysis request: {reason}")
+        return HTTPException(
+            status_code=503,
+            detail=f"Server busy ({reason}), please retry later",
+            headers={"Retry-After": str(self.retry_after())}
+        )
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiting requests, one user at a time"""
+        while self._waiting:
+            user_id, waiters = next(iter(self._waiting.items()))
+            future, slots = waiters[0]
+            # The next waiter keeps its turn until enough slots are free, so batches are not starved
+            if not future.done() and self._running + slots > settings.admission_max_concurrent:
+                return
+            waiters.popleft()
+            if waiters:
+                self._waiting.move_to_end(user_id)
+            else:
+                del self._waiting[user_id]
+            self._queued -= 1
+            if future.done():
+                continue
+            self._running += slots
+            future.set_result(True)
+
+    def _uncount(self, user_id: str, slots: int) -> None:
+        self._per_user[user_id] -= slots
+        if self._per_user[user_id] <= 0:
+            del self._per_user[user_id]
+
+    def _release(self, user_id: str, slots: int = 1) -> None:
+        self._running -= slots
+        self._uncount(user_id, slots)
+        self._dispatch()
+
+    def _forget(self, user_id: str, future: asyncio.Future, slots: int) -> None:
+        """Drop a waiter that gave up before it was admitted"""
+        waiters = self._waiting.get(user_id)
+        if waiters and (future, slots) in waiters:
+            waiters.remove((future, slots))
+            self._queued -= 1
+            if not waiters:
+                del self._waiting[user_id]
+        self._uncount(user_id, slots)
+        # A large waiter at the head may have been holding others back
+        self._dispatch()
+
+    def slots_for(self, concurrency: int) -> int:
+        """Slots charged for running `concurrency` analyses at once, capped so it can ever be admitted"""
+        limit = settings.admission_max_concurrent
+        if settings.admission_per_user:
+            limit = min(limit, settings.admission_per_user)
+        return max(1, min(concurrency, limit))
+
+    async def _acquire(self, user_id: str, slots: int) -> None:
+        if settings.admission_per_user and self._per_user[user_id] + slots > settings.admission_per_user:
+            raise self._reject("too many analyses in progress for this user")
+
+        if self._running + slots <= settings.admission_max_concurrent and not self._waiting:
+            self._running += slots
+            self._per_user[user_id] += slots
+            return
+
+        if self._queued >= settings.admission_max_queue:
+            raise self._reject("queue full")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(user_id, deque()).append((future, slots))
+        self._queued += 1
+        self._per_user[user_id] += slots
+
+        try:
+            await asyncio.wait_for(asyncio.shield(future), settings.admission_max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # The slot was granted just as the wait ended; give it back
+                self._release(user_id, slots)
+            else:
+                future.cancel()
+                self._forget(user_id, future, slots)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise self._reject("timed out waiting for a slot")
+
+    @asynccontextmanager
+    async def admit(self, user_id: str, slots: int = 1):
+        """Hold `slots` analysis slots (see slots_for) for the duration of the block"""
+        await self._acquire(user_id, slots)
+        self.admitted += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._avg_duration = 0.8 * self._avg_duration + 0.2 * (time.monotonic() - started)
+            self._release(user_id, slots)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "running": self._running,
+            "queued": self._queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_duration": round(self._avg_duration, 2),
+            "retry_after": self.retry_after()
+        }
+
+admission_service = AdmissionService()
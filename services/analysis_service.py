@@ -1,57 +1,157 @@
-import logging
-from datetime import datetime
-from fastapi import HTTPException
-from models.user import User
-from models.conversation import Conversation, Message
-from agent.financial_agent import analyze_query
-from utils.helpers import generate_conversation_title, APIResponse
-
-logger = logging.getLogger(__name__)
-
-class AnalysisService:
-    """Service for handling financial analysis operations"""
-    
-    async def analyze(self, query: str, user_id: str, conversation_id: str = None) -> dict:
-        """Analyze query and store conversation"""
-        try:
-            if conversation_id:
-                conversation = await Conversation.get(conversation_id)
-                if not conversation:
-                    raise HTTPException(status_code=404, detail="Conversation not found")
-            else:
-                user = await User.get(user_id)
-                if not user:
-                    raise HTTPException(status_code=404, detail="User not found")
-                
-                conversation = Conversation(
-                    user=user,
-                    title=generate_conversation_title(query)
-                )
-                await conversation.insert()
-            
-            user_message = Message(role="user", content=query)
-            conversation.messages.append(user_message)
-            
-            analysis_result = analyze_query(query)
-            
-            if analysis_result:
-                ai_message = Message(role="ai", content=analysis_result)
-                conversation.messages.append(ai_message)
-                conversation.updated_at = datetime.utcnow()
-                await conversation.save()
-                
-                return {
-                    **APIResponse.success(
-                        data=analysis_result,
-                        message="Analysis completed successfully"
-                    ),
-                    "conversation_id": str(conversation.id)
-                }
-            else:
-                return APIResponse.error("No analysis result returned")
-                
-        except HTTPException:
-            raise
-        except Exception as e:
-            logger.error(f"Error during analysis: {str(e)}")
-            return APIResponse.error(f"Analysis failed: {str(e)}")
+import asyncio
+import logging
+from datetime import datetime
+from typing import List
+from fastapi import HTTPException
+from models.user import User
+from models.conversation import Conversation, ExecutionRecord, Message
+from agent.financial_agent import analyze_query, analyze_batch, profile_query
+from agent.ledger import request_ledger
+from config.settings import settings
+from schemas.analysis import BatchQuery
+from services.admission_service import admission_service
+from services.persistence_service import persistence_service
+from utils.helpers import generate_conversation_title, APIResponse
+
+logger = logging.getLogger(__name__)
+
+class AnalysisService:
+    """Service for handling financial analysis operations"""
+    
+    async def _get_or_create_conversation(self, query: str, user_id: str, conversation_id: str = None) -> Conversation:
+        if conversation_id:
+            conversation = await Conversation.get(conversation_id)
+            if not conversation:
+                raise HTTPException(status_code=404, detail="Conversation not found")
+            return conversation
+        
+        user = await User.get(user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        
+        conversation = Conversation(
+            user=user,
+            title=generate_conversation_title(query)
+        )
+        await conversation.insert()
+        return conversation
+    
+    async def _persist(self, conversation: Conversation, new_messages: List[Message]) -> None:
+        """
+        Append new messages now, or hand them to the write-behind queue when
+        it is running. Messages are pushed rather than saving the whole
+        document, which would overwrite messages written by the queue.
+        """
+        if settings.write_behind_enabled and persistence_service.running:
+            await persistence_service.enqueue(conversation, new_messages)
+        else:
+            await conversation.update({
+                "$push": {"messages": {"$each": [message.model_dump() for message in new_messages]}},
+                "$set": {"updated_at": conversation.updated_at}
+            })
+    
+    async def analyze(self, query: str, user_id: str, conversation_id: str = None, profile: bool = False) -> dict:
+        """Analyze query and store conversation, with a profile report when profile is set"""
+        try:
+            async with admission_service.admit(user_id):
+                conversation = await self._get_or_create_conversation(query, user_id, conversation_id)
+                
+                user_message = Message(role="user", content=query)
+                conversation.messages.append(user_message)
+                
+                profile_report = None
+                with request_ledger() as ledger:
+                    if profile:
+                        analysis_result, profile_report = await asyncio.to_thread(
+                            profile_query, query, conversation_id=str(conversation.id)
+                        )
+                    else:
+                        analysis_result = await asyncio.to_thread(analyze_query, query, conversation_id=str(conversation.id))
+            
+                if analysis_result:
+                    ai_message = Message(
+                        role="ai",
+                        content=analysis_result,
+                        execution=ExecutionRecord(**ledger.record())
+                    )
+                    conversation.messages.append(ai_message)
+                    conversation.updated_at = datetime.utcnow()
+                    await self._persist(conversation, [user_message, ai_message])
+                
+                    response = {
+                        **APIResponse.success(
+                            data=analysis_result,
+                            message="Analysis completed successfully"
+                        ),
+                        "conversation_id": str(conversation.id)
+                    }
+                    if profile_report is not None:
+                        response["profile"] = profile_report
+                    return response
+                else:
+                    return APIResponse.error("No analysis result returned")
+                
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error during analysis: {str(e)}")
+            return APIResponse.error(f"Analysis failed: {str(e)}")
+    
+    async def analyze_batch(self, queries: List[BatchQuery], user_id: str) -> dict:
+        """Analyze many queries with shared data fetching and store each in its conversation"""
+        try:
+            # Admitted before any conversation is created, so a 503 leaves nothing behind.
+            # The batch is charged one slot per analysis it runs at once.
+            slots = admission_service.slots_for(min(settings.batch_concurrency, len(queries)))
+            async with admission_service.admit(user_id, slots):
+                existing = {}
+                conversations = []
+                for item in queries:
+                    if item.conversation_id in existing:
+                        conversations.append(existing[item.conversation_id])
+                        continue
+                    conversation = await self._get_or_create_conversation(item.query, user_id, item.conversation_id)
+                    if item.conversation_id:
+                        existing[item.conversation_id] = conversation
+                    conversations.append(conversation)
+                
+                results = await asyncio.to_thread(
+                    analyze_batch,
+                    [item.query for item in queries],
+                    [str(conversation.id) for conversation in conversations],
+                    concurrency=slots
+                )
+            
+            data = []
+            new_messages = {}
+            for item, conversation, (analysis_result, execution) in zip(queries, conversations, results):
+                messages = [Message(role="user", content=item.query)]
+                if analysis_result:
+                    messages.append(Message(
+                        role="ai",
+                        content=analysis_result,
+                        execution=ExecutionRecord(**execution)
+                    ))
+                conversation.messages.extend(messages)
+                conversation.updated_at = datetime.utcnow()
+                new_messages.setdefault(id(conversation), (conversation, []))[1].extend(messages)
+                
+                data.append({
+                    "query": item.query,
+                    "conversation_id": str(conversation.id),
+                    "result": analysis_result
+                })
+            
+            for conversation, messages in new_messages.values():
+                await self._persist(conversation, messages)
+            
+            return APIResponse.success(
+                data=data,
+                message=f"Analyzed {len(data)} queries"
+            )
+            
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error during batch analysis: {str(e)}")
+            return APIResponse.error(f"Batch analysis failed: {str(e)}")
@@ -0,0 +1,83 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+from models.conversation import Conversation
+
+logger = logging.getLogger(__name__)
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of values, which must be sorted"""
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+class ExecutionService:
+    """Aggregates the execution ledgers stored on AI messages"""
+
+    async def recent_records(self, hours: float, limit: int) -> List[Dict[str, Any]]:
+        """Execution records of the most recent AI messages within the window"""
+        since = datetime.now(timezone.utc) - timedelta(hours=hours)
+        pipeline = [
+            {"$unwind": "$messages"},
+            {"$match": {
+                "messages.role": "ai",
+                "messages.execution": {"$ne": None},
+                "messages.timestamp": {"$gte": since}
+            }},
+            {"$sort": {"messages.timestamp": -1}},
+            {"$limit": limit},
+            {"$replaceRoot": {"newRoot": "$messages.execution"}}
+        ]
+        return await Conversation.aggregate(pipeline).to_list()
+
+    @staticmethod
+    def summarize(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Latency and token percentiles, upstream calls and cache hit rate for a group of records"""
+        latencies = sorted(record["total_ms"] for record in records)
+        tokens = sorted(
+            sum(usage["input"] + usage["output"] for usage in record.get("tokens", {}).values())
+            for record in records
+        )
+        hits = sum(sum(record.get("cache_hits", {}).values()) for record in records)
+        misses = sum(sum(record.get("cache_misses", {}).values()) for record in records)
+        upstream_calls = sum(sum(record.get("upstream_calls", {}).values()) for record in records)
+        return {
+            "count": len(records),
+            "latency_p50_ms": percentile(latencies, 0.5),
+            "latency_p95_ms": percentile(latencies, 0.95),
+            "tokens_p50": percentile(tokens, 0.5),
+            "tokens_p95": percentile(tokens, 0.95),
+            "tokens_total": sum(tokens),
+            "upstream_calls_avg": round(upstream_calls / len(records), 2),
+            "cache_hit_rate": round(hits / (hits + misses), 3) if hits + misses else None
+        }
+
+    async def summary(self, hours: float = 24, limit: int = 5000) -> Dict[str, Any]:
+        """
+        p50/p95 latency and token use grouped by analysis type and by company
+        (an analysis of several companies counts toward each), plus tokens per model
+        """
+        records = await self.recent_records(hours, limit)
+
+        by_type = defaultdict(list)
+        by_company = defaultdict(list)
+        by_model = defaultdict(lambda: {"input": 0, "output": 0, "calls": 0})
+        for record in records:
+            by_type[record.get("analysis_type") or "unknown"].append(record)
+            for company in record.get("companies") or []:
+                by_company[company].append(record)
+            for model, usage in record.get("tokens", {}).items():
+                for field in ("input", "output", "calls"):
+                    by_model[model][field] += usage.get(field, 0)
+
+        return {
+            "window_hours": hours,
+            "overall": self.summarize(records) if records else {"count": 0},
+            "by_analysis_type": {name: self.summarize(group) for name, group in by_type.items()},
+            "by_company": {
+                name: self.summarize(group)
+                for name, group in sorted(by_company.items(), key=lambda item: -len(item[1]))
+            },
+            "tokens_by_model": dict(by_model)
+        }
+
+execution_service = ExecutionService()
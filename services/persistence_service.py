@@ -0,0 +1,234 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+from beanie import PydanticObjectId
+from pymongo import UpdateOne
+from config.settings import settings
+from models.conversation import Conversation, Message
+
+logger = logging.getLogger(__name__)
+
+class WriteBehindJournal:
+    """
+    Append-only file of message writes that have not reached MongoDB yet.
+    Each write is fsynced before it is queued, and an "ack" line is added
+    once it is stored; the file is truncated whenever nothing is pending.
+    The owning process holds an exclusive lock on the file while it is
+    open, so a journal that can be locked belongs to a process that died.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        if not _try_lock(self._file):
+            self._file.close()
+            raise RuntimeError(f"Journal {path} is in use")
+        self._outstanding: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def _write(self, lines: List[Dict[str, Any]]) -> None:
+        self._file.write("".join(json.dumps(line) + "\n" for line in lines))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._write([entry])
+            self._outstanding.add(entry["id"])
+
+    def ack(self, entry_ids: List[str]) -> None:
+        with self._lock:
+            self._outstanding.difference_update(entry_ids)
+            if self._outstanding:
+                self._write([{"ack": entry_id} for entry_id in entry_ids])
+            else:
+                self._file.truncate(0)
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+            if not self._outstanding:
+                os.remove(self.path)
+
+    @staticmethod
+    def pending(path: str) -> List[Dict[str, Any]]:
+        """Entries of a journal file that were never acknowledged"""
+        entries: Dict[str, Dict[str, Any]] = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn last line from a crash mid-write
+                    continue
+                if "ack" in record:
+                    entries.pop(record["ack"], None)
+                else:
+                    entries[record["id"]] = record
+        return list(entries.values())
+
+def _try_lock(f) -> bool:
+    """Take a non-blocking exclusive lock on an open file, held until it is closed"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+class PersistenceService:
+    """
+    Write-behind persistence of conversation messages. Messages are
+    journaled to local disk and queued, and a background task pushes them
+    to MongoDB in batched, idempotent updates with retries, so analyses
+    return without waiting on the database. Journals left by a process that
+    died are replayed on startup; a journal counts as orphaned when no
+    process holds its lock, since a restarted server often reuses the PID.
+    """
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._journal: Optional[WriteBehindJournal] = None
+        self._pending = 0
+        self.written = 0
+        self.batches = 0
+        self.failures = 0
+        self.recovered = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def _directory(self) -> str:
+        return os.path.join(settings.data_dir, "write_behind")
+
+    async def start(self):
+        """Open this process's journal, replay orphaned journals and start the writer"""
+        if self.running:
+            return
+        directory = self._directory()
+        os.makedirs(directory, exist_ok=True)
+        self._queue = asyncio.Queue()
+        self._journal = WriteBehindJournal(os.path.join(directory, f"journal-{uuid.uuid4().hex}.jsonl"))
+
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if path == self._journal.path or not name.startswith("journal-"):
+                continue
+            try:
+                orphan = open(path, "a+", encoding="utf-8")
+            except OSError:
+                continue
+            with orphan:
+                if not _try_lock(orphan):
+                    # Still owned by a running process
+                    continue
+                entries = WriteBehindJournal.pending(path)
+                for entry in entries:
+                    await self._submit(entry)
+            # Replayed writes are idempotent, so a second replay before removal is harmless
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.recovered += len(entries)
+            if entries:
+                logger.info(f"Recovered {len(entries)} unsaved message writes from {name}")
+
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush what is queued, waiting at most write_behind_drain_seconds"""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=settings.write_behind_drain_seconds)
+        except asyncio.TimeoutError:
+            logger.warning(f"Stopping with {self._queue.qsize()} message writes left in the journal")
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._journal.close()
+
+    async def _submit(self, entry: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self._journal.append, entry)
+        self._pending += 1
+        self._queue.put_nowait(entry)
+
+    async def enqueue(self, conversation: Conversation, messages: List[Message]) -> None:
+        """Journal new messages of a conversation and queue them for writing"""
+        await self._submit({
+            "id": uuid.uuid4().hex,
+            "conversation_id": str(conversation.id),
+            "messages": [message.model_dump(mode="json") for message in messages],
+            "updated_at": conversation.updated_at.isoformat()
+        })
+
+    @staticmethod
+    def _operation(entry: Dict[str, Any]) -> UpdateOne:
+        messages = [Message.model_validate(message).model_dump() for message in entry["messages"]]
+        # The first message's timestamp guards against pushing a retried write twice
+        return UpdateOne(
+            {"_id": PydanticObjectId(entry["conversation_id"]), "messages.timestamp": {"$ne": messages[0]["timestamp"]}},
+            {
+                "$push": {"messages": {"$each": messages}},
+                "$set": {"updated_at": datetime.fromisoformat(entry["updated_at"])}
+            }
+        )
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < settings.write_behind_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            attempt = 0
+            while True:
+                try:
+                    await Conversation.get_pymongo_collection().bulk_write(
+                        [self._operation(entry) for entry in batch], ordered=True
+                    )
+                    break
+                except Exception as e:
+                    self.failures += 1
+                    self.last_error = str(e)
+                    delay = min(settings.write_behind_max_backoff, 0.5 * 2 ** attempt)
+                    attempt += 1
+                    logger.error(f"Writing {len(batch)} queued messages failed, retrying in {delay:.1f}s: {str(e)}")
+                    await asyncio.sleep(delay)
+
+            await asyncio.to_thread(self._journal.ack, [entry["id"] for entry in batch])
+            self._pending -= len(batch)
+            self.written += len(batch)
+            self.batches += 1
+            for _ in batch:
+                self._queue.task_done()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.write_behind_enabled,
+            "running": self.running,
+            "pending": self._pending,
+            "written": self.written,
+            "batches": self.batches,
+            "failures": self.failures,
+            "recovered": self.recovered,
+            "last_error": self.last_error
+        }
+
+persistence_service = PersistenceService()
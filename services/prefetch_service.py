@@ -0,0 +1,74 @@
+import asyncio
+import logging
+from typing import Any, Dict, List
+from config.settings import settings
+from agent.cache import most_queried_companies
+from agent.tools import (
+    COMPANIES,
+    tavily_extract_financial_data,
+    get_company_news,
+    get_transcript_data
+)
+
+logger = logging.getLogger(__name__)
+
+class PrefetchService:
+    """Background scheduler that refreshes cached company data before it expires"""
+
+    def __init__(self):
+        self._tasks: List[asyncio.Task] = []
+        self._upstream_lock: asyncio.Lock = None
+
+    def jobs(self) -> List[Dict[str, Any]]:
+        """Refresh jobs with their intervals; intervals should stay below the cache TTLs"""
+        return [
+            {"name": "financial", "tool": tavily_extract_financial_data, "interval": settings.prefetch_interval_financial},
+            {"name": "news", "tool": get_company_news, "interval": settings.prefetch_interval_news},
+            {"name": "transcript", "tool": get_transcript_data, "interval": settings.prefetch_interval_transcript},
+        ]
+
+    def target_companies(self) -> List[Dict]:
+        """Most-queried companies when prefetch_top_n is set, otherwise every registered company"""
+        if settings.prefetch_top_n > 0:
+            names = most_queried_companies(settings.prefetch_top_n)
+            if names:
+                return [config for config in COMPANIES.values() if config["name"] in names]
+        return list(COMPANIES.values())
+
+    async def start(self):
+        """Start one refresh loop per job"""
+        if self._tasks:
+            return
+        self._upstream_lock = asyncio.Lock()
+        for job in self.jobs():
+            if job["interval"] > 0:
+                self._tasks.append(asyncio.create_task(self._run_job(job)))
+        logger.info(f"Prefetcher started with {len(self._tasks)} jobs")
+
+    async def stop(self):
+        """Cancel all refresh loops"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run_job(self, job: Dict[str, Any]):
+        while True:
+            for config in self.target_companies():
+                age = job["tool"].age(config)
+                if age is not None and age < job["interval"]:
+                    continue
+
+                # Refreshes run one at a time and are spaced out so the
+                # prefetcher never bursts against provider rate limits
+                async with self._upstream_lock:
+                    try:
+                        await asyncio.to_thread(job["tool"].refresh, config)
+                        logger.info(f"Prefetched {job['name']} data for {config['name']}")
+                    except Exception as e:
+                        logger.error(f"Prefetch of {job['name']} data for {config['name']} failed: {str(e)}")
+                    await asyncio.sleep(settings.prefetch_spacing_seconds)
+
+            await asyncio.sleep(settings.prefetch_check_seconds)
+
+prefetch_service = PrefetchService()
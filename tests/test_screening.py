@@ -0,0 +1,22 @@
+import pytest
+
+from agent.screening import parse_screen
+
+
+@pytest.mark.parametrize("query, rank_by", [
+    ("rank by profit growth", ["profit_cagr_3y"]),
+    ("rank by earnings growth", ["profit_cagr_3y"]),
+    ("rank by quarterly profit growth", ["profit_yoy"]),
+    ("rank by revenue growth", ["revenue_cagr_3y"]),
+    ("rank by growth", ["revenue_cagr_3y"]),
+    ("rank by ROE and debt/equity", ["roe", "debt_equity"]),
+    ("profit growth and revenue growth", ["profit_cagr_3y", "revenue_cagr_3y"]),
+])
+def test_ranking_metrics(query, rank_by):
+    assert parse_screen(query)["rank_by"] == rank_by
+
+
+def test_filters_prefer_specific_metric():
+    screen = parse_screen("companies with profit growth above 10% ranked by roe")
+    assert screen["filters"] == [("profit_cagr_3y", "above", 10.0)]
+    assert screen["rank_by"] == ["roe"]
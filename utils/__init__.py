@@ -1 +1 @@
-# Utils package for utility functions
+# Utils package for utility functions
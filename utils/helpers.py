@@ -1,48 +1,99 @@
-from datetime import datetime
-from typing import Optional
-
-def generate_conversation_title(query: str, max_length: int = 50) -> str:
-    """Generate a conversation title from a query"""
-    if len(query) <= max_length:
-        return query
-    return query[:max_length] + "..."
-
-def format_timestamp(timestamp: Optional[datetime] = None) -> str:
-    """Format timestamp for API responses"""
-    if timestamp is None:
-        timestamp = datetime.utcnow()
-    return timestamp.isoformat() + "Z"
-
-def validate_object_id(object_id: str) -> bool:
-    """Validate MongoDB ObjectId format"""
-    import re
-    return bool(re.match(r'^[0-9a-fA-F]{24}$', object_id))
-
-class APIResponse:
-    """Standardized API response helper"""
-    
-    @staticmethod
-    def success(data=None, message="Success"):
-        return {
-            "status": "success",
-            "message": message,
-            "data": data
-        }
-    
-    @staticmethod
-    def error(message="Error occurred", error_code=None):
-        response = {
-            "status": "error",
-            "message": message
-        }
-        if error_code:
-            response["error_code"] = error_code
-        return response
-    
-    @staticmethod
-    def not_found(resource="Resource"):
-        return {
-            "status": "error",
-            "message": f"{resource} not found",
-            "error_code": "NOT_FOUND"
-        }
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, Optional, Tuple
+
+def generate_conversation_title(query: str, max_length: int = 50) -> str:
+    """Generate a conversation title from a query"""
+    if len(query) <= max_length:
+        return query
+    return query[:max_length] + "..."
+
+def format_timestamp(timestamp: Optional[datetime] = None) -> str:
+    """Format timestamp for API responses"""
+    if timestamp is None:
+        timestamp = datetime.utcnow()
+    return timestamp.isoformat() + "Z"
+
+def validate_object_id(object_id: str) -> bool:
+    """Validate MongoDB ObjectId format"""
+    import re
+    return bool(re.match(r'^[0-9a-fA-F]{24}$', object_id))
+
+class APIResponse:
+    """Standardized API response helper"""
+    
+    @staticmethod
+    def success(data=None, message="Success"):
+        return {
+            "status": "success",
+            "message": message,
+            "data": data
+        }
+    
+    @staticmethod
+    def error(message="Error occurred", error_code=None):
+        response = {
+            "status": "error",
+            "message": message
+        }
+        if error_code:
+            response["error_code"] = error_code
+        return response
+    
+    @staticmethod
+    def not_found(resource="Resource"):
+        return {
+            "status": "error",
+            "message": f"{resource} not found",
+            "error_code": "NOT_FOUND"
+        }
+
+def conversation_to_dict(conversation) -> dict:
+    """Conversation document as a ConversationResponse-shaped dict"""
+    return {
+        "id": str(conversation.id),
+        "title": conversation.title,
+        "messages": [
+            {"role": msg.role, "content": msg.content, "timestamp": msg.timestamp}
+            for msg in conversation.messages
+        ],
+        "created_at": conversation.created_at,
+        "updated_at": conversation.updated_at
+    }
+
+def as_utc(timestamp: datetime) -> datetime:
+    """Treat naive datetimes (as stored by Mongo) as UTC"""
+    return timestamp.replace(tzinfo=timezone.utc) if timestamp.tzinfo is None else timestamp.astimezone(timezone.utc)
+
+def validators_for(versions: Iterable[Tuple[str, datetime]]) -> Tuple[str, Optional[datetime]]:
+    """
+    Weak ETag and Last-Modified time for documents given as (id, updated_at)
+    pairs. The ETag changes whenever a document is added, removed or updated.
+    """
+    versions = sorted((str(doc_id), as_utc(updated_at)) for doc_id, updated_at in versions)
+    digest = hashlib.sha1(
+        "|".join(f"{doc_id}:{updated_at.timestamp()}" for doc_id, updated_at in versions).encode()
+    ).hexdigest()
+    last_modified = max((updated_at for _, updated_at in versions), default=None)
+    return f'W/"{digest[:20]}"', last_modified
+
+def validator_headers(etag: str, last_modified: Optional[datetime]) -> dict:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified:
+        headers["Last-Modified"] = format_datetime(last_modified.replace(microsecond=0), usegmt=True)
+    return headers
+
+def is_not_modified(headers, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Whether a conditional GET can be answered with 304 Not Modified"""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match:
+        return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+    
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            return int(last_modified.timestamp()) <= int(parsedate_to_datetime(if_modified_since).timestamp())
+        except (TypeError, ValueError):
+            return False
+    return False